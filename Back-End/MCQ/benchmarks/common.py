@@ -0,0 +1,99 @@
+# benchmarks/common.py
+#
+# Shared pieces for the LLM benchmarks: a fixed set of MCQ prompts built exactly the way
+# utils/generate_question.py builds them, and a runner that times prompt evaluation and
+# decoding separately and checks how many of the requested MCQs come back usable.
+
+import json
+import time
+import numpy as np
+
+DIFFICULTIES = ("easy", "medium", "hard")
+# Same sampling settings as decode_mcqs()
+SAMPLING = {"temperature": 0.8, "top_p": 0.95}
+
+
+def build_prompt_set(count=8, seed=0, remaining=3):
+    """Deterministic generation prompts: one per seed, cycling through the difficulty levels."""
+    # Imported here so benchmarks that only use print_table do not need the app's database settings
+    from utils.corpus_store import get_corpus_store
+    from utils.mcq_prompts import build_mcq_prompt, format_context_questions
+    from utils.quiz_generation_methods import retrieve_context_questions
+    from utils.seed_sampler import SeedSampler
+
+    dataset = get_corpus_store().dataset
+    # A private sampler with a fixed seed, so every run builds the same prompts
+    sampler = SeedSampler(dataset["Cluster"].to_numpy(), dataset["Question Text"].fillna(""),
+                          rng=np.random.default_rng(seed))
+    prompts = []
+    for i in range(count):
+        random_question = sampler.sample("benchmark")
+        context_list = format_context_questions(retrieve_context_questions(random_question, top_k=3))
+        difficulty = DIFFICULTIES[i % len(DIFFICULTIES)]
+        prompts.append({
+            "prompt": build_mcq_prompt(remaining, difficulty, context_list),
+            "remaining": remaining,
+            "difficulty": difficulty,
+        })
+    return prompts
+
+
+def run_prompt_set(model, prompts, max_tokens=768, seed=0):
+    """
+    Evaluate each prompt once on its own (prompt-eval speed), then complete it; the completion
+    reuses the evaluated prompt from the KV cache, so its time is almost pure decoding.
+    """
+    from utils.mcq_filters import is_malformed
+    from utils.text_extraction import extract_mcqs
+
+    totals = {"prompt_tokens": 0, "prompt_seconds": 0.0, "completion_tokens": 0, "decode_seconds": 0.0,
+              "requested_mcqs": 0, "extracted_mcqs": 0, "usable_mcqs": 0}
+
+    for i, item in enumerate(prompts):
+        prompt = item["prompt"]
+        tokens = model.tokenize(prompt.encode("utf-8"))
+
+        model.reset()
+        started = time.perf_counter()
+        model.eval(tokens)
+        totals["prompt_seconds"] += time.perf_counter() - started
+        totals["prompt_tokens"] += len(tokens)
+
+        started = time.perf_counter()
+        output = model(prompt, max_tokens=max_tokens, seed=seed + i, **SAMPLING)
+        totals["decode_seconds"] += time.perf_counter() - started
+
+        text = output["choices"][0]["text"]
+        totals["completion_tokens"] += output["usage"]["completion_tokens"]
+
+        mcqs = extract_mcqs(prompt, text)
+        totals["requested_mcqs"] += item["remaining"]
+        totals["extracted_mcqs"] += len(mcqs)
+        totals["usable_mcqs"] += min(item["remaining"], sum(not is_malformed(mcq) for mcq in mcqs))
+
+    return summarize(totals)
+
+
+def summarize(totals):
+    return {
+        **{k: round(v, 3) if isinstance(v, float) else v for k, v in totals.items()},
+        "prompt_tokens_per_second": (
+            round(totals["prompt_tokens"] / totals["prompt_seconds"], 2) if totals["prompt_seconds"] else 0.0
+        ),
+        "decode_tokens_per_second": (
+            round(totals["completion_tokens"] / totals["decode_seconds"], 2) if totals["decode_seconds"] else 0.0
+        ),
+        "acceptance_rate": (
+            round(totals["usable_mcqs"] / totals["requested_mcqs"], 4) if totals["requested_mcqs"] else 0.0
+        ),
+    }
+
+
+def print_table(rows, columns):
+    """rows: list of (label, result dict). Prints an aligned table, then the raw JSON."""
+    header = ["run"] + list(columns)
+    lines = [[label] + [str(result.get(column, "")) for column in columns] for label, result in rows]
+    widths = [max(len(row[i]) for row in [header] + lines) for i in range(len(header))]
+    for row in [header] + lines:
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)))
+    print(json.dumps({label: result for label, result in rows}, indent=2))
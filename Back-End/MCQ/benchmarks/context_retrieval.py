@@ -0,0 +1,115 @@
+"""
+Latency and diversity of context retrieval, MMR retriever against the previous greedy filter,
+and MMR over the precomputed k-NN graph (utils/knn_graph.py) when it is up to date:
+
+    python -m benchmarks.context_retrieval --queries 500 --top-k 3
+
+Queries are seed-corpus embeddings, as when generate_question samples a seed question, so
+the embedding model is left out and only retrieval is timed. "greedy" is the previous
+retrieve_context_questions body: 3 * top_k neighbours, then a row-by-row pass that keeps a
+row only if both its cluster and difficulty are new. Reported per retriever: mean and p95
+latency, how often top_k rows came back, and the mean number of distinct clusters and
+difficulty levels and mean cosine relevance of the returned rows.
+"""
+
+import argparse
+import logging
+import time
+import numpy as np
+import pandas as pd
+from benchmarks.common import print_table
+
+COLUMNS = ("mean_ms", "p95_ms", "full_top_k_rate", "mean_rows", "mean_clusters", "mean_difficulties", "mean_relevance")
+
+
+def greedy_retrieve(corpus, query_vector, top_k):
+    S, I = corpus.search_all(query_vector, k=min(top_k * 3, corpus.index.ntotal))
+    retrieved_questions = [row for row in (corpus.question_row(i) for i in I[0] if i >= 0) if row is not None]
+
+    unique_clusters = set()
+    used_difficulties = set()
+    context_questions = []
+    for row in retrieved_questions:
+        cluster = row["Cluster"]
+        difficulty = row.get("Difficulty Level", "").lower()
+        if cluster not in unique_clusters and difficulty not in used_difficulties:
+            context_questions.append(row)
+            unique_clusters.add(cluster)
+            used_difficulties.add(difficulty)
+        if len(context_questions) >= top_k:
+            break
+    return pd.DataFrame(context_questions)
+
+
+def mmr_retrieve(retriever, query_vector, top_k):
+    return pd.DataFrame(retriever.retrieve(query_vector, top_k))
+
+
+def run(label, retrieve, embeddings, query_rows, top_k, texts_to_rows):
+    latencies, rows, clusters, difficulties, relevance = [], [], [], [], []
+    for row in query_rows:
+        query = embeddings[row]
+        started = time.perf_counter()
+        context = retrieve(row, top_k)
+        latencies.append(time.perf_counter() - started)
+
+        rows.append(len(context))
+        if len(context):
+            clusters.append(context["Cluster"].astype(str).nunique())
+            difficulties.append(context["Difficulty Level"].astype(str).str.lower().nunique())
+            vectors = texts_to_rows(context["Question Text"])
+            relevance.append(float((vectors @ query).mean()))
+
+    latencies = np.array(latencies) * 1000
+    return label, {
+        "mean_ms": round(float(latencies.mean()), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+        "full_top_k_rate": round(float(np.mean(np.array(rows) >= top_k)), 4),
+        "mean_rows": round(float(np.mean(rows)), 3),
+        "mean_clusters": round(float(np.mean(clusters)), 3) if clusters else 0.0,
+        "mean_difficulties": round(float(np.mean(difficulties)), 3) if difficulties else 0.0,
+        "mean_relevance": round(float(np.mean(relevance)), 4) if relevance else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    from utils.context_retriever import get_context_retriever
+    from utils.corpus_store import get_corpus_store
+
+    corpus = get_corpus_store()
+    retriever = get_context_retriever()
+    embeddings = np.asarray(corpus.embeddings, dtype=np.float32)
+    rng = np.random.default_rng(args.seed)
+    query_rows = rng.integers(0, len(embeddings), args.queries).tolist()
+
+    # Relevance is measured on seed rows; generated rows (not in this lookup) are left out
+    row_of = {text: i for i, text in enumerate(corpus.dataset["Question Text"])}
+
+    def texts_to_rows(texts):
+        rows = [row_of[text] for text in texts if text in row_of]
+        return embeddings[rows] if rows else np.zeros((1, embeddings.shape[1]), dtype=np.float32)
+
+    retrievers = [
+        ("greedy", lambda row, k: greedy_retrieve(corpus, embeddings[row][None, :], k)),
+        ("mmr", lambda row, k: mmr_retrieve(retriever, embeddings[row][None, :], k)),
+    ]
+    graph = corpus.knn_graph
+    if graph is not None:
+        retrievers.append(("mmr_knn_graph", lambda row, k: pd.DataFrame(retriever.retrieve_for_row(row, graph, k))))
+
+    for _, retrieve in retrievers:
+        retrieve(query_rows[0], args.top_k)  # warm-up: loads the index, dataset and arrays
+
+    rows = [run(label, retrieve, embeddings, query_rows, args.top_k, texts_to_rows) for label, retrieve in retrievers]
+    print_table(rows, COLUMNS)
+
+
+if __name__ == "__main__":
+    main()
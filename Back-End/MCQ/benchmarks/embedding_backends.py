@@ -0,0 +1,86 @@
+"""
+Throughput and parity of the embedding backends on the seed corpus:
+
+    python -m benchmarks.embedding_backends --backends torch onnx onnx_int8 --threads 1 2 4
+
+For every backend and thread count this encodes the corpus once in batches (texts/s), then
+times --queries single-text calls (the shape of a cache miss during generation). Parity is
+measured against dataset/question_embeddings.npy, the torch embeddings the FAISS index was
+built from: mean and worst cosine per text, nearest-neighbour agreement and how often the
+0.65/0.85 duplicate decisions change (see utils.embedding_backends.embedding_parity).
+"""
+
+import argparse
+import logging
+import time
+import numpy as np
+from benchmarks.common import print_table
+from utils.embedding_backends import EMBEDDING_BACKENDS, embedding_parity, load_embedding_backend, load_parity_corpus
+
+COLUMNS = (
+    "batch_texts_per_second",
+    "single_mean_ms",
+    "single_p95_ms",
+    "load_seconds",
+    "mean_cosine",
+    "min_cosine",
+    "nearest_neighbour_agreement",
+    "duplicate_agreement@0.65",
+    "duplicate_agreement@0.85",
+    "flipped_pairs@0.85",
+)
+
+
+def run_backend(backend, threads, texts, reference, args):
+    if backend == "torch":
+        import torch
+
+        torch.set_num_threads(threads)
+    started = time.perf_counter()
+    model = load_embedding_backend(backend, threads=threads)
+    load_seconds = round(time.perf_counter() - started, 2)
+    model.encode(texts[:args.batch_size], batch_size=args.batch_size)  # warm-up
+
+    started = time.perf_counter()
+    vectors = np.asarray(model.encode(texts, batch_size=args.batch_size), dtype=np.float32)
+    batch_seconds = time.perf_counter() - started
+
+    latencies = []
+    for text in texts[:args.queries]:
+        started = time.perf_counter()
+        model.encode([text])
+        latencies.append(time.perf_counter() - started)
+    latencies = np.array(latencies) * 1000
+
+    return {
+        "batch_texts_per_second": round(len(texts) / batch_seconds, 1),
+        "single_mean_ms": round(float(latencies.mean()), 2),
+        "single_p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        "load_seconds": load_seconds,
+        **embedding_parity(reference, vectors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=list(EMBEDDING_BACKENDS), choices=EMBEDDING_BACKENDS)
+    parser.add_argument("--threads", nargs="+", type=int, default=[2])
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--queries", type=int, default=200, help="single-text encode calls to time")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    texts, reference = load_parity_corpus()
+    print(f"Corpus: {len(texts)} texts")
+
+    rows = []
+    for backend in args.backends:
+        for threads in args.threads:
+            label = f"{backend}/t{threads}"
+            print(f"▶ Benchmarking {label}...", flush=True)
+            rows.append((label, run_backend(backend, threads, texts, reference, args)))
+    print_table(rows, COLUMNS)
+
+
+if __name__ == "__main__":
+    main()
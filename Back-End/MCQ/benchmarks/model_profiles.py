@@ -0,0 +1,96 @@
+"""
+Run the same MCQ prompt set through each model profile and thread count:
+
+    python -m benchmarks.model_profiles --profiles q8_0 q4_k_m --threads 2 4 8 --prompts 6
+
+Every run happens in its own subprocess, so peak RSS is measured per profile and one model
+never shares the page cache accounting of another. Reports prompt-eval tok/s, decode tok/s,
+peak RSS and the fraction of requested MCQs that extract_mcqs returns in usable shape.
+"""
+
+import argparse
+import json
+import logging
+import resource
+import subprocess
+import sys
+from benchmarks.common import print_table
+from utils.model_profiles import MODEL_PROFILES
+
+COLUMNS = (
+    "prompt_tokens_per_second",
+    "decode_tokens_per_second",
+    "peak_rss_mb",
+    "acceptance_rate",
+    "load_seconds",
+)
+
+
+def run_single(profile_name, threads, prompts, seed, max_tokens):
+    """Child process: load one profile, run the prompt set, print one JSON line."""
+    import time
+    from benchmarks.common import build_prompt_set, run_prompt_set
+    from utils.model_loader import create_local_llm
+    from utils.model_profiles import get_model_profile
+
+    overrides = {"n_threads": threads, "n_threads_batch": threads} if threads else {}
+    profile = get_model_profile(profile_name, overrides)
+    prompt_set = build_prompt_set(prompts, seed)
+
+    started = time.perf_counter()
+    model = create_local_llm(profile=profile, speculative="off", prefix_cache=False)
+    load_seconds = round(time.perf_counter() - started, 2)
+
+    result = run_prompt_set(model, prompt_set, max_tokens, seed)
+    result.update({
+        "profile": profile,
+        "load_seconds": load_seconds,
+        # ru_maxrss is reported in KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    })
+    print(json.dumps(result))
+
+
+def run_matrix(args):
+    rows = []
+    for profile_name in args.profiles:
+        for threads in args.threads or [None]:
+            label = f"{profile_name}/t{threads}" if threads else profile_name
+            print(f"▶ Benchmarking {label}...", flush=True)
+            command = [
+                sys.executable, "-m", "benchmarks.model_profiles", "--single", profile_name,
+                "--prompts", str(args.prompts), "--seed", str(args.seed), "--max-tokens", str(args.max_tokens),
+            ]
+            if threads:
+                command += ["--threads", str(threads)]
+
+            completed = subprocess.run(command, capture_output=True, text=True)
+            if completed.returncode != 0:
+                print(f"❌ {label} failed:\n{completed.stderr[-2000:]}")
+                rows.append((label, {"error": f"exit code {completed.returncode}"}))
+                continue
+            rows.append((label, json.loads(completed.stdout.strip().splitlines()[-1])))
+
+    print_table(rows, COLUMNS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", default=list(MODEL_PROFILES), choices=sorted(MODEL_PROFILES))
+    parser.add_argument("--threads", nargs="+", type=int, help="thread counts to try (default: profile setting)")
+    parser.add_argument("--prompts", type=int, default=6, help="number of generation prompts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-tokens", type=int, default=768)
+    parser.add_argument("--single", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    if args.single:
+        threads = args.threads[0] if args.threads else None
+        run_single(args.single, threads, args.prompts, args.seed, args.max_tokens)
+    else:
+        run_matrix(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Recall and query latency of the cosine similarity indexes against exact search:
+
+    python -m benchmarks.similarity_index --sizes 2000 100000 1000000 --k 10
+    python -m benchmarks.similarity_index --sizes 100000 --kinds hnsw --ef-search 32 64 128
+
+The bank is synthetic but shaped like the real one: every vector is a seed-corpus embedding
+plus noise, re-normalized, and queries are fresh perturbations of seed embeddings, which is
+what a near-duplicate check sees. Each configuration reports recall@k against IndexFlatIP,
+how often its duplicate decision (top-1 cosine >= --threshold) matches exact search, build
+time, and single-query latency, the way is_duplicate_faiss searches. A million 384-d vectors
+take about 1.5 GB per index, so the largest size needs a few GB of RAM.
+"""
+
+import argparse
+import logging
+import os
+import time
+import faiss
+import numpy as np
+from benchmarks.common import print_table
+from utils.corpus_store import QUESTION_EMBEDDINGS_PATH
+from utils.vector_index import HNSW_EF_CONSTRUCTION, HNSW_M, build_cosine_index, unit_rows
+
+COLUMNS = ("recall_at_k", "duplicate_agreement", "build_seconds", "mean_query_ms", "p95_query_ms")
+
+
+def seed_vectors(dim, rng):
+    if os.path.exists(QUESTION_EMBEDDINGS_PATH):
+        return np.asarray(np.load(QUESTION_EMBEDDINGS_PATH), dtype=np.float32)
+    logging.warning(f"⚠ {QUESTION_EMBEDDINGS_PATH} not found; using random centers")
+    return unit_rows(rng.normal(size=(2000, dim)))
+
+
+def synthetic_bank(seeds, size, noise, rng, chunk=100_000):
+    bank = np.empty((size, seeds.shape[1]), dtype=np.float32)
+    for start in range(0, size, chunk):
+        end = min(size, start + chunk)
+        centers = seeds[rng.integers(0, len(seeds), end - start)]
+        bank[start:end] = unit_rows(centers + rng.normal(scale=noise, size=centers.shape).astype(np.float32))
+    return bank
+
+
+def index_configs(kinds, size, ef_searches, nprobes):
+    """
+    (label, build(dim) -> index, [(search label, set_search_param(index))]) per requested kind;
+    each index is built once and searched with every search-time setting.
+    """
+    configs = []
+    if "hnsw" in kinds:
+        def set_ef(ef):
+            def apply(index):
+                index.hnsw.efSearch = ef
+            return apply
+        configs.append((
+            f"hnsw/M{HNSW_M}",
+            lambda dim: build_cosine_index(dim, "hnsw"),
+            [(f"ef{ef}", set_ef(ef)) for ef in ef_searches],
+        ))
+    if "ivf" in kinds:
+        nlist = max(16, int(np.sqrt(size)))
+
+        def set_nprobe(nprobe):
+            def apply(index):
+                index.nprobe = nprobe
+            return apply
+        configs.append((
+            f"ivf{nlist}",
+            lambda dim: faiss.IndexIVFFlat(faiss.IndexFlatIP(dim), dim, nlist, faiss.METRIC_INNER_PRODUCT),
+            [(f"probe{nprobe}", set_nprobe(nprobe)) for nprobe in nprobes],
+        ))
+    return configs
+
+
+def time_queries(index, queries, k):
+    latencies = []
+    results = []
+    for query in queries:
+        started = time.perf_counter()
+        S, I = index.search(query[None, :], k)
+        latencies.append(time.perf_counter() - started)
+        results.append((S[0], I[0]))
+    latencies = np.array(latencies) * 1000
+    return results, round(float(latencies.mean()), 3), round(float(np.percentile(latencies, 95)), 3)
+
+
+def evaluate(label, index, queries, k, exact, threshold, build_seconds):
+    results, mean_ms, p95_ms = time_queries(index, queries, k)
+    recall = np.mean([
+        len(set(I[I >= 0]) & set(exact_I)) / k for (_, I), (_, exact_I) in zip(results, exact)
+    ])
+    agreement = np.mean([
+        (S[0] >= threshold) == (exact_S[0] >= threshold) for (S, _), (exact_S, _) in zip(results, exact)
+    ])
+    return label, {
+        "recall_at_k": round(float(recall), 4),
+        "duplicate_agreement": round(float(agreement), 4),
+        "build_seconds": round(build_seconds, 2),
+        "mean_query_ms": mean_ms,
+        "p95_query_ms": p95_ms,
+    }
+
+
+def run_size(size, args, seeds, rng):
+    bank = synthetic_bank(seeds, size, args.noise, rng)
+    queries = synthetic_bank(seeds, args.queries, args.noise, rng)
+    dim = bank.shape[1]
+
+    started = time.perf_counter()
+    flat = build_cosine_index(dim, "flat")
+    flat.add(bank)
+    flat_build = time.perf_counter() - started
+    exact, _, _ = time_queries(flat, queries, args.k)
+
+    rows = [evaluate(f"{size}/flat", flat, queries, args.k, exact, args.threshold, flat_build)]
+    for label, build, search_params in index_configs(args.kinds, size, args.ef_search, args.nprobe):
+        print(f"▶ {size} vectors: building {label}...", flush=True)
+        started = time.perf_counter()
+        index = build(dim)
+        if not index.is_trained:
+            index.train(bank[rng.choice(size, min(size, 40 * index.nlist), replace=False)])
+        index.add(bank)
+        build_seconds = time.perf_counter() - started
+        for param_label, set_search_param in search_params:
+            set_search_param(index)
+            rows.append(evaluate(
+                f"{size}/{label}/{param_label}", index, queries, args.k, exact, args.threshold, build_seconds
+            ))
+        del index
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[2000, 100_000, 1_000_000])
+    parser.add_argument("--kinds", nargs="+", default=["hnsw", "ivf"], choices=["hnsw", "ivf"],
+                        help="approximate indexes to compare with exact flat search")
+    parser.add_argument("--ef-search", nargs="+", type=int, default=[32, 64, 128])
+    parser.add_argument("--nprobe", nargs="+", type=int, default=[8, 32])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--noise", type=float, default=0.04, help="per-dimension noise around seed embeddings")
+    parser.add_argument("--threshold", type=float, default=0.85, help="duplicate cut-off used by is_duplicate_faiss")
+    parser.add_argument("--threads", type=int, default=1, help="FAISS threads (1 matches one request)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    faiss.omp_set_num_threads(args.threads)
+    rng = np.random.default_rng(args.seed)
+    seeds = seed_vectors(384, rng)
+    print(f"HNSW M={HNSW_M}, efConstruction={HNSW_EF_CONSTRUCTION}")
+
+    rows = []
+    for size in args.sizes:
+        rows.extend(run_size(size, args, seeds, rng))
+    print_table(rows, COLUMNS)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Compare plain decoding with speculative decoding on the same MCQ prompts:
+
+    python -m benchmarks.speculative_decoding --prompts 8 --modes off prompt_lookup
+    LLM_DRAFT_MODEL_PATH=model/tinyllama-q4_k_m.gguf python -m benchmarks.speculative_decoding --modes off draft
+
+Speculative decoding does not change what the model samples, only how many tokens are verified per
+forward pass, so acceptance rates should match plain decoding while decode tok/s goes up.
+"""
+
+import argparse
+import gc
+import logging
+from benchmarks.common import build_prompt_set, run_prompt_set, print_table
+from utils.model_loader import create_local_llm
+from utils.speculative import SPECULATIVE_MODES
+
+COLUMNS = ("decode_tokens_per_second", "completion_tokens", "decode_seconds", "acceptance_rate", "usable_mcqs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prompts", type=int, default=8, help="number of generation prompts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-tokens", type=int, default=768)
+    parser.add_argument("--modes", nargs="+", default=["off", "prompt_lookup"], choices=SPECULATIVE_MODES)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    prompts = build_prompt_set(args.prompts, args.seed)
+
+    rows = []
+    for mode in args.modes:
+        print(f"▶ Decoding {len(prompts)} prompts with speculative={mode}...")
+        model = create_local_llm(speculative=mode, prefix_cache=False)
+        rows.append((mode, run_prompt_set(model, prompts, args.max_tokens, args.seed)))
+        del model
+        gc.collect()
+
+    print_table(rows, COLUMNS)
+
+
+if __name__ == "__main__":
+    main()
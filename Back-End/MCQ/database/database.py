@@ -23,6 +23,9 @@ while True:
         responses_collection = db["user_responses"]
         unit_quizzes = db["unit_quizzes"]
         unit_quiz_responses = db["unit_quiz_responses"]
+        quiz_jobs = db["quiz_jobs"]
+        verification_cache = db["verification_cache"]
+        quiz_embeddings = db["quiz_embeddings"]
         print(" Connected to MongoDB Atlas")
         break
     except ConnectionFailure as e:
@@ -1,9 +1,14 @@
+import os
+import sys
 from sentence_transformers import SentenceTransformer
 import pandas as pd
 import numpy as np
 import faiss
 from sklearn.cluster import KMeans
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from utils.knn_graph import refresh_knn_graph
+
 # Load original dataset
 dataset = pd.read_csv("merged_mcq_dataset.csv", encoding="latin1").fillna("")
 
@@ -36,14 +41,20 @@ embeddings_matrix = np.array(dataset["embeddings"].tolist()).astype("float32")
 # Save dataset with embeddings **including Difficulty Level (as separate column)**
 dataset.to_csv("question_dataset_with_embeddings.csv", index=False)
 
+# Unit-length rows, so inner-product scores are cosine similarities
+faiss.normalize_L2(embeddings_matrix)
+
 # Create FAISS index
-index = faiss.IndexFlatL2(embeddings_matrix.shape[1])
+index = faiss.IndexFlatIP(embeddings_matrix.shape[1])
 index.add(embeddings_matrix)
 
 # Save FAISS index
 faiss.write_index(index, "question_embeddings.index")
 np.save("question_embeddings.npy", embeddings_matrix)
 
+# Nearest neighbours of every question for prompt context (only changed rows are recomputed)
+refresh_knn_graph(embeddings_matrix, path="question_knn_graph.npz")
+
 # **Topic-Based Clustering** (Ensures diverse question selection)
 NUM_CLUSTERS = 10
 kmeans = KMeans(n_clusters=NUM_CLUSTERS, random_state=42, n_init=10)
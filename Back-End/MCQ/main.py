@@ -1,10 +1,16 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from routes.mcq_routes import router as mcq_router
 from routes.adaptive_quiz_routes import router as adaptive_quiz_router
 from routes.response_routes import router as response_router
 from routes.topic_based_quiz_routes import router as topic_router
 from routes.explanation_routes import router as explanation_router
+from routes.metrics_routes import router as metrics_router
+from routes.job_routes import router as job_router
+from utils.model_loader import start_background_loading, get_model_status
+from utils.quiz_jobs import start_job_workers
+from utils.mcq_pool import start_mcq_pool
 
 app = FastAPI()
 
@@ -29,8 +35,28 @@ app.include_router(
 app.include_router(response_router, prefix="/responses", tags=["User Responses"])
 app.include_router(topic_router, prefix="/topic", tags=["Topic based quiz"])
 app.include_router(explanation_router, prefix="/explanations", tags=["MCQ Explanation"])
+app.include_router(metrics_router, prefix="/metrics", tags=["Metrics"])
+app.include_router(job_router, prefix="/jobs", tags=["Quiz Generation Jobs"])
+
+
+@app.on_event("startup")
+def load_models():
+    #  Load models in the background so the process can start serving immediately
+    start_background_loading()
+    #  Resume quiz jobs left unfinished by a previous run
+    start_job_workers()
+    #  Keep a buffer of ready-made MCQs, filled while the LLM is idle
+    start_mcq_pool()
 
 
 @app.get("/")
 def home():
     return {"message": "Welcome to the FastAPI Backend"}
+
+
+@app.get("/ready")
+def ready():
+    """Readiness probe: 200 once every model is loaded and warmed up, 503 otherwise."""
+    status = get_model_status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
@@ -1,10 +1,11 @@
 # routes/explanation_routes.py
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from pydantic import BaseModel
 from typing import Dict
 from utils.user_mgmt_methods import get_current_user
 from utils.explanation.explanation_helper import explain_mcq, verify_answer_by_generation, is_inappropriate, is_biology_question
+from utils.llm_scheduler import llm_job, INTERACTIVE, LLMQueueFullError
 
 router = APIRouter()
 
@@ -17,24 +18,34 @@ class MCQVerifyRequest(BaseModel):
     options: Dict[str, str]
     claimed_answer: str
 
+# Explanations are short and interactive, so they jump ahead of quiz generation in the LLM queue
+def _requester(http_request: Request):
+    return http_request.client.host if http_request.client else "anonymous"
+
 @router.post("/mcq/explain_only")
-def explain_only(request: MCQExplainRequest):
+def explain_only(request: MCQExplainRequest, http_request: Request):
     if is_inappropriate(request.question):
         raise HTTPException(status_code=400, detail="Question contains inappropriate or harmful content.")
     if not is_biology_question(request.question):
         raise HTTPException(status_code=400, detail="Only biology-related questions are supported.")
     try:
-        return explain_mcq(request.question, request.options)
+        with llm_job(_requester(http_request), INTERACTIVE):
+            return explain_mcq(request.question, request.options)
+    except LLMQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/mcq/verify_and_explain")
-def verify_and_explain(request: MCQVerifyRequest):
+def verify_and_explain(request: MCQVerifyRequest, http_request: Request):
     if is_inappropriate(request.question):
         raise HTTPException(status_code=400, detail="Question contains inappropriate or harmful content.")
     if not is_biology_question(request.question):
         raise HTTPException(status_code=400, detail="Only biology-related questions are supported.")
     try:
-        return verify_answer_by_generation(request.question, request.options, request.claimed_answer)
+        with llm_job(_requester(http_request), INTERACTIVE):
+            return verify_answer_by_generation(request.question, request.options, request.claimed_answer)
+    except LLMQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
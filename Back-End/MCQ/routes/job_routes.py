@@ -0,0 +1,60 @@
+import logging
+from bson import ObjectId
+from fastapi import APIRouter, HTTPException, Depends
+from utils.user_mgmt_methods import get_current_user
+from database.database import users_collection
+from utils.quiz_generation_methods import get_irt_based_difficulty_distribution
+from utils.quiz_jobs import create_standard_job, create_adaptive_job, get_job
+
+router = APIRouter()
+
+
+def _check_quiz_owner(user_id, current_user):
+    existing_user = users_collection.find_one({"_id": ObjectId(user_id)})
+    if not existing_user:
+        raise HTTPException(status_code=404, detail="User not found. Please register before generating a quiz.")
+
+    if current_user != user_id:
+        raise HTTPException(status_code=403, detail="Unauthorized access")
+
+
+@router.post("/mcqs/{user_id}", status_code=202)
+def start_quiz_job(user_id: str, current_user: str = Depends(get_current_user)):
+    """Queue a standard quiz for background generation and return its job id immediately."""
+    _check_quiz_owner(user_id, current_user)
+    job_id = create_standard_job(user_id)
+    return {"job_id": job_id, "status": "queued"}
+
+
+@router.post("/adaptive/{user_id}/{question_count}", status_code=202)
+def start_adaptive_quiz_job(user_id: str, question_count: int, current_user: str = Depends(get_current_user)):
+    """Queue an adaptive quiz for background generation and return its job id immediately."""
+    _check_quiz_owner(user_id, current_user)
+
+    difficulty_distribution = get_irt_based_difficulty_distribution(user_id, question_count)
+    logging.info(f"📊 Difficulty distribution: {difficulty_distribution}")
+
+    job_id = create_adaptive_job(user_id, difficulty_distribution, question_count)
+    return {"job_id": job_id, "status": "queued"}
+
+
+@router.get("/{job_id}")
+def get_quiz_job(job_id: str, current_user: str = Depends(get_current_user)):
+    """Job status, generated/requested counts per difficulty, and the questions accepted so far."""
+    job = get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    if job["user_id"] != current_user:
+        raise HTTPException(status_code=403, detail="Unauthorized access")
+
+    return {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "progress": job["progress"],
+        "generated": len(job["mcqs"]),
+        "requested": job["question_count"],
+        "mcqs": job["mcqs"],
+        "quiz_id": job["quiz_id"],
+        "error": job["error"],
+    }
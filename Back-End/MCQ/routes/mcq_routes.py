@@ -1,97 +1,62 @@
 import uuid
 import logging
-import time
 from bson import ObjectId
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from utils.user_mgmt_methods import get_current_user
 from database.database import quizzes_collection, users_collection
-from utils.generate_question import generate_mcq
-from threading import Thread
-from utils.answer_verifier import verify_quiz_answers_async 
+from utils.llm_scheduler import llm_job, BATCH, LLMQueueFullError
+from utils.quiz_builder import (
+    DIFFICULTY_DISTRIBUTION,
+    iter_standard_quiz,
+    save_quiz,
+    stream_quiz_ndjson,
+)
+from utils.quiz_similarity import QuizSimilarityContext
 
 router = APIRouter()
 
 # Logging configuration
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-# Define difficulty levels
-DIFFICULTY_DISTRIBUTION = {"easy": 8, "medium": 6, "hard": 6}
+
+def _check_quiz_owner(user_id, current_user):
+    existing_user = users_collection.find_one({"_id": ObjectId(user_id)})
+    if not existing_user:
+        raise HTTPException(status_code=404, detail="User not found. Please register before generating a quiz.")
+
+    if current_user != user_id:
+        raise HTTPException(status_code=403, detail="Unauthorized access")
+
 
 @router.get("/generate_mcqs/{user_id}")
 def generate_quiz(user_id: str, current_user: str = Depends(get_current_user)):
     """Generates exactly 18 MCQs (6 Easy, 6 Medium, 6 Hard), stores in DB, and returns to user."""
     try:
-        existing_user = users_collection.find_one({"_id": ObjectId(user_id)})
-        if not existing_user:
-            raise HTTPException(status_code=404, detail="User not found. Please register before generating a quiz.")
-        
-        if current_user != user_id:
-            raise HTTPException(status_code=403, detail="Unauthorized access")
+        _check_quiz_owner(user_id, current_user)
     
         logging.info(f"📝 Generating quiz for user {user_id}...")
         quiz_id = str(uuid.uuid4())  # Unique quiz session ID
         mcqs = []
-        
-        current_quiz_questions = set()
-
-        for difficulty, count in DIFFICULTY_DISTRIBUTION.items():
-            generated = 0  
-            failed_attempts = 0  
-
-            while generated < count and failed_attempts < 5:
-                batch_mcqs = generate_mcq(difficulty, user_id, existing_questions=current_quiz_questions)
-
-                #  Log response for debugging
-                logging.info(f"📩 Received MCQ response: {batch_mcqs}")
-
-                if not batch_mcqs:
-                    failed_attempts += 1
-                    logging.warning(f"⚠ No MCQs received. Retrying... ({failed_attempts}/5)")
-                    continue
-
-                for mcq in batch_mcqs:
-                    q_text = mcq.get("question", "")
-                    if not q_text or q_text in current_quiz_questions:
-                        continue
-
-                    #  Successfully generated a question, add to the list
-                    formatted_mcq = {
-                        "question_text": q_text,  
-                        "option1": mcq.get("options", {}).get("A", "N/A"),
-                        "option2": mcq.get("options", {}).get("B", "N/A"),
-                        "option3": mcq.get("options", {}).get("C", "N/A"),
-                        "option4": mcq.get("options", {}).get("D", "N/A"),
-                        "option5": mcq.get("options", {}).get("E", "N/A"),
-                        "correct_answer": mcq.get("correct_answer", "N/A"),
-                        "difficulty": difficulty
-                    }
-                    current_quiz_questions.add(q_text)
-                    mcqs.append(formatted_mcq)
-                    generated += 1  #  Increase count only if a valid MCQ is added
-                    
-                    if generated >= count:
-                        break 
-
-            #  Log how many MCQs were generated per difficulty
-            logging.info(f" Successfully generated {generated}/{count} {difficulty}-level MCQs.")
+        quiz_context = QuizSimilarityContext()  # Embeddings of this quiz's accepted questions
+
+        with llm_job(user_id, BATCH):
+            for formatted_mcq in iter_standard_quiz(user_id, quiz_context):
+                mcqs.append(formatted_mcq)
 
         #  Handle partial quiz generation
         if len(mcqs) < 18:
             logging.warning(f"⚠ Could not generate all 15 questions. Returning {len(mcqs)} instead.")
 
         #  Store successfully generated quiz in DB
-        quiz_data = {
-            "quiz_id": quiz_id,
-            "user_id": user_id,
-            "difficulty_distribution": DIFFICULTY_DISTRIBUTION,
-            "questions": mcqs,
-            "created_at": time.time(),
-        }
-        quizzes_collection.insert_one(quiz_data)
-        Thread(target=verify_quiz_answers_async, args=(quiz_id,)).start()
+        save_quiz(user_id, DIFFICULTY_DISTRIBUTION, mcqs, quiz_id=quiz_id)
 
         return {"quiz_id": quiz_id, "total_questions": len(mcqs), "mcqs": mcqs}
 
+    except LLMQueueFullError as e:
+        logging.warning(f"🚦 {e}")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "10"})
+
     except Exception as e:
         logging.critical(f" Unexpected Fatal Error: {str(e)}")
 
@@ -103,6 +68,17 @@ def generate_quiz(user_id: str, current_user: str = Depends(get_current_user)):
             "mcqs": mcqs  #  Return the questions that were successfully generated
         }
 
+@router.get("/generate_mcqs_stream/{user_id}")
+def generate_quiz_stream(user_id: str, current_user: str = Depends(get_current_user)):
+    """Streaming variant of /generate_mcqs: NDJSON frames, one per MCQ, then a final frame with quiz_id."""
+    _check_quiz_owner(user_id, current_user)
+
+    logging.info(f"📝 Streaming quiz for user {user_id}...")
+    return StreamingResponse(
+        stream_quiz_ndjson(user_id, DIFFICULTY_DISTRIBUTION, lambda: iter_standard_quiz(user_id)),
+        media_type="application/x-ndjson",
+    )
+
 @router.get("/get_quiz/{quiz_id}")
 def get_quiz(quiz_id: str):
     """
@@ -0,0 +1,26 @@
+# routes/metrics_routes.py
+
+from fastapi import APIRouter
+from utils.llm_scheduler import llm_scheduler
+from utils.generation_metrics import generation_stats
+from utils.mcq_pool import mcq_pool
+from utils.mcq_filters import filter_stats
+from utils.verification_service import verification_service
+from utils.embedding_cache import embedding_cache
+from utils.model_loader import embedding_model
+
+router = APIRouter()
+
+
+@router.get("/")
+def get_metrics():
+    """Operational counters and timings for tuning the generation pipeline."""
+    return {
+        "llm_scheduler": llm_scheduler.metrics(),
+        "mcq_generation": generation_stats.snapshot(),
+        "mcq_pool": mcq_pool.metrics(),
+        "mcq_filters": filter_stats.snapshot(),
+        "verification": verification_service.metrics(),
+        "embedding_cache": embedding_cache.metrics(),
+        "embedding_batcher": embedding_model.metrics(),
+    }
@@ -12,7 +12,11 @@ from typing import List
 from pymongo.errors import PyMongoError
 from utils.user_mgmt_methods import get_current_user
 import traceback
-from utils.verification import verify_mcq_with_llm
+from utils.verification_service import (
+    apply_verification,
+    quiz_question_options,
+    verify_mcq,
+)
 from datetime import datetime, timedelta
 
 router = APIRouter()
@@ -258,6 +262,7 @@ def submit_quiz(data: SubmitQuizRequest, current_user: str = Depends(get_current
 
         correct_count = 0  # Track correct answers
         total_time = 0  # Track total quiz time
+        late_verifications = {}  # Quiz fields to update for questions verified during submission
         total_questions = len(quiz["questions"])
 
         response_data = {
@@ -314,38 +319,25 @@ def submit_quiz(data: SubmitQuizRequest, current_user: str = Depends(get_current
 
                 if not question.get("is_verified", False):
                     logging.info(
-                        f"🔍 Re-verifying unverified question during submission: {question_text[:60]}..."
+                        f"🔍 Verifying unverified question during submission: {question_text[:60]}..."
                     )
 
-                    options = {
-                        "A": question.get("option1", ""),
-                        "B": question.get("option2", ""),
-                        "C": question.get("option3", ""),
-                        "D": question.get("option4", ""),
-                        "E": question.get("option5", ""),
-                    }
-
-                    claimed_answer = question.get("correct_answer", "N/A")
-                    is_correct_late, verified, claimed = verify_mcq_with_llm(
+                    options = quiz_question_options(question)
+                    claimed_answer = question.get("correct_answer", "N/A").split(", ")[0]
+                    is_correct_late, verified, claimed = verify_mcq(
                         question_text, options, claimed_answer
                     )
 
-                    question["claimed_answer"] = (
-                        claimed  # ✅ Store model's original answer
+                    changes = apply_verification(
+                        question, claimed, is_correct_late, verified, options
                     )
-
-                    if is_correct_late is False and verified in options:
+                    if is_correct_late is False and changes:
                         logging.warning(f"✅ Late fix: {claimed} → {verified}")
-                        question["correct_answer"] = verified
-                        question["verified_answer"] = verified
-                    elif is_correct_late is True:
-                        question["correct_answer"] = claimed
-                        question["verified_answer"] = claimed
-                    else:
-                        question["correct_answer"] = claimed
-                        question["verified_answer"] = None
 
-                    question["is_verified"] = True
+                    #  Write the result back so later attempts and quizzes do not verify it again
+                    question_index = quiz["questions"].index(question)
+                    for field, value in changes.items():
+                        late_verifications[f"questions.{question_index}.{field}"] = value
 
                 is_correct = selected_answer == question.get(
                     "verified_answer", question["correct_answer"]
@@ -400,6 +392,11 @@ def submit_quiz(data: SubmitQuizRequest, current_user: str = Depends(get_current
             "avg_time_per_question": avg_time_per_question,
         }
 
+        if late_verifications:
+            quizzes_collection.update_one(
+                {"quiz_id": quiz_id}, {"$set": late_verifications}
+            )
+
         logging.info(f"📤 Storing quiz response in the database...")
         #  Insert response data into database
         inserted_response = responses_collection.insert_one(response_data)
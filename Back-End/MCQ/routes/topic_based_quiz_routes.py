@@ -1,32 +1,17 @@
 from fastapi import APIRouter, HTTPException, Query, Depends
 from datetime import datetime
-import pandas as pd
-import torch
-import os
+import numpy as np
 import random
 from pydantic import BaseModel
 from typing import List
-from sentence_transformers import util
 from bson import ObjectId
 from database.database import unit_quizzes, unit_quiz_responses, users_collection
-from utils.model_loader import embedding_model
+from utils.embedding_cache import embedding_cache
+from utils.corpus_store import get_corpus_store
 from utils.user_mgmt_methods import get_current_user
 
 router = APIRouter()
 
-# Load dataset
-DATASET_PATH = "dataset/unit-wise-dataset/unit_tagged_mcq_dataset.csv"
-EMBEDDING_PATH = "dataset/unit-wise-dataset/unit_question_embeddings.pt"
-unit_df = pd.read_csv(DATASET_PATH).fillna("")
-
-if os.path.exists(EMBEDDING_PATH):
-    embeddings = torch.load(EMBEDDING_PATH, weights_only=False)
-else:
-    embeddings = unit_df["Question Text"].apply(lambda x: embedding_model.encode(x, convert_to_tensor=True))
-    torch.save(embeddings, EMBEDDING_PATH)
-
-unit_df["embedding"] = embeddings
-
 class QuizResponse(BaseModel):
     question_text: str
     selected_answer: str
@@ -61,17 +46,24 @@ def get_previously_seen_questions(user_id, unit_name):
 
 # Helper: Fallback similar questions
 def get_semantically_similar_questions(target_texts, excluded_units, used_questions, count):
-    candidates = unit_df[~unit_df["Assigned_Unit"].isin(excluded_units)]
-    candidates = candidates[~candidates["Question Text"].isin(used_questions)]
-    if candidates.empty:
+    corpus = get_corpus_store()
+    unit_df = corpus.unit_df
+    mask = ~unit_df["Assigned_Unit"].isin(excluded_units) & ~unit_df["Question Text"].isin(used_questions)
+    positions = np.flatnonzero(mask.to_numpy())
+    if positions.size == 0:
         return []
-    target_embeddings = embedding_model.encode(target_texts, convert_to_tensor=True)
-    results = []
-    for _, row in candidates.iterrows():
-        sim = util.cos_sim(row["embedding"], target_embeddings).max().item()
-        results.append((sim, row))
-    results = sorted(results, key=lambda x: x[0], reverse=True)[:count]
-    return [format_question(row) for _, row in results]
+    if not target_texts:
+        return [format_question(row) for _, row in unit_df.iloc[positions[:count]].iterrows()]
+
+    candidate_vectors = np.asarray(corpus.unit_embeddings[positions], dtype=np.float32)
+    candidate_vectors /= np.linalg.norm(candidate_vectors, axis=1, keepdims=True) + 1e-12
+    target_vectors = embedding_cache.encode(target_texts)
+    target_vectors /= np.linalg.norm(target_vectors, axis=1, keepdims=True) + 1e-12
+
+    # Best cosine similarity of each candidate to any of the target questions
+    sims = (candidate_vectors @ target_vectors.T).max(axis=1)
+    best = positions[np.argsort(-sims, kind="stable")[:count]]
+    return [format_question(row) for _, row in unit_df.iloc[best].iterrows()]
 
 # Route: Generate Quiz
 @router.get("/unit_quiz/generate/{user_id}")
@@ -88,6 +80,7 @@ def generate_unit_quiz(
     if current_user != user_id:
         raise HTTPException(status_code=403, detail="Unauthorized access")
     
+    unit_df = get_corpus_store().unit_df
     filtered = unit_df[unit_df["Assigned_Unit"] == unit]
     if filtered.empty:
         raise HTTPException(status_code=404, detail=f"No questions found for {unit}.")
@@ -0,0 +1,62 @@
+import sys
+import os
+import faiss
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.context_retriever import ContextRetriever, mmr_select
+from utils.corpus_store import CorpusStore
+from utils.generated_store import GeneratedQuestionStore
+from utils.vector_index import unit_rows
+
+DIM = 8
+
+
+def _corpus(tmp_path, embeddings, clusters, difficulties):
+    corpus = CorpusStore()
+    corpus._embeddings = embeddings
+    corpus._index = faiss.IndexFlatIP(DIM)
+    corpus._index.add(embeddings)
+    corpus._dataset = pd.DataFrame({
+        "Question Text": [f"Seed question {i}?" for i in range(len(embeddings))],
+        "Correct Answer": [f"Answer {i}" for i in range(len(embeddings))],
+        "Difficulty Level": difficulties,
+        "Cluster": clusters,
+    })
+    corpus._generated = GeneratedQuestionStore(DIM, directory=str(tmp_path))
+    return corpus
+
+
+def test_mmr_prefers_new_clusters_and_difficulties_but_always_fills_top_k():
+    relevance = np.array([0.9, 0.89, 0.88, 0.5, 0.4], dtype=np.float32)
+    vectors = np.eye(5, dtype=np.float32)
+    clusters = np.array([1, 1, 1, 2, 3])
+    difficulties = np.array([0, 0, 1, 1, 2])
+
+    # 1 and 2 share candidate 0's cluster, so the less relevant 3 and 4 come next
+    assert mmr_select(relevance, vectors, clusters, difficulties, top_k=3).tolist() == [0, 3, 4]
+    # Only one cluster left: repeats are penalized, not excluded
+    assert mmr_select(relevance[:3], vectors[:3, :3], clusters[:3], difficulties[:3], top_k=3).tolist() == [0, 2, 1]
+
+
+def test_mmr_skips_near_duplicates_of_a_picked_candidate():
+    vectors = unit_rows([[1, 0, 0], [1, 0.01, 0], [0.6, 0.8, 0]])
+    picked = mmr_select(np.array([0.9, 0.89, 0.7]), vectors, np.array([1, 2, 3]), np.array([0, 1, 1]), top_k=2, mmr_lambda=0.5)
+    assert picked.tolist() == [0, 2]
+
+
+def test_retriever_returns_top_k_diverse_rows_from_seed_and_generated_questions(tmp_path):
+    rng = np.random.default_rng(0)
+    embeddings = unit_rows(np.tile(rng.normal(size=(1, DIM)), (12, 1)) + rng.normal(scale=0.2, size=(12, DIM)))
+    corpus = _corpus(tmp_path, embeddings, clusters=[0] * 10 + [1, 2], difficulties=["Easy"] * 10 + ["Medium", "Hard"])
+    corpus.add_generated(embeddings[:1] + 0.05, [{"question": "Generated question?", "difficulty": "hard",
+                                                 "options": {"A": "x"}, "correct_answer": "A"}])
+
+    context = ContextRetriever(corpus).retrieve(embeddings[:1], top_k=3)
+
+    assert len(context["Question Text"]) == 3
+    assert context["Question Text"][0] == "Seed question 0?"
+    assert len(set(map(str, context["Cluster"]))) == 3
+    assert set(context["Difficulty Level"]) >= {"easy"}
@@ -0,0 +1,94 @@
+import sys
+import os
+from types import SimpleNamespace
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.embedding_backends import (
+    ONNX_MODEL_DIR,
+    OnnxSentenceEncoder,
+    embedding_parity,
+    load_embedding_backend,
+    load_parity_corpus,
+)
+
+TOKEN_VECTORS = np.random.default_rng(0).normal(size=(20, 4)).astype(np.float32)
+
+
+class FakeTokenizer:
+    """Whitespace "tokenizer" over ids 1..19, padded with 0 to the longest text of the batch."""
+
+    def encode_batch(self, texts):
+        ids = [[int(token) for token in text.split()] for text in texts]
+        length = max(len(row) for row in ids)
+        return [
+            SimpleNamespace(
+                ids=row + [0] * (length - len(row)),
+                attention_mask=[1] * len(row) + [0] * (length - len(row)),
+                type_ids=[0] * length,
+            )
+            for row in ids
+        ]
+
+
+class FakeSession:
+    def __init__(self):
+        self.batches = []
+
+    def get_inputs(self):
+        return [SimpleNamespace(name="input_ids"), SimpleNamespace(name="attention_mask")]
+
+    def get_outputs(self):
+        return [SimpleNamespace(name="last_hidden_state", shape=["batch", "tokens", 4])]
+
+    def run(self, output_names, feed):
+        assert set(feed) == {"input_ids", "attention_mask"}
+        self.batches.append(feed["input_ids"].shape)
+        return [TOKEN_VECTORS[feed["input_ids"]]]
+
+
+def _expected(text):
+    vector = TOKEN_VECTORS[[int(token) for token in text.split()]].mean(axis=0)
+    return vector / np.linalg.norm(vector)
+
+
+def test_onnx_encoder_mean_pools_real_tokens_and_keeps_input_order():
+    session = FakeSession()
+    encoder = OnnxSentenceEncoder(session, FakeTokenizer())
+    texts = ["3", "1 2 3 4 5", "7 8", "9 10 11"]
+
+    vectors = encoder.encode(texts, batch_size=2)
+
+    assert vectors.dtype == np.float32 and vectors.shape == (4, 4)
+    for text, vector in zip(texts, vectors):
+        np.testing.assert_allclose(vector, _expected(text), rtol=1e-5, atol=1e-6)
+    # Longest texts are batched together, so the short ones are not padded to five tokens
+    assert session.batches == [(2, 5), (2, 2)]
+    np.testing.assert_allclose(encoder.encode("7 8"), _expected("7 8"), rtol=1e-5, atol=1e-6)
+
+
+def test_embedding_parity_reports_identical_embeddings_as_exact():
+    vectors = np.random.default_rng(1).normal(size=(50, 8)).astype(np.float32)
+
+    report = embedding_parity(vectors, vectors * 3.0)
+
+    assert report["min_cosine"] == pytest.approx(1.0, abs=1e-5)
+    assert report["nearest_neighbour_agreement"] == 1.0
+    assert report["duplicate_agreement@0.85"] == 1.0 and report["flipped_pairs@0.85"] == 0
+
+
+@pytest.mark.parametrize("backend, min_cosine, min_agreement", [("onnx", 0.999, 0.995), ("onnx_int8", 0.98, 0.97)])
+def test_onnx_backend_matches_torch_embeddings_on_the_corpus(backend, min_cosine, min_agreement):
+    """Needs onnxruntime and the exported model in ONNX_MODEL_DIR; compared with dataset/question_embeddings.npy."""
+    pytest.importorskip("onnxruntime")
+    if not os.path.exists(os.path.join(ONNX_MODEL_DIR, "onnx", "model.onnx")):
+        pytest.skip(f"ONNX model not found in {ONNX_MODEL_DIR}")
+
+    texts, reference = load_parity_corpus()
+    report = embedding_parity(reference, load_embedding_backend(backend).encode(texts, batch_size=64))
+
+    assert report["mean_cosine"] >= min_cosine
+    assert report["duplicate_agreement@0.85"] >= min_agreement
+    assert report["duplicate_agreement@0.65"] >= min_agreement
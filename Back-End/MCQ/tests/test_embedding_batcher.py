@@ -0,0 +1,83 @@
+import sys
+import os
+import threading
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.embedding_batcher import MicroBatchingEncoder
+
+
+class FakeModel:
+    """Encodes each text as [len(text), flag]; records the texts of every forward pass."""
+
+    def __init__(self):
+        self.batches = []
+
+    def encode(self, texts, flag=0, **kwargs):
+        if "boom" in texts:
+            raise RuntimeError("forward pass failed")
+        self.batches.append(list(texts))
+        return np.array([[len(text), flag] for text in texts], dtype=np.float32)
+
+
+def _encode_concurrently(encoder, calls):
+    results = [None] * len(calls)
+    start = threading.Barrier(len(calls))
+
+    def worker(i, texts, kwargs):
+        start.wait()
+        try:
+            results[i] = encoder.encode(texts, **kwargs)
+        except RuntimeError as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i, texts, kwargs)) for i, (texts, kwargs) in enumerate(calls)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_calls_share_one_forward_pass_and_get_their_own_rows():
+    model = FakeModel()
+    encoder = MicroBatchingEncoder(model, max_batch_size=64, max_wait_ms=200)
+    calls = [(["x" * (i + 1)], {}) for i in range(8)]
+
+    results = _encode_concurrently(encoder, calls)
+
+    assert len(model.batches) == 1 and len(model.batches[0]) == 8
+    for i, vectors in enumerate(results):
+        np.testing.assert_array_equal(vectors, [[i + 1, 0]])
+
+    metrics = encoder.metrics()
+    assert metrics["requests"] == 8 and metrics["batches"] == 1 and metrics["texts"] == 8
+    assert metrics["batch_size_histogram"]["<=8"] == 1
+
+
+def test_batches_respect_max_size_and_encode_options():
+    model = FakeModel()
+    encoder = MicroBatchingEncoder(model, max_batch_size=4, max_wait_ms=200)
+    calls = [(["a", "b", "c"], {}), (["d", "e"], {}), (["f"], {"flag": 1}), (["g" * 9], {})]
+
+    results = _encode_concurrently(encoder, calls)
+
+    assert all(len(batch) <= 4 for batch in model.batches)
+    assert ["f"] in model.batches  # other encode options never share a forward pass
+    assert len(model.batches) < len(calls)
+    np.testing.assert_array_equal(results[2], [[1, 1]])
+    np.testing.assert_array_equal(results[3], [[9, 0]])
+    assert sum(len(batch) for batch in model.batches) == 7
+
+
+def test_a_failed_forward_pass_raises_in_every_caller_of_the_batch():
+    encoder = MicroBatchingEncoder(FakeModel(), max_batch_size=64, max_wait_ms=200)
+
+    results = _encode_concurrently(encoder, [(["boom"], {}), (["fine"], {})])
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    with pytest.raises(RuntimeError):
+        encoder.encode(["boom"])
+    np.testing.assert_array_equal(encoder.encode(["ok"]), [[2, 0]])
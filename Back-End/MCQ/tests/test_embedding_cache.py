@@ -0,0 +1,114 @@
+import sys
+import os
+import multiprocessing
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.embedding_cache import DiskEmbeddingTier, EmbeddingCache, text_key
+
+
+class FakeEncoder:
+    """Deterministic 4-d 'embeddings' that record which texts reached the model."""
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, **kwargs):
+        self.calls.append(list(texts))
+        return np.array([[len(t), t.count("a"), t.count("e"), 1.0] for t in texts], dtype=np.float32)
+
+
+def test_text_key_ignores_case_and_whitespace():
+    assert text_key("What is  ATP?") == text_key(" what is atp? ")
+    assert text_key("What is ATP?") != text_key("What is ADP?")
+
+
+def test_only_unseen_texts_reach_the_model_in_one_batch():
+    model = FakeEncoder()
+    cache = EmbeddingCache(model, max_entries=10, disk_path=None)
+
+    first = cache.encode(["alpha", "beta"])
+    second = cache.encode(["beta", "gamma", "gamma"])
+
+    assert model.calls == [["alpha", "beta"], ["gamma"]]
+    assert second.shape == (3, 4) and second.dtype == np.float32
+    np.testing.assert_array_equal(second[0], first[1])
+    assert cache.metrics()["hits"] == 1
+    assert cache.metrics()["misses"] == 3
+
+
+def test_lru_evicts_least_recently_used():
+    model = FakeEncoder()
+    cache = EmbeddingCache(model, max_entries=2, disk_path=None)
+
+    cache.encode(["a1", "a2"])
+    cache.encode(["a1"])  # a2 is now the oldest
+    cache.encode(["a3"])
+    cache.encode(["a1", "a2"])
+
+    assert model.calls[-1] == ["a2"]
+    assert cache.metrics()["evictions"] == 2
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "embeddings")
+    cache = EmbeddingCache(FakeEncoder(), max_entries=10, disk_path=path)
+    expected = cache.encode(["cell membrane", "mitochondria"], persist=True)
+    cache.encode(["not persisted"])
+
+    model = FakeEncoder()
+    restarted = EmbeddingCache(model, max_entries=10, disk_path=path)
+    vectors = restarted.encode(["cell membrane", "mitochondria", "not persisted"])
+
+    np.testing.assert_allclose(vectors[:2], expected, rtol=1e-3)
+    assert model.calls == [["not persisted"]]
+    assert restarted.metrics()["disk_hits"] == 2
+
+
+def test_persist_writes_vectors_first_cached_in_memory(tmp_path):
+    path = str(tmp_path / "embeddings")
+    cache = EmbeddingCache(FakeEncoder(), max_entries=10, disk_path=path)
+    cache.encode(["ribosome"])  # e.g. a similarity check
+    cache.encode(["ribosome"], persist=True)  # the question is accepted
+
+    model = FakeEncoder()
+    EmbeddingCache(model, max_entries=10, disk_path=path).encode(["ribosome"])
+    assert model.calls == []
+
+
+def _vector(i):
+    return np.array([i, -i, 0.5, 1.0], dtype=np.float32)
+
+
+def _write_keys(path, worker, count):
+    tier = DiskEmbeddingTier(path)
+    for i in range(count):
+        tier.put_many([f"w{worker}-{i}"], [_vector(worker * 100 + i)])
+
+
+def test_disk_tier_rows_stay_consistent_across_worker_processes(tmp_path):
+    path = str(tmp_path / "embeddings")
+    first, second = DiskEmbeddingTier(path), DiskEmbeddingTier(path)
+
+    # Two workers append in turn; each must map the other's keys to the right rows
+    first.put_many(["a"], [_vector(1)])
+    second.put_many(["b", "a"], [_vector(2), _vector(1)])
+    first.put_many(["c"], [_vector(3)])
+
+    for tier in (first, second):
+        for key, i in (("a", 1), ("b", 2), ("c", 3)):
+            np.testing.assert_array_equal(tier.get(key), _vector(i))
+    assert len(DiskEmbeddingTier(path)) == 3
+
+    fork = multiprocessing.get_context("fork")
+    workers = [fork.Process(target=_write_keys, args=(path, worker, 25)) for worker in range(1, 4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=30)
+        assert worker.exitcode == 0
+
+    for worker in range(1, 4):
+        for i in range(25):
+            np.testing.assert_array_equal(first.get(f"w{worker}-{i}"), _vector(worker * 100 + i))
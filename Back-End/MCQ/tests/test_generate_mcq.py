@@ -2,7 +2,7 @@ import sys
 import os
 import pandas as pd
 import numpy as np
-from unittest.mock import patch
+from unittest.mock import patch, MagicMock
 from bson import ObjectId
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -33,19 +33,21 @@ def mock_extracted_mcq():
         "correct_answer": "C"
     }]
 
-@patch("utils.generate_question.verify_mcq_with_llm", return_value=(True, "C", "C"))
-@patch("utils.generate_question.extract_mcqs", return_value=mock_extracted_mcq())
-@patch("utils.generate_question.index.add")
-@patch("utils.generate_question.embedding_model.encode", return_value=np.array([[0.1]*384], dtype=np.float32))
+@patch("utils.generate_question.MCQ_GENERATION_MODE", "freetext")
+@patch("utils.mcq_filters.verify_mcq", return_value=(True, "C", "C"))
+@patch("utils.generate_question.stream_freetext_mcqs", return_value=(FAKE_RAW_OUTPUT, mock_extracted_mcq(), 60, 0, True))
+@patch("utils.generate_question.embedding_cache.encode", return_value=np.array([[0.1]*384], dtype=np.float32))
 @patch("utils.generate_question.retrieve_context_questions", return_value=pd.DataFrame())
-def test_generate_mcq_success(mock_context, mock_encode, mock_add, mock_extract, mock_verify):
+def test_generate_mcq_success(mock_context, mock_encode, mock_extract, mock_verify):
     mock_df = pd.DataFrame([{
         "Question Text": "What is the powerhouse of the cell?",
         "Correct Answer": "C",
         "Cluster": 1
     }])
 
-    with patch.object(gq, "dataset", mock_df):
+    mock_corpus = MagicMock(dataset=mock_df)
+
+    with patch.object(gq, "get_corpus_store", return_value=mock_corpus):
         result = generate_mcq("easy", str(ObjectId()), max_retries=1)
 
         assert isinstance(result, list)
@@ -55,20 +57,22 @@ def test_generate_mcq_success(mock_context, mock_encode, mock_add, mock_extract,
         assert result[0]["is_verified"] is True
         assert result[0]["correct_answer"] == "C"
 
-@patch("utils.generate_question.verify_mcq_with_llm", return_value=(True, "C", "C"))
-@patch("utils.generate_question.extract_mcqs", return_value=mock_extracted_mcq())
-@patch("utils.generate_question.index.add")
-@patch("utils.generate_question.embedding_model.encode", return_value=np.array([[0.1]*384], dtype=np.float32))
+@patch("utils.generate_question.MCQ_GENERATION_MODE", "freetext")
+@patch("utils.mcq_filters.verify_mcq", return_value=(True, "C", "C"))
+@patch("utils.generate_question.stream_freetext_mcqs", return_value=(FAKE_RAW_OUTPUT, mock_extracted_mcq(), 60, 0, True))
+@patch("utils.generate_question.embedding_cache.encode", return_value=np.array([[0.1]*384], dtype=np.float32))
 @patch("utils.generate_question.retrieve_context_questions", return_value=pd.DataFrame())
 @patch("utils.generate_question.estimate_student_ability", return_value=0.5)
-def test_generate_mcq_based_on_performance_success(mock_theta, mock_context, mock_encode, mock_add, mock_extract, mock_verify):
+def test_generate_mcq_based_on_performance_success(mock_theta, mock_context, mock_encode, mock_extract, mock_verify):
     mock_df = pd.DataFrame([{
         "Question Text": "What is the powerhouse of the cell?",
         "Correct Answer": "C",
         "Cluster": 1
     }])
 
-    with patch.object(gq, "dataset", mock_df):
+    mock_corpus = MagicMock(dataset=mock_df)
+
+    with patch.object(gq, "get_corpus_store", return_value=mock_corpus):
         result = generate_mcq_based_on_performance(str(ObjectId()), "medium", max_retries=1)
 
         assert isinstance(result, list)
@@ -77,3 +81,43 @@ def test_generate_mcq_based_on_performance_success(mock_theta, mock_context, moc
         assert "question" in result[0]
         assert result[0]["is_verified"] is True
         assert result[0]["correct_answer"] == "C"
+
+
+@patch("utils.generate_question.MCQ_GENERATION_MODE", "freetext")
+@patch("utils.mcq_filters.verify_mcq", return_value=(True, "C", "C"))
+@patch("utils.generate_question.stream_freetext_mcqs", return_value=(FAKE_RAW_OUTPUT, mock_extracted_mcq(), 60, 0, True))
+@patch("utils.generate_question.embedding_cache.encode", return_value=np.array([[0.1]*384], dtype=np.float32))
+@patch("utils.generate_question.retrieve_context_questions", return_value=pd.DataFrame())
+@patch("utils.generate_question.assign_difficulty_parameter", side_effect=AssertionError("not a real user"))
+def test_iter_generate_mcq_can_leave_irt_parameters_to_the_caller(mock_b, mock_context, mock_encode, mock_extract, mock_verify):
+    mock_corpus = MagicMock(dataset=pd.DataFrame([{"Question Text": "Seed?", "Correct Answer": "C", "Cluster": 1}]))
+
+    with patch.object(gq, "get_corpus_store", return_value=mock_corpus):
+        result = list(gq.iter_generate_mcq("hard", "mcq-pool", max_retries=1, assign_irt=False))
+
+    assert len(result) == 1
+    assert "b" not in result[0] and "a" not in result[0]
+    mock_b.assert_not_called()
+
+
+def test_stream_freetext_mcqs_stops_once_enough_questions_are_parsed():
+    lines = FAKE_RAW_OUTPUT.strip().split("\n")
+    tokens = [line + "\n" for line in lines] + ["Question 2: rambling...\n"] * 50
+    closed = []
+
+    def fake_stream():
+        try:
+            for token in tokens:
+                yield {"choices": [{"text": token}]}
+        finally:
+            closed.append(True)
+
+    with patch.object(gq, "llm", side_effect=lambda *args, **kwargs: fake_stream()):
+        raw, mcqs, decoded, wasted, stopped_early = gq.stream_freetext_mcqs("prompt", 1, {"max_tokens": 768})
+
+    assert stopped_early is True
+    assert decoded == len(lines)
+    assert wasted == 0
+    assert len(mcqs) == 1 and mcqs[0]["correct_answer"] == "C"
+    assert closed == [True]
+
@@ -0,0 +1,62 @@
+import sys
+import os
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.generated_store import GeneratedQuestionStore, generated_id, is_generated_id
+
+
+def _mcq(question, difficulty="easy"):
+    return {
+        "question": question,
+        "difficulty": difficulty,
+        "options": {"A": "ATP", "B": "DNA", "C": "RNA", "D": "NADH", "E": "FADH2"},
+        "correct_answer": "A",
+    }
+
+
+def _vector(seed, dim=8):
+    return np.random.default_rng(seed).normal(size=(1, dim)).astype(np.float32)
+
+
+def test_additions_survive_restart_with_ids_and_metadata(tmp_path):
+    store = GeneratedQuestionStore(8, directory=str(tmp_path), snapshot_every=2)
+    for i in range(3):
+        store.add(_vector(i), [_mcq(f"Question {i}?")])
+    store.add(_vector(0), [_mcq("Question 0?")])  # Already stored: skipped
+
+    # Two additions went into the snapshot, the third only into the log
+    assert os.path.exists(os.path.join(str(tmp_path), "snapshot.pkl"))
+    restarted = GeneratedQuestionStore(8, directory=str(tmp_path), snapshot_every=2)
+    assert len(restarted) == 3
+
+    D, I = restarted.search(_vector(2), k=1)
+    assert I[0][0] == generated_id("Question 2?") and is_generated_id(I[0][0])
+    assert restarted.metadata(I[0][0]) == {
+        "text": "Question 2?", "difficulty": "easy", "source": "generated", "correct_answer": "ATP",
+    }
+
+
+def test_workers_sharing_a_directory_see_each_others_additions(tmp_path):
+    first = GeneratedQuestionStore(8, directory=str(tmp_path))
+    second = GeneratedQuestionStore(8, directory=str(tmp_path))
+
+    first.add(_vector(1), [_mcq("From worker one?")])
+    with open(os.path.join(str(tmp_path), "additions.log"), "ab") as f:
+        f.write(b'{"id": 1, "torn')  # A write still in progress is left for later
+
+    D, I = second.search(_vector(1), k=1)
+    assert I[0][0] == generated_id("From worker one?")
+    assert len(second) == 1
+
+
+def test_scores_are_cosine_similarities_for_flat_and_hnsw(tmp_path):
+    question, query = _vector(3), _vector(4)
+    expected = float(question[0] @ query[0] / (np.linalg.norm(question) * np.linalg.norm(query)))
+
+    for kind in ("flat", "hnsw"):
+        store = GeneratedQuestionStore(8, directory=str(tmp_path / kind), kind=kind)
+        store.add(question * 5.0, [_mcq("Scaled vector?")])
+        S, I = store.search(query, k=1)
+        assert abs(S[0][0] - expected) < 1e-5
@@ -0,0 +1,151 @@
+import sys
+import os
+import stat
+import threading
+import time
+from multiprocessing.connection import Listener
+from unittest.mock import patch
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils import inference_server
+from utils import inference_client
+from utils.inference_client import RemoteModel
+
+AUTHKEY = b"test-inference"
+
+
+class FakeModel:
+    def __init__(self):
+        self.produced = []
+        self.closed = threading.Event()
+
+    def load(self):
+        return self
+
+    def reset(self):
+        self.produced.append("reset")
+
+    def __call__(self, prompt, stream=False, fail_after=None, **kwargs):
+        if not stream:
+            return {"choices": [{"text": prompt.upper()}]}
+        return self._tokens(fail_after)
+
+    def _tokens(self, fail_after):
+        try:
+            for i in range(1000):
+                if i == fail_after:
+                    raise ValueError("decode failed")
+                self.produced.append(i)
+                yield {"choices": [{"text": str(i)}]}
+                time.sleep(0.001)
+        finally:
+            self.closed.set()
+
+
+@pytest.fixture
+def llm(tmp_path):
+    """A RemoteModel for 'llm', served by handle_connection() over a real Unix socket."""
+    model = FakeModel()
+    socket_path = str(tmp_path / "inference.sock")
+    listener = Listener(socket_path, family="AF_UNIX", authkey=AUTHKEY)
+
+    def accept():
+        while True:
+            try:
+                conn = listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=inference_server.handle_connection, args=(conn,), daemon=True).start()
+
+    with patch.dict(inference_server.models, {"llm": model}), \
+            patch.dict(inference_server.model_locks, {"llm": threading.Lock()}):
+        threading.Thread(target=accept, daemon=True).start()
+        yield model, RemoteModel("llm", address=socket_path, authkey=AUTHKEY)
+        listener.close()
+
+
+def _in_one_thread(fn, timeout=5):
+    # RemoteModel keeps one connection per thread; a hang shows up as a failure here
+    outcome = {}
+
+    def run():
+        try:
+            outcome["result"] = fn()
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "remote call hung"
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
+
+
+def test_completion_round_trip(llm):
+    _, remote = llm
+    assert _in_one_thread(lambda: remote("hi", max_tokens=4))["choices"][0]["text"] == "HI"
+
+
+def test_stream_round_trip_and_cancel(llm):
+    model, remote = llm
+
+    def scenario():
+        stream = remote("q", stream=True)
+        first = [next(stream)["choices"][0]["text"] for _ in range(3)]
+        stream.close()
+        # The connection was drained, so the next call on it gets its own reply
+        return first, remote("next")["choices"][0]["text"]
+
+    assert _in_one_thread(scenario) == (["0", "1", "2"], "NEXT")
+    assert model.closed.wait(2)
+    assert len(model.produced) < 1000
+
+
+def test_server_error_mid_stream_is_raised_without_hanging(llm):
+    _, remote = llm
+
+    def scenario():
+        received = []
+        with pytest.raises(RuntimeError, match="decode failed"):
+            for chunk in remote("q", stream=True, fail_after=2):
+                received.append(chunk["choices"][0]["text"])
+        return received, remote("after")["choices"][0]["text"]
+
+    assert _in_one_thread(scenario) == (["0", "1"], "AFTER")
+
+
+def test_server_refuses_methods_outside_the_allowlist(llm):
+    model, remote = llm
+
+    def scenario():
+        refused = []
+        for method in ("reset", "save_state", "__class__"):
+            with pytest.raises(RuntimeError, match="not allowed") as error:
+                remote._request(method, (), {})
+            refused.append(str(error.value))
+        return refused, remote("still works")["choices"][0]["text"]
+
+    refused, text = _in_one_thread(scenario)
+    assert len(refused) == 3 and text == "STILL WORKS"
+    assert "reset" not in model.produced
+
+
+def test_authkey_is_required_and_socket_is_private(tmp_path):
+    with patch.object(inference_client, "INFERENCE_SERVER_AUTHKEY", None):
+        with pytest.raises(RuntimeError, match="INFERENCE_SERVER_AUTHKEY"):
+            RemoteModel("llm", address=str(tmp_path / "x.sock"))
+        with pytest.raises(RuntimeError, match="INFERENCE_SERVER_AUTHKEY"):
+            inference_server.open_listener(str(tmp_path / "x.sock"))
+
+    socket_path = str(tmp_path / "private" / "inference.sock")
+    with patch.object(inference_client, "INFERENCE_SERVER_AUTHKEY", "secret"):
+        listener = inference_server.open_listener(socket_path)
+    try:
+        assert stat.S_IMODE(os.stat(socket_path).st_mode) == 0o600
+        assert stat.S_IMODE(os.stat(os.path.dirname(socket_path)).st_mode) == 0o700
+    finally:
+        listener.close()
@@ -0,0 +1,54 @@
+import sys
+import os
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.knn_graph import KNNGraph, build_knn_graph, refresh_knn_graph
+from utils.vector_index import unit_rows
+
+DIM = 16
+
+
+def _brute_force(embeddings, k):
+    similarity = embeddings @ embeddings.T
+    np.fill_diagonal(similarity, -np.inf)
+    return np.argsort(-similarity, axis=1, kind="stable")[:, :k]
+
+
+def test_graph_holds_each_rows_nearest_other_rows():
+    embeddings = unit_rows(np.random.default_rng(0).normal(size=(200, DIM)))
+
+    graph = build_knn_graph(embeddings, k=8)
+
+    assert graph.ids.dtype == np.int32 and graph.similarities.dtype == np.float16
+    assert (graph.ids == _brute_force(embeddings, 8)).all()
+    ids, similarities = graph.neighbours(5, 3)
+    assert ids.tolist() == graph.ids[5, :3].tolist()
+    np.testing.assert_allclose(similarities, embeddings[ids] @ embeddings[5], atol=1e-3)
+
+
+def test_incremental_rebuild_matches_full_rebuild():
+    rng = np.random.default_rng(1)
+    embeddings = unit_rows(rng.normal(size=(300, DIM)))
+    previous = build_knn_graph(embeddings, k=8)
+
+    changed = embeddings.copy()
+    changed[[3, 50, 120]] = unit_rows(rng.normal(size=(3, DIM)))
+    changed = np.vstack([changed, unit_rows(rng.normal(size=(20, DIM)))])
+
+    assert (build_knn_graph(changed, k=8, previous=previous).ids == _brute_force(changed, 8)).all()
+    # Removed rows drop out of every neighbour list
+    assert (build_knn_graph(changed[:250], k=8, previous=previous).ids == _brute_force(changed[:250], 8)).all()
+
+
+def test_refresh_saves_graph_and_detects_stale_embeddings(tmp_path):
+    path = str(tmp_path / "graph.npz")
+    embeddings = unit_rows(np.random.default_rng(2).normal(size=(50, DIM)))
+
+    refresh_knn_graph(embeddings, path=path, k=4)
+    graph = KNNGraph.load(path)
+
+    assert graph.matches(embeddings)
+    embeddings[7] = -embeddings[7]
+    assert not graph.matches(embeddings)
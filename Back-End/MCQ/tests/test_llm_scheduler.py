@@ -0,0 +1,145 @@
+import sys
+import os
+import threading
+import time
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.llm_scheduler import LLMScheduler, LLMQueueFullError, INTERACTIVE, BATCH
+
+
+def _wait_for_pending(scheduler, expected, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if sum(scheduler.metrics()["pending"].values()) == expected:
+            return
+        time.sleep(0.01)
+    raise AssertionError("jobs were not queued in time")
+
+
+def _wait_until_busy(scheduler, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if scheduler.metrics()["busy"]:
+            return
+        time.sleep(0.01)
+    raise AssertionError("worker did not start the blocking job")
+
+
+def _submit_in_thread(scheduler, order, label, user_id, priority):
+    thread = threading.Thread(
+        target=scheduler.submit, args=(lambda: order.append(label), user_id, priority)
+    )
+    thread.start()
+    return thread
+
+
+def test_round_robin_between_users_and_interactive_first():
+    scheduler = LLMScheduler(max_depth=10)
+    release = threading.Event()
+    order = []
+
+    blocker = threading.Thread(target=scheduler.submit, args=(release.wait, "blocker", BATCH))
+    blocker.start()
+    _wait_until_busy(scheduler)
+
+    threads = []
+    for label, user_id, priority in [
+        ("alice-1", "alice", BATCH),
+        ("alice-2", "alice", BATCH),
+        ("alice-3", "alice", BATCH),
+        ("bob-1", "bob", BATCH),
+        ("carol-explain", "carol", INTERACTIVE),
+    ]:
+        threads.append(_submit_in_thread(scheduler, order, label, user_id, priority))
+        _wait_for_pending(scheduler, len(threads))
+
+    release.set()
+    for thread in threads + [blocker]:
+        thread.join(timeout=2)
+
+    assert order == ["carol-explain", "alice-1", "bob-1", "alice-2", "alice-3"]
+    metrics = scheduler.metrics()
+    assert metrics["decode_time"][BATCH]["count"] == 5
+    assert metrics["queue_wait"][INTERACTIVE]["count"] == 1
+
+
+def test_queue_full_raises_backpressure_error():
+    scheduler = LLMScheduler(max_depth=1)
+    release = threading.Event()
+
+    blocker = threading.Thread(target=scheduler.submit, args=(release.wait, "a", BATCH))
+    blocker.start()
+    _wait_until_busy(scheduler)
+
+    waiting = threading.Thread(target=scheduler.submit, args=(lambda: None, "b", BATCH))
+    waiting.start()
+    _wait_for_pending(scheduler, 1)
+
+    with pytest.raises(LLMQueueFullError):
+        scheduler.submit(lambda: None, "c", BATCH)
+
+    release.set()
+    blocker.join(timeout=2)
+    waiting.join(timeout=2)
+    assert scheduler.metrics()["rejected"] == 1
+
+
+def test_errors_are_raised_in_the_caller():
+    scheduler = LLMScheduler(max_depth=2)
+
+    def failing():
+        raise ValueError("decode failed")
+
+    with pytest.raises(ValueError):
+        scheduler.submit(failing, "a", BATCH)
+    assert scheduler.submit(lambda: 42, "a", BATCH) == 42
+
+
+def test_stream_cancel_stops_the_underlying_decode():
+    scheduler = LLMScheduler(max_depth=2)
+    produced = []
+    closed = threading.Event()
+
+    def open_stream():
+        def tokens():
+            try:
+                for i in range(1000):
+                    produced.append(i)
+                    yield i
+                    time.sleep(0.001)
+            finally:
+                closed.set()
+        return tokens()
+
+    stream = scheduler.stream(open_stream, "alice", BATCH)
+    assert [next(stream) for _ in range(3)] == [0, 1, 2]
+    stream.close()
+
+    assert closed.is_set()
+    assert len(produced) < 1000
+    assert scheduler.is_idle()
+
+
+def test_stream_that_fails_to_open_raises_in_the_caller():
+    scheduler = LLMScheduler(max_depth=2)
+
+    def open_stream():
+        raise RuntimeError("model failed to load")
+
+    outcome = []
+
+    def consume():
+        try:
+            list(scheduler.stream(open_stream, "alice", BATCH))
+        except RuntimeError as e:
+            outcome.append(str(e))
+
+    consumer = threading.Thread(target=consume, daemon=True)
+    consumer.start()
+    consumer.join(timeout=2)
+
+    assert not consumer.is_alive(), "stream consumer hung"
+    assert outcome == ["model failed to load"]
+    assert scheduler.is_idle()
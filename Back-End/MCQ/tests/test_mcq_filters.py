@@ -0,0 +1,64 @@
+import sys
+import os
+from unittest.mock import patch
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.mcq_filters import CandidateFilter, FilterStats
+
+
+def _fake_encode(texts, **kwargs):
+    return np.array([np.random.default_rng(sum(map(ord, t))).normal(size=16) for t in texts], dtype=np.float32)
+
+
+def _mcq(question, options="ABCDE", answer="Correct Answer: B"):
+    return {
+        "question": question,
+        "options": {letter: f"Option {letter}" for letter in options},
+        "correct_answer": answer,
+    }
+
+
+@patch("utils.mcq_filters.verify_mcq", return_value=(False, "C", "B"))
+@patch("utils.mcq_filters.faiss_max_similarity", side_effect=lambda vectors: np.zeros(len(vectors)))
+@patch("utils.embedding_cache.embedding_cache.encode", side_effect=_fake_encode)
+def test_cheap_rejections_never_reach_faiss_or_verification(mock_encode, mock_faiss, mock_verify):
+    stats = FilterStats()
+    candidates = CandidateFilter({"What is ATP?"}, stats=stats)
+
+    assert not candidates.accept(_mcq("Which organelle makes ATP?", options="ABCD"))
+    assert not candidates.accept(_mcq("  what is   ATP? "))
+    mock_faiss.assert_not_called()
+    mock_verify.assert_not_called()
+
+    mcq = _mcq("Which organelle makes ATP?")
+    assert candidates.accept(mcq)
+    assert mcq["correct_answer"] == "C" and mcq["claimed_answer"] == "B" and mcq["is_verified"] is True
+
+    snapshot = stats.snapshot()
+    assert snapshot["structural"]["rejected"] == 1
+    assert snapshot["exact_duplicate"]["rejected"] == 1
+    assert snapshot["verification"]["checked"] == 1
+
+
+@patch("utils.mcq_filters.verify_mcq", return_value=(True, "B", "B"))
+@patch("utils.mcq_filters.faiss_max_similarity", side_effect=lambda vectors: np.zeros(len(vectors)))
+@patch("utils.embedding_cache.embedding_cache.encode", side_effect=_fake_encode)
+def test_batch_encodes_and_searches_once_per_llm_output(mock_encode, mock_faiss, mock_verify):
+    candidates = CandidateFilter(stats=FilterStats())
+    batch = [
+        _mcq("Which organelle makes ATP?"),
+        _mcq("Which organelle makes ATP?"),  # same output, same text: the first one wins
+        _mcq("What does DNA polymerase do?"),
+        _mcq("Which gas do plants absorb?"),
+    ]
+
+    accepted = list(candidates.accept_batch(batch))
+
+    assert [mcq["question"] for mcq in accepted] == [
+        "Which organelle makes ATP?", "What does DNA polymerase do?", "Which gas do plants absorb?"
+    ]
+    assert mock_encode.call_count == 1 and len(mock_encode.call_args[0][0]) == 3
+    assert mock_faiss.call_count == 1 and len(mock_faiss.call_args[0][0]) == 3
+    assert mock_verify.call_count == 3
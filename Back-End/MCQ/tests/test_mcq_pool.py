@@ -0,0 +1,87 @@
+import sys
+import os
+import numpy as np
+from unittest.mock import patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.mcq_pool import MCQPool
+
+
+def _entry(question, vector):
+    return {"mcq": {"question": question, "options": {}, "correct_answer": "A"}, "vector": np.array(vector, dtype=np.float32)}
+
+
+@patch("utils.mcq_pool.assign_discrimination_parameter", return_value=1.0)
+@patch("utils.mcq_pool.assign_difficulty_parameter", return_value=0.5)
+def test_draw_skips_seen_questions_and_leaves_them_pooled(mock_b, mock_a):
+    pool = MCQPool(depth=3)
+    pool._levels["easy"].extend([_entry("Seen?", [1, 0]), _entry("New?", [0, 1])])
+
+    drawn = list(pool.draw("easy", "user-1", exclude={"Seen?"}))
+
+    assert [mcq["question"] for mcq in drawn] == ["New?"]
+    assert drawn[0]["b"] == 0.5 and drawn[0]["a"] == 1.0
+    assert [e["mcq"]["question"] for e in pool._levels["easy"]] == ["Seen?"]
+
+    metrics = pool.metrics()
+    assert metrics["hits"] == 1 and metrics["served_mcqs"] == 1
+
+
+@patch("utils.mcq_pool.assign_discrimination_parameter", return_value=1.0)
+@patch("utils.mcq_pool.assign_difficulty_parameter", return_value=0.5)
+def test_draw_respects_past_embeddings_and_counts_misses(mock_b, mock_a):
+    pool = MCQPool(depth=3)
+    pool._levels["hard"].append(_entry("Close to a past question?", [1, 0]))
+
+    past = np.array([[0.99, 0.1]], dtype=np.float32)
+    assert list(pool.draw("hard", "user-1", past_embeddings=past)) == []
+    assert len(pool._levels["hard"]) == 1
+    assert pool.metrics()["hit_rate"] == 0.0
+
+
+@patch("utils.mcq_pool.embedding_cache.encode_one", side_effect=lambda text, persist=False: np.array([len(text), 1.0], dtype=np.float32))
+@patch("utils.mcq_pool.iter_generate_mcq")
+def test_refill_pools_generated_mcqs_without_assigning_irt_parameters(mock_generate, mock_encode):
+    mock_generate.return_value = iter([
+        {"question": "Pooled one?", "options": {}, "correct_answer": "A"},
+        {"question": "Pooled two?", "options": {}, "correct_answer": "B"},
+    ])
+    pool = MCQPool(depth=3)
+    pool._levels["medium"].append(_entry("Already pooled?", [0, 1]))
+
+    assert pool.refill("medium") == 2
+
+    args, kwargs = mock_generate.call_args
+    assert args == ("medium", "mcq-pool")
+    assert kwargs["assign_irt"] is False
+    assert kwargs["existing_questions"] == {"Already pooled?"}
+    assert [e["mcq"]["question"] for e in pool._levels["medium"]] == ["Already pooled?", "Pooled one?", "Pooled two?"]
+    assert pool.metrics()["refilled_mcqs"] == 2
+
+
+@patch("utils.mcq_pool.assign_discrimination_parameter", return_value=1.0)
+@patch("utils.mcq_pool.assign_difficulty_parameter", return_value=0.5)
+def test_draw_skips_near_duplicates_of_the_growing_quiz(mock_b, mock_a):
+    from utils.quiz_similarity import QuizSimilarityContext
+
+    entries = [
+        _entry("Close to a live question?", [1, 0, 0]),
+        _entry("Fresh?", [0, 1, 0]),
+        _entry("Paraphrase of fresh?", [0, 0.99, 0.1]),
+        _entry("Other?", [0, 0, 1]),
+    ]
+    vectors = {e["mcq"]["question"]: e["vector"] for e in entries}
+    pool = MCQPool(depth=5)
+    pool._levels["easy"].extend(entries)
+    quiz_context = QuizSimilarityContext()
+    quiz_context.add("Live question?", np.array([0.99, 0.1, 0], dtype=np.float32))
+
+    drawn = []
+    for mcq in pool.draw("easy", "user-1", quiz_context=quiz_context):
+        drawn.append(mcq["question"])
+        # As iter_quiz_mcqs does: the accepted question joins the quiz before the next draw
+        quiz_context.add(mcq["question"], vectors[mcq["question"]])
+
+    assert drawn == ["Fresh?", "Other?"]
+    assert [e["mcq"]["question"] for e in pool._levels["easy"]] == ["Close to a live question?", "Paraphrase of fresh?"]
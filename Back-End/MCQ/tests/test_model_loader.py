@@ -0,0 +1,52 @@
+import sys
+import os
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.model_loader import LazyModel
+
+
+class FakeModel:
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts):
+        self.calls.append(texts)
+        return [len(t) for t in texts]
+
+    def __call__(self, prompt, **kwargs):
+        return {"choices": [{"text": prompt.upper()}]}
+
+
+def test_lazy_model_loads_on_first_use_and_warms_up():
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return FakeModel()
+
+    model = LazyModel("fake", loader, warmup=lambda m: m.encode(["warmup"]))
+    assert model.state == "pending"
+    assert not loads
+
+    assert model.encode(["abc"]) == [3]
+    assert model("hi")["choices"][0]["text"] == "HI"
+    assert len(loads) == 1
+    assert model.state == "ready"
+    assert model.load().calls[0] == ["warmup"]
+    assert model.status()["load_seconds"] is not None
+
+
+def test_lazy_model_records_failure():
+    def loader():
+        raise RuntimeError("missing gguf")
+
+    model = LazyModel("broken", loader)
+    with pytest.raises(RuntimeError):
+        model.load()
+
+    status = model.status()
+    assert status["state"] == "failed"
+    assert "missing gguf" in status["error"]
+    assert not model.is_ready
@@ -0,0 +1,24 @@
+import sys
+import os
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.model_profiles import get_model_profile
+
+
+def test_environment_overrides_single_fields(monkeypatch):
+    monkeypatch.setenv("LLM_N_THREADS", "8")
+    monkeypatch.setenv("LLM_USE_MLOCK", "true")
+
+    profile = get_model_profile("q4_k_m")
+    assert profile["model_path"].endswith("q4_K_M.gguf")
+    assert profile["n_threads"] == 8
+    assert profile["use_mlock"] is True
+
+    assert get_model_profile("q4_k_m", {"n_threads": 2})["n_threads"] == 2
+
+
+def test_unknown_profile_is_rejected():
+    with pytest.raises(ValueError):
+        get_model_profile("fp16")
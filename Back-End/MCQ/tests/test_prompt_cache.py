@@ -0,0 +1,87 @@
+import sys
+import os
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.prompt_cache import PrefixCachedLlama
+
+PREFIX = "<s>[INST] Fixed instructions."
+
+
+class FakeLlama:
+    """Tokenizes one token per character and tracks which tokens are in the context."""
+
+    model_path = "model/fake.gguf"
+
+    def __init__(self):
+        self.input_ids = np.zeros(512, dtype=np.intc)
+        self.n_tokens = 0
+        self.evaluated = 0
+
+    def n_ctx(self):
+        return 512
+
+    def tokenize(self, text):
+        return [ord(c) for c in text.decode("utf-8")]
+
+    def reset(self):
+        self.n_tokens = 0
+
+    def eval(self, tokens):
+        self.input_ids[self.n_tokens:self.n_tokens + len(tokens)] = tokens
+        self.n_tokens += len(tokens)
+        self.evaluated += len(tokens)
+
+    def save_state(self):
+        return (self.input_ids.copy(), self.n_tokens)
+
+    def load_state(self, state):
+        self.input_ids, self.n_tokens = state[0].copy(), state[1]
+
+    def __call__(self, prompt, **kwargs):
+        tokens = self.tokenize(prompt.encode("utf-8"))
+        current = list(self.input_ids[:self.n_tokens])
+        shared = 0
+        while shared < min(len(current), len(tokens)) and current[shared] == tokens[shared]:
+            shared += 1
+        self.n_tokens = shared
+        self.eval(tokens[shared:])
+        return {"choices": [{"text": "ok"}]}
+
+
+def test_prefix_state_is_persisted_and_restored(tmp_path):
+    model = FakeLlama()
+    cached = PrefixCachedLlama(model, [PREFIX], cache_dir=str(tmp_path))
+    assert len(list(tmp_path.iterdir())) == 1
+
+    # An unrelated prompt evicts the prefix from the context
+    cached("<s>[INST] Explain this answer. [/INST]")
+    model.evaluated = 0
+
+    cached(PREFIX + " Generate 3 easy questions. [/INST]")
+    assert cached.restores == 1
+    assert model.evaluated == len(" Generate 3 easy questions. [/INST]")
+
+    # A fresh process reuses the saved state instead of evaluating the prefix again
+    fresh = FakeLlama()
+    PrefixCachedLlama(fresh, [PREFIX], cache_dir=str(tmp_path))
+    assert fresh.evaluated == 0
+
+
+def test_replacing_the_model_file_invalidates_saved_state(tmp_path):
+    model_file = tmp_path / "model.gguf"
+    model_file.write_bytes(b"weights v1")
+    cache_dir = str(tmp_path / "cache")
+
+    first = FakeLlama()
+    first.model_path = str(model_file)
+    PrefixCachedLlama(first, [PREFIX], cache_dir=cache_dir)
+
+    model_file.write_bytes(b"new weights v2")
+    replaced = FakeLlama()
+    replaced.model_path = str(model_file)
+    PrefixCachedLlama(replaced, [PREFIX], cache_dir=cache_dir)
+
+    assert replaced.evaluated == len(PREFIX)
+    assert len(os.listdir(cache_dir)) == 2
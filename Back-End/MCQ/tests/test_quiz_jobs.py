@@ -0,0 +1,184 @@
+import sys
+import os
+import copy
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils import quiz_jobs
+from utils.llm_scheduler import LLMQueueFullError
+
+
+class FakeCollection:
+    """The subset of a pymongo collection quiz_jobs uses: equality, $or, $in and $lte filters; $set, $push and $inc."""
+
+    def __init__(self):
+        self.docs = []
+
+    @staticmethod
+    def _get(doc, path):
+        for key in path.split("."):
+            doc = doc.get(key) if isinstance(doc, dict) else None
+        return doc
+
+    def _matches(self, doc, query):
+        for key, condition in query.items():
+            if key == "$or":
+                if not any(self._matches(doc, option) for option in condition):
+                    return False
+                continue
+            value = self._get(doc, key)
+            if isinstance(condition, dict):
+                if "$lte" in condition and not (value is not None and value <= condition["$lte"]):
+                    return False
+                if "$in" in condition and value not in condition["$in"]:
+                    return False
+            elif value != condition:
+                return False
+        return True
+
+    def _apply(self, doc, update):
+        for path, value in update.get("$set", {}).items():
+            *parents, key = path.split(".")
+            target = doc
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[key] = value
+        for path, value in update.get("$push", {}).items():
+            doc[path].append(value)
+        for path, amount in update.get("$inc", {}).items():
+            *parents, key = path.split(".")
+            target = doc
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[key] = target.get(key, 0) + amount
+
+    def insert_one(self, doc):
+        self.docs.append(copy.deepcopy(doc))
+
+    def find(self, query, projection=None):
+        return [copy.deepcopy(doc) for doc in self.docs if self._matches(doc, query)]
+
+    def find_one(self, query, projection=None):
+        found = self.find(query)
+        return found[0] if found else None
+
+    def update_one(self, query, update):
+        for doc in self.docs:
+            if self._matches(doc, query):
+                self._apply(doc, update)
+                return SimpleNamespace(modified_count=1)
+        return SimpleNamespace(modified_count=0)
+
+    def find_one_and_update(self, query, update, return_document=None):
+        for doc in self.docs:
+            if self._matches(doc, query):
+                self._apply(doc, update)
+                return copy.deepcopy(doc)
+        return None
+
+
+def _mcq(i, difficulty="easy"):
+    return {"question_text": f"Question {i}?", "correct_answer": "A", "difficulty": difficulty}
+
+
+@pytest.fixture
+def jobs():
+    collection = FakeCollection()
+    executor = MagicMock()
+    with patch.object(quiz_jobs, "quiz_jobs", collection), \
+            patch.object(quiz_jobs, "_executor", executor), \
+            patch.object(quiz_jobs, "_submitted", set()), \
+            patch.object(quiz_jobs, "QuizSimilarityContext", MagicMock()):
+        yield collection, executor
+
+
+def test_create_job_persists_it_and_submits_it_once(jobs):
+    collection, executor = jobs
+
+    job_id = quiz_jobs.create_job("user-1", "standard", {"easy": 2}, 2)
+
+    job = collection.find_one({"job_id": job_id})
+    assert job["status"] == quiz_jobs.QUEUED
+    assert job["progress"] == {"easy": {"generated": 0, "requested": 2}}
+    assert executor.submit.call_count == 1
+    # A sweep while the job still waits in this process's executor does not submit it again
+    assert quiz_jobs.resume_pending_jobs() == 0
+    assert executor.submit.call_count == 1
+
+
+def test_a_claimed_job_cannot_be_claimed_again(jobs):
+    job_id = quiz_jobs.create_job("user-1", "standard", {"easy": 2}, 2)
+
+    assert quiz_jobs._claim_job(job_id)["worker"] == quiz_jobs.WORKER_ID
+    assert quiz_jobs._claim_job(job_id) is None
+
+
+def test_run_job_records_each_mcq_and_saves_the_quiz_under_the_job_id(jobs):
+    collection, _ = jobs
+    job_id = quiz_jobs.create_job("user-1", "standard", {"easy": 2}, 2)
+
+    with patch.object(quiz_jobs, "_job_mcqs", return_value=iter([_mcq(0), _mcq(1)])), \
+            patch.object(quiz_jobs, "save_quiz", return_value=job_id) as save_quiz:
+        quiz_jobs.run_job(job_id)
+
+    job = collection.find_one({"job_id": job_id})
+    assert job["status"] == quiz_jobs.COMPLETED
+    assert job["quiz_id"] == job_id
+    assert job["progress"]["easy"]["generated"] == 2
+    assert [mcq["question_text"] for mcq in job["mcqs"]] == ["Question 0?", "Question 1?"]
+    save_quiz.assert_called_once_with("user-1", {"easy": 2}, [_mcq(0), _mcq(1)], quiz_id=job_id)
+
+
+def test_full_llm_queue_puts_the_job_back_in_the_queue(jobs):
+    collection, _ = jobs
+    job_id = quiz_jobs.create_job("user-1", "standard", {"easy": 2}, 2)
+
+    def busy():
+        yield _mcq(0)
+        raise LLMQueueFullError("full")
+
+    with patch.object(quiz_jobs, "_job_mcqs", return_value=busy()):
+        quiz_jobs.run_job(job_id)
+
+    job = collection.find_one({"job_id": job_id})
+    assert job["status"] == quiz_jobs.QUEUED
+    assert job["worker"] is None
+    assert len(job["mcqs"]) == 1
+
+
+def test_startup_reclaims_jobs_left_running_by_a_dead_process_on_this_host(jobs):
+    collection, executor = jobs
+    for job_id, worker in [
+        ("dead", f"{quiz_jobs.WORKER_HOST}:999999"),
+        ("restarted", quiz_jobs.WORKER_ID),
+        ("sibling", f"{quiz_jobs.WORKER_HOST}:1"),
+        ("other-host", "elsewhere:999999"),
+    ]:
+        collection.insert_one({"job_id": job_id, "status": quiz_jobs.RUNNING, "worker": worker, "lease_until": 1e12})
+
+    with patch.object(quiz_jobs, "_process_alive", side_effect=lambda pid: pid == 1):
+        assert quiz_jobs.reclaim_own_jobs() == 2
+    assert quiz_jobs.resume_pending_jobs() == 2
+
+    resumed = sorted(call.args[1] for call in executor.submit.call_args_list)
+    assert resumed == ["dead", "restarted"]
+
+
+@patch("utils.quiz_builder.Thread")
+@patch("utils.quiz_builder.store_quiz_embeddings")
+@patch("utils.quiz_builder.quizzes_collection")
+def test_saving_a_job_quiz_twice_keeps_one_copy(mock_quizzes, mock_store_embeddings, mock_thread):
+    from utils.quiz_builder import save_quiz
+
+    mock_quizzes.update_one.return_value = SimpleNamespace(upserted_id=None)
+
+    assert save_quiz("user-1", {"easy": 1}, [_mcq(0)], quiz_id="job-1") == "job-1"
+
+    query, update = mock_quizzes.update_one.call_args.args
+    assert query == {"quiz_id": "job-1"}
+    assert update["$setOnInsert"]["questions"] == [_mcq(0)]
+    assert mock_quizzes.update_one.call_args.kwargs == {"upsert": True}
+    mock_quizzes.insert_one.assert_not_called()
@@ -0,0 +1,36 @@
+import sys
+import os
+from unittest.mock import patch
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.quiz_similarity import QuizSimilarityContext
+
+VECTORS = {
+    "What is ATP?": [1.0, 0.0, 0.0],
+    "Define ATP.": [0.95, 0.1, 0.0],
+    "What is DNA?": [0.0, 2.0, 0.0],
+    "Name a lipid.": [0.0, 0.0, 1.0],
+}
+
+
+def _fake_encode(texts, **kwargs):
+    return np.array([VECTORS[t] for t in texts], dtype=np.float32)
+
+
+@patch("utils.quiz_similarity.embedding_cache.encode", side_effect=_fake_encode)
+def test_each_question_is_encoded_once_and_checked_against_the_matrix(mock_encode):
+    context = QuizSimilarityContext(["What is ATP?", "What is DNA?"])
+    for _ in range(40):
+        context.add("Name a lipid.")
+
+    assert len(context) == 3 and "What is DNA?" in context
+    assert context.vectors.shape == (3, 3)
+    np.testing.assert_allclose(np.linalg.norm(context.vectors, axis=1), 1.0, rtol=1e-6)
+    assert mock_encode.call_count == 2
+
+    assert context.is_similar("Define ATP.", threshold=0.85)
+    assert not context.is_similar("Define ATP.", threshold=0.999)
+    assert context.has_text("  what IS atp? ")
+    assert not QuizSimilarityContext().is_similar("Define ATP.")
@@ -0,0 +1,110 @@
+import sys
+import os
+import json
+import threading
+import time
+from unittest.mock import MagicMock, patch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from routes import adaptive_quiz_routes, mcq_routes
+from utils.llm_scheduler import LLMQueueFullError
+from utils.quiz_builder import stream_quiz_ndjson
+from utils.user_mgmt_methods import get_current_user
+
+DISTRIBUTION = {"easy": 2}
+
+
+def _mcq(i):
+    return {"question_text": f"Question {i}?", "correct_answer": "A", "difficulty": "easy"}
+
+
+def _frames(stream):
+    return [json.loads(line) for line in stream]
+
+
+def test_frames_one_per_mcq_then_quiz_id():
+    with patch("utils.quiz_builder.save_quiz", return_value="quiz-1") as save_quiz:
+        frames = _frames(stream_quiz_ndjson("user-1", DISTRIBUTION, lambda: iter([_mcq(0), _mcq(1)])))
+
+    assert [frame["type"] for frame in frames] == ["mcq", "mcq", "done"]
+    assert [frame["index"] for frame in frames[:2]] == [0, 1]
+    assert frames[1]["mcq"]["question_text"] == "Question 1?"
+    assert frames[-1] == {"type": "done", "quiz_id": "quiz-1", "total_questions": 2}
+    save_quiz.assert_called_once_with("user-1", DISTRIBUTION, [_mcq(0), _mcq(1)])
+
+
+def test_generation_errors_end_the_stream_with_an_error_frame():
+    def queue_full():
+        yield _mcq(0)
+        raise LLMQueueFullError("LLM queue is full")
+
+    def broken():
+        raise ValueError("decode failed")
+        yield
+
+    with patch("utils.quiz_builder.save_quiz") as save_quiz:
+        busy = _frames(stream_quiz_ndjson("user-1", DISTRIBUTION, queue_full))
+        failed = _frames(stream_quiz_ndjson("user-1", DISTRIBUTION, broken))
+
+    assert [frame["type"] for frame in busy] == ["mcq", "error"]
+    assert busy[-1]["status_code"] == 429
+    assert failed == [{"type": "error", "status_code": 500, "detail": "An error occurred while generating the quiz."}]
+    save_quiz.assert_not_called()
+
+
+def test_client_disconnect_stops_the_producer_and_discards_the_quiz():
+    produced = []
+    stopped = threading.Event()
+
+    def endless():
+        try:
+            for i in range(1000):
+                produced.append(i)
+                yield _mcq(i)
+                time.sleep(0.005)
+        finally:
+            stopped.set()
+
+    with patch("utils.quiz_builder.save_quiz") as save_quiz:
+        stream = stream_quiz_ndjson("user-1", DISTRIBUTION, endless)
+        assert json.loads(next(stream))["type"] == "mcq"
+        stream.close()
+
+        assert stopped.wait(2)
+    assert len(produced) < 1000
+    save_quiz.assert_not_called()
+
+
+def _client(router, user_id):
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_current_user] = lambda: user_id
+    return TestClient(app)
+
+
+def test_stream_routes_return_ndjson_frames():
+    user_id = "000000000000000000000001"
+    users = MagicMock()
+    users.find_one.return_value = {"_id": user_id}
+
+    with patch("routes.mcq_routes.users_collection", users), \
+            patch("routes.mcq_routes.iter_standard_quiz", return_value=iter([_mcq(0)])), \
+            patch("utils.quiz_builder.save_quiz", return_value="quiz-1"):
+        standard = _client(mcq_routes.router, user_id).get(f"/generate_mcqs_stream/{user_id}")
+
+    with patch("routes.adaptive_quiz_routes.users_collection", users), \
+            patch("routes.adaptive_quiz_routes.get_irt_based_difficulty_distribution", return_value=DISTRIBUTION), \
+            patch("routes.adaptive_quiz_routes.load_seen_questions"), \
+            patch("routes.adaptive_quiz_routes.iter_adaptive_quiz", return_value=iter([_mcq(0), _mcq(1)])), \
+            patch("utils.quiz_builder.save_quiz", return_value="quiz-2"):
+        adaptive = _client(adaptive_quiz_routes.router, user_id).get(f"/generate_adaptive_mcqs_stream/{user_id}/2")
+
+    for response, expected in ((standard, ["mcq", "done"]), (adaptive, ["mcq", "mcq", "done"])):
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        frames = _frames(response.text.splitlines())
+        assert [frame["type"] for frame in frames] == expected
+    assert frames[-1]["quiz_id"] == "quiz-2"
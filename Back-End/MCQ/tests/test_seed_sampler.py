@@ -0,0 +1,40 @@
+import sys
+import os
+from collections import Counter
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.seed_sampler import SeedSampler
+
+CLUSTERS = np.array([3, 0, 1, 3, 2, 0, 3, 1, 3, 3])
+QUESTIONS = [f"Question {i}?" for i in range(len(CLUSTERS))]
+
+
+def test_each_rotation_visits_every_cluster_once():
+    sampler = SeedSampler(CLUSTERS, QUESTIONS, rng=np.random.default_rng(0))
+
+    rows = [sampler.sample_row("user-1") for _ in range(8)]
+
+    clusters = [CLUSTERS[row] for row in rows]
+    assert sorted(clusters[:4]) == [0, 1, 2, 3] and sorted(clusters[4:]) == [0, 1, 2, 3]
+    assert sampler.sample("user-1") in QUESTIONS
+    assert sorted(sampler.coverage("user-1").values()) == [2, 2, 2, 3]
+
+
+def test_new_rotation_starts_with_the_clusters_the_user_covered_least():
+    # With a window of three seeds, the first cluster of a rotation is forgotten by its end
+    sampler = SeedSampler(CLUSTERS, QUESTIONS, coverage_window=3, rng=np.random.default_rng(1))
+    first_rotation = [CLUSTERS[sampler.sample_row("user-1")] for _ in range(4)]
+
+    assert CLUSTERS[sampler.sample_row("user-1")] == first_rotation[0]
+
+
+def test_users_rotate_independently_and_inactive_users_are_forgotten():
+    sampler = SeedSampler(CLUSTERS, QUESTIONS, max_users=2, rng=np.random.default_rng(2))
+    counts = Counter(CLUSTERS[sampler.sample_row(user)] for user in ("a", "b") for _ in range(4))
+    assert counts == {0: 2, 1: 2, 2: 2, 3: 2}
+
+    sampler.sample_row("c")
+    assert sum(sampler.coverage("a").values()) == 0
+    assert SeedSampler([], []).sample("a") is None
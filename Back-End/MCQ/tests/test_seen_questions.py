@@ -0,0 +1,52 @@
+import sys
+import os
+from unittest.mock import MagicMock, patch
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.seen_questions import load_seen_questions, store_quiz_embeddings
+
+VECTORS = {
+    "What is ATP?": [1.0, 0.0, 0.0],
+    "What is DNA?": [0.0, 3.0, 0.0],
+    "Name a lipid.": [0.0, 0.0, 1.0],
+    "Define ATP.": [0.9, 0.1, 0.0],
+}
+
+
+def _fake_encode(texts, **kwargs):
+    return np.array([VECTORS[t] for t in texts], dtype=np.float32)
+
+
+def _quiz(quiz_id, *questions):
+    return {"quiz_id": quiz_id, "created_at": 1.0, "questions": [{"question_text": q} for q in questions]}
+
+
+@patch("utils.seen_questions.embedding_cache.encode", side_effect=_fake_encode)
+@patch("utils.seen_questions.quiz_embeddings")
+@patch("utils.seen_questions.quizzes_collection")
+def test_stored_vectors_are_reused_and_missing_ones_backfilled(mock_quizzes, mock_embeddings, mock_encode):
+    store_quiz_embeddings("q1", "user-1", ["What is ATP?", "What is DNA?"])
+    stored = mock_embeddings.update_one.call_args[0][1]["$set"]
+    mock_encode.reset_mock()
+
+    mock_quizzes.find.return_value.sort.return_value.limit.return_value = [
+        _quiz("q1", "What is ATP?", "What is DNA?"),
+        _quiz("q0", "Name a lipid."),
+    ]
+    mock_embeddings.find.return_value = [{"_id": "q1", **stored}]
+
+    seen = load_seen_questions("user-1", limit=2)
+
+    # Only the quiz without stored vectors is embedded, and it is written back
+    mock_encode.assert_called_once_with(["Name a lipid."])
+    assert mock_embeddings.update_one.call_args[0][0] == {"_id": "q0"}
+    assert seen.questions == ["What is ATP?", "What is DNA?", "Name a lipid."]
+    np.testing.assert_allclose(np.linalg.norm(seen.vectors, axis=1), 1.0, rtol=1e-3)
+
+    latest = seen.recent(1)
+    assert latest.questions == ["What is ATP?", "What is DNA?"]
+    assert latest.is_similar("Define ATP.", threshold=0.65)
+    assert not latest.is_similar("Name a lipid.", threshold=0.65)
+    assert seen.is_similar("Name a lipid.", threshold=0.65)
@@ -0,0 +1,46 @@
+import sys
+import os
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.speculative import GGUFDraftModel, build_draft_model
+
+
+class FakeDraftLlama:
+    """Greedy "model" that always predicts previous token + 1, and counts evaluated tokens."""
+
+    def __init__(self):
+        self.input_ids = np.zeros(64, dtype=np.intc)
+        self.n_tokens = 0
+        self.evaluated = 0
+
+    def n_ctx(self):
+        return 64
+
+    def token_eos(self):
+        return 99
+
+    def eval(self, tokens):
+        self.input_ids[self.n_tokens:self.n_tokens + len(tokens)] = tokens
+        self.n_tokens += len(tokens)
+        self.evaluated += len(tokens)
+
+    def sample(self, top_k, temp):
+        return int(self.input_ids[self.n_tokens - 1]) + 1
+
+
+def test_draft_model_proposes_and_reuses_shared_prefix():
+    fake = FakeDraftLlama()
+    draft = GGUFDraftModel(fake, num_pred_tokens=3)
+
+    assert draft(np.array([1, 2, 3], dtype=np.intc)).tolist() == [4, 5, 6]
+
+    # The main model accepted 4 and sampled 7 instead of 5: only the diverging token is evaluated again
+    fake.evaluated = 0
+    assert draft(np.array([1, 2, 3, 4, 7], dtype=np.intc)).tolist() == [8, 9, 10]
+    assert fake.evaluated == 1 + 2
+
+
+def test_plain_decoding_has_no_draft_model():
+    assert build_draft_model("off") is None
@@ -4,8 +4,9 @@ import pytest
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from utils.text_extraction import extract_mcqs
+from utils.text_extraction import extract_mcqs, IncrementalMCQParser
 from utils.quiz_generation_methods import clean_correct_answer
+from utils.mcq_grammar import build_mcq_grammar, parse_grammar_mcqs
 
 def test_extract_mcqs_parsing_single_question():
     prompt = "Ignore this prompt."
@@ -26,6 +27,26 @@ def test_extract_mcqs_parsing_single_question():
     assert len(parsed[0]["options"]) == 5
 
 
+def test_incremental_parser_matches_extract_mcqs_when_fed_in_chunks():
+    raw_output = (
+        "Question 1: What is the powerhouse of the cell?\n"
+        "A) Nucleus\nB) Ribosome\nC) Mitochondria\nD) Chloroplast\nE) Vacuole\n"
+        "Correct Answer: C\n"
+        "Question 2: Which base pairs with adenine in DNA?\n"
+        "A) Cytosine\nB) Guanine\nC) Thymine\nD) Uracil\nE) Inosine\n"
+        "Correct Answer: C"
+    )
+    parser = IncrementalMCQParser()
+    counts = []
+    for i in range(0, len(raw_output), 7):
+        parser.feed(raw_output[i:i + 7])
+        counts.append(parser.complete_count())
+
+    assert counts[-1] == 1  # The last answer line has no newline yet
+    assert parser.close() == extract_mcqs("", raw_output)
+    assert len(parser.mcqs) == 2
+
+
 @pytest.mark.parametrize("raw_input, expected", [
     ("Correct Answer: A", ["A"]),
     ("Answer: C and D", ["C", "D"]),
@@ -38,3 +59,25 @@ def test_extract_mcqs_parsing_single_question():
 ])
 def test_clean_correct_answer_letters(raw_input, expected):
     assert clean_correct_answer(raw_input) == expected
+
+
+def test_parse_grammar_mcqs_splits_complete_questions_only():
+    raw_output = (
+        "Question 1: Which organelle carries out photosynthesis?\n"
+        "A) Mitochondrion\nB) Chloroplast\nC) Ribosome\nD) Nucleus\nE) Vacuole\n"
+        "Correct Answer: B\n"
+        "Question 2: Which molecule stores genetic information?\n"
+        "A) DNA\nB) ATP\nC) Glucose\n"
+    )
+    parsed = parse_grammar_mcqs(raw_output)
+    assert len(parsed) == 1
+    assert parsed[0]["question"] == "Which organelle carries out photosynthesis?"
+    assert parsed[0]["options"]["B"] == "Chloroplast"
+    assert parsed[0]["correct_answer"] == "B"
+
+
+def test_build_mcq_grammar_has_one_rule_per_question():
+    grammar = build_mcq_grammar(3)
+    assert grammar.startswith("root ::= q1 q2 q3")
+    assert '"Question 3: "' in grammar
+    assert '"Correct Answer: " [A-E]' in grammar
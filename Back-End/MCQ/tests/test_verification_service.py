@@ -0,0 +1,47 @@
+import sys
+import os
+from unittest.mock import MagicMock
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.verification_service import VerificationService, mcq_key
+
+OPTIONS = {"A": "Nucleus", "B": "Ribosome", "C": "Mitochondria", "D": "Golgi", "E": "Lysosome"}
+
+
+class FakeCollection:
+    def __init__(self):
+        self.docs = {}
+
+    def find_one(self, query, projection=None):
+        return self.docs.get(query["_id"])
+
+    def update_one(self, query, update, upsert=False):
+        self.docs.setdefault(query["_id"], {}).update(update["$set"])
+
+
+def test_each_distinct_mcq_is_sent_to_gemini_once():
+    collection = FakeCollection()
+    verifier = MagicMock(return_value=(False, "C", "A"))
+    service = VerificationService(collection=collection, verifier=verifier)
+
+    assert service.verify("What is the powerhouse of the cell?", OPTIONS, "A") == (False, "C", "A")
+    # Same MCQ with different spacing/case, and a different claimed answer
+    assert service.verify("what is the  powerhouse of the cell? ", OPTIONS, "C") == (True, "C", "C")
+    assert verifier.call_count == 1
+
+    # A new process only has the Mongo collection
+    fresh = VerificationService(collection=collection, verifier=verifier)
+    assert fresh.lookup("What is the powerhouse of the cell?", OPTIONS) == "C"
+    assert verifier.call_count == 1
+
+
+def test_failed_verification_is_not_cached():
+    collection = FakeCollection()
+    verifier = MagicMock(return_value=(None, None, "A"))
+    service = VerificationService(collection=collection, verifier=verifier)
+
+    assert service.verify("Q?", OPTIONS, "A") == (None, None, "A")
+    assert mcq_key("Q?", OPTIONS) not in collection.docs
+    service.verify("Q?", OPTIONS, "A")
+    assert verifier.call_count == 2
@@ -1,7 +1,12 @@
 import time
 import logging
 from database.database import quizzes_collection
-from utils.verification import verify_mcq_with_llm
+from utils.verification_service import (
+    apply_verification,
+    quiz_question_options,
+    verification_service,
+    verify_mcq,
+)
 import os
 import google.generativeai as genai
 
@@ -23,7 +28,7 @@ def verify_quiz_answers_async(quiz_id):
         return
 
     logging.info(f"[VERIFIER] 🔍 Starting verification for Quiz {quiz_id}")
-    updated = False
+    updates = {}
 
     for i, q in enumerate(quiz["questions"]):
         if q.get("is_verified"):
@@ -31,42 +36,31 @@ def verify_quiz_answers_async(quiz_id):
             continue
 
         question_text = q["question_text"]
-        options = {
-            "A": q.get("option1", ""),
-            "B": q.get("option2", ""),
-            "C": q.get("option3", ""),
-            "D": q.get("option4", ""),
-            "E": q.get("option5", ""),
-        }
-        claimed = q.get("correct_answer", "N/A")
+        options = quiz_question_options(q)
+        claimed = q.get("correct_answer", "N/A").split(", ")[0]
 
+        cached = verification_service.lookup(question_text, options) is not None
         logging.info(f"[VERIFIER] Q{i+1}: Verifying '{question_text[:60]}...' Claimed: {claimed}")
 
-        is_correct, verified, claimed_answer = verify_mcq_with_llm(question_text, options, claimed)
-
-        # Always save the claimed answer
-        q["claimed_answer"] = claimed_answer
+        is_correct, verified, claimed_answer = verify_mcq(question_text, options, claimed)
+        changes = apply_verification(q, claimed_answer, is_correct, verified, options)
 
-        if is_correct is False and verified in options:
+        if not changes:
+            logging.warning(f"[VERIFIER] Q{i+1}: ⚠ No verdict yet. Leaving unverified.")
+        elif is_correct is False:
             logging.warning(f"[VERIFIER] Q{i+1}: ❌ Incorrect → Fixing answer: {claimed_answer} → {verified}")
-            q["correct_answer"] = verified
-            q["verified_answer"] = verified
         else:
             logging.info(f"[VERIFIER] Q{i+1}: ✅ Verified as correct.")
-            q["correct_answer"] = claimed_answer
-            q["verified_answer"] = claimed_answer
 
-        q["is_verified"] = True
-        updated = True
+        for field, value in changes.items():
+            updates[f"questions.{i}.{field}"] = value
 
-        # ✅ Delay to stay under Gemini free-tier limit (15 requests/min)
-        if i < len(quiz["questions"]) - 1:
+        # ✅ Delay to stay under Gemini free-tier limit (15 requests/min); cached verdicts cost no request
+        if not cached and i < len(quiz["questions"]) - 1:
             time.sleep(4.1)
 
-    if updated:
-        quizzes_collection.update_one(
-            {"quiz_id": quiz_id}, {"$set": {"questions": quiz["questions"]}}
-        )
+    if updates:
+        quizzes_collection.update_one({"quiz_id": quiz_id}, {"$set": updates})
         logging.info(f"[VERIFIER] ✅ Quiz {quiz_id} verification completed and saved.")
     else:
         logging.info(f"[VERIFIER] 💤 No changes made. All questions were already verified.")
@@ -0,0 +1,155 @@
+# utils/context_retriever.py
+
+import logging
+import os
+import sys
+import threading
+import numpy as np
+from utils.corpus_store import get_corpus_store
+from utils.generated_store import is_generated_id
+from utils.vector_index import unit_rows
+
+# Maximal marginal relevance trade-off: 1.0 ranks by relevance only, 0.0 by novelty only
+CONTEXT_MMR_LAMBDA = float(os.getenv("CONTEXT_MMR_LAMBDA", "0.7"))
+# Nearest neighbours considered per query, as a multiple of top_k
+CONTEXT_CANDIDATE_FACTOR = int(os.getenv("CONTEXT_CANDIDATE_FACTOR", "10"))
+
+# MMR scores lie in [-1, 1], so this penalty per repeated cluster or difficulty ranks every
+# candidate that repeats fewer of them first; MMR only decides among equally diverse ones
+REPEAT_PENALTY = 2.0
+
+CONTEXT_COLUMNS = ("Question Text", "Correct Answer", "Difficulty Level", "Cluster")
+
+
+def _interned(values):
+    return np.array([sys.intern(str(value)) for value in values], dtype=object)
+
+
+def mmr_select(relevance, vectors, clusters, difficulties, top_k, mmr_lambda=CONTEXT_MMR_LAMBDA):
+    """
+    Indices of top_k candidates picked greedily by maximal marginal relevance:
+    mmr_lambda * relevance - (1 - mmr_lambda) * (highest similarity to a candidate already
+    picked), minus REPEAT_PENALTY for a cluster and again for a difficulty already picked.
+    Repeats are penalized rather than forbidden, so top_k candidates are always returned
+    when there are that many. Each step is one vectorized update over all candidates.
+    """
+    count = len(relevance)
+    similarity = vectors @ vectors.T
+
+    redundancy = np.zeros(count, dtype=np.float32)
+    cluster_used = np.zeros(count, dtype=bool)
+    difficulty_used = np.zeros(count, dtype=bool)
+    available = np.ones(count, dtype=bool)
+    picked = []
+    for _ in range(min(top_k, count)):
+        score = (
+            mmr_lambda * relevance
+            - (1 - mmr_lambda) * redundancy
+            - REPEAT_PENALTY * (cluster_used.astype(np.float32) + difficulty_used)
+        )
+        best = int(np.argmax(np.where(available, score, -np.inf)))
+        picked.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, similarity[best])
+        cluster_used |= clusters == clusters[best]
+        difficulty_used |= difficulties == difficulties[best]
+    return np.array(picked, dtype=np.int64)
+
+
+class ContextRetriever:
+    """
+    Picks the context questions for a generation prompt from the seed corpus and the
+    generated-question store.
+
+    The seed dataset is turned into arrays once: interned question and answer strings,
+    int32 cluster ids and int8 difficulty codes, next to the corpus embedding matrix. A query
+    is one FAISS search for top_k * CONTEXT_CANDIDATE_FACTOR neighbours followed by
+    mmr_select() over array slices, with no per-row pandas access. Generated questions count
+    as a cluster of their own each, like in CorpusStore.question_row().
+    """
+
+    def __init__(self, corpus):
+        self.corpus = corpus
+        dataset = corpus.dataset
+        self.questions = _interned(dataset["Question Text"].fillna(""))
+        self.answers = _interned(dataset["Correct Answer"].fillna(""))
+        self.clusters = dataset["Cluster"].to_numpy(dtype=np.int32)
+
+        levels, codes = np.unique(dataset["Difficulty Level"].fillna("").astype(str).str.lower(), return_inverse=True)
+        self.difficulty_levels = [sys.intern(level) for level in levels]
+        self.difficulty_codes = codes.astype(np.int8)
+        self._level_codes = {level: code for code, level in enumerate(self.difficulty_levels)}
+
+    def _difficulty_code(self, level):
+        # Levels the seed dataset does not use all share one code
+        return self._level_codes.get((level or "").lower(), -1)
+
+    def _candidates(self, ids):
+        """Vectors, cluster ids, difficulty codes and column values of the candidate ids."""
+        seed = ids[~np.array([is_generated_id(i) for i in ids], dtype=bool)]
+        vectors = [np.asarray(self.corpus.embeddings[seed], dtype=np.float32)]
+        clusters = [self.clusters[seed]]
+        difficulties = [self.difficulty_codes[seed]]
+        columns = {
+            "Question Text": list(self.questions[seed]),
+            "Correct Answer": list(self.answers[seed]),
+            "Difficulty Level": [self.difficulty_levels[code] for code in self.difficulty_codes[seed]],
+            "Cluster": self.clusters[seed].tolist(),
+        }
+
+        generated = [i for i in ids if is_generated_id(i) and self.corpus.generated.metadata(i) is not None]
+        if generated:
+            vectors.append(self.corpus.generated.vectors(generated))
+            # Negative ids never collide with a seed cluster, so each generated question is its own
+            clusters.append(-np.arange(1, len(generated) + 1, dtype=np.int32))
+            metadata = [self.corpus.generated.metadata(i) for i in generated]
+            difficulties.append(np.array([self._difficulty_code(m.get("difficulty")) for m in metadata], dtype=np.int8))
+            columns["Question Text"] += [m["text"] for m in metadata]
+            columns["Correct Answer"] += [m.get("correct_answer", "") for m in metadata]
+            columns["Difficulty Level"] += [m.get("difficulty") or "" for m in metadata]
+            columns["Cluster"] += [f"generated:{i}" for i in generated]
+
+        order = np.concatenate([seed, np.array(generated, dtype=np.int64)])
+        return order, unit_rows(np.vstack(vectors)), np.concatenate(clusters), np.concatenate(difficulties), columns
+
+    def retrieve(self, query_vector, top_k=3, mmr_lambda=CONTEXT_MMR_LAMBDA):
+        """Column dict (CONTEXT_COLUMNS) of the top_k diverse context questions, most relevant pick first."""
+        total = self.corpus.index.ntotal + self.corpus.generated.ntotal
+        S, I = self.corpus.search_all(query_vector, k=min(top_k * CONTEXT_CANDIDATE_FACTOR, total))
+        hits = I[0] >= 0
+        return self._select(I[0][hits], S[0][hits], top_k, mmr_lambda)
+
+    def retrieve_for_row(self, row, graph, top_k=3, mmr_lambda=CONTEXT_MMR_LAMBDA):
+        """
+        Same as retrieve() for a seed question, with its candidates read from the k-NN graph:
+        no encoding and no search. Like a live search for the question's own embedding, the
+        question itself is the first candidate. Only seed questions are in the graph.
+        """
+        neighbours, similarities = graph.neighbours(row, top_k * CONTEXT_CANDIDATE_FACTOR - 1)
+        ids = np.concatenate([[row], neighbours]).astype(np.int64)
+        return self._select(ids, np.concatenate([[1.0], similarities]), top_k, mmr_lambda)
+
+    def _select(self, candidate_ids, scores, top_k, mmr_lambda):
+        scores = dict(zip(candidate_ids.tolist(), np.asarray(scores).tolist()))
+        ids, vectors, clusters, difficulties, columns = self._candidates(candidate_ids)
+        if not len(ids):
+            return {column: [] for column in CONTEXT_COLUMNS}
+
+        relevance = np.array([scores[i] for i in ids.tolist()], dtype=np.float32)
+        picked = mmr_select(relevance, vectors, clusters, difficulties, top_k, mmr_lambda)
+        return {column: [values[i] for i in picked] for column, values in columns.items()}
+
+
+_context_retriever = None
+_context_retriever_lock = threading.Lock()
+
+
+def get_context_retriever():
+    """Return the process-wide ContextRetriever, building its arrays on first call."""
+    global _context_retriever
+    if _context_retriever is None:
+        with _context_retriever_lock:
+            if _context_retriever is None:
+                _context_retriever = ContextRetriever(get_corpus_store())
+                logging.info(f"🧭 Context retriever ready ({len(_context_retriever.questions)} seed questions)")
+    return _context_retriever
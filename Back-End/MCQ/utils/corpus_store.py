@@ -0,0 +1,196 @@
+# utils/corpus_store.py
+
+import logging
+import os
+import threading
+import faiss
+import numpy as np
+import pandas as pd
+from utils.model_loader import embedding_model
+from utils.generated_store import GeneratedQuestionStore, is_generated_id
+from utils.knn_graph import KNN_GRAPH_PATH, KNNGraph
+from utils.seed_sampler import SeedSampler
+from utils.vector_index import cosine_scores, unit_rows
+
+QUESTION_INDEX_PATH = "dataset/question_embeddings.index"
+QUESTION_EMBEDDINGS_PATH = "dataset/question_embeddings.npy"
+QUESTION_DATASET_PATH = "dataset/question_dataset_with_clusters.csv"
+UNIT_DATASET_PATH = "dataset/unit-wise-dataset/unit_tagged_mcq_dataset.csv"
+UNIT_EMBEDDINGS_PATH = "dataset/unit-wise-dataset/unit_question_embeddings.npy"
+
+# Newer FAISS builds can mmap flat indexes (IO_FLAG_MMAP_IFC); older ones only honour IO_FLAG_MMAP
+FAISS_MMAP_FLAG = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+
+
+class CorpusStore:
+    """
+    Shared, lazily loaded view of the seed question corpus and the unit-wise dataset.
+
+    The seed FAISS index and the embedding matrices are memory-mapped so that several
+    uvicorn workers share the same pages. A memory-mapped index is read-only, so vectors
+    of newly generated questions go into a separate, durable GeneratedQuestionStore.
+    Seed questions keep their dataset row as id; generated ids start at GENERATED_ID_BASE.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._index = None
+        self._embeddings = None
+        self._dataset = None
+        self._generated = None
+        self._seed_sampler = None
+        self._knn_graph = None
+        self._unit_df = None
+        self._unit_embeddings = None
+
+    @property
+    def index(self):
+        """Read-only FAISS index over the seed corpus (row i == dataset row i)."""
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    try:
+                        self._index = faiss.read_index(QUESTION_INDEX_PATH, FAISS_MMAP_FLAG)
+                    except RuntimeError as e:
+                        logging.warning(f"⚠ Could not mmap FAISS index ({e}). Loading into memory instead.")
+                        self._index = faiss.read_index(QUESTION_INDEX_PATH)
+                    logging.info(f"📚 Seed FAISS index loaded ({self._index.ntotal} vectors)")
+        return self._index
+
+    @property
+    def embeddings(self):
+        """Memory-mapped float32 matrix of seed corpus embeddings."""
+        if self._embeddings is None:
+            with self._lock:
+                if self._embeddings is None:
+                    self._embeddings = np.load(QUESTION_EMBEDDINGS_PATH, mmap_mode="r")
+        return self._embeddings
+
+    @property
+    def dataset(self):
+        if self._dataset is None:
+            with self._lock:
+                if self._dataset is None:
+                    self._dataset = pd.read_csv(QUESTION_DATASET_PATH)
+                    logging.info(f"📚 Seed dataset loaded ({len(self._dataset)} questions)")
+        return self._dataset
+
+    @property
+    def knn_graph(self):
+        """
+        Precomputed neighbours of every seed question (see utils/knn_graph.py), or None when
+        the graph file is missing or was built from different embeddings.
+        """
+        if self._knn_graph is None:
+            with self._lock:
+                if self._knn_graph is None:
+                    graph = False
+                    if os.path.exists(KNN_GRAPH_PATH):
+                        graph = KNNGraph.load(KNN_GRAPH_PATH)
+                        if not graph.matches(self.embeddings):
+                            logging.warning("⚠ k-NN graph is out of date; run `python -m utils.knn_graph`. Using live search.")
+                            graph = False
+                    else:
+                        logging.info("ℹ️ No k-NN graph found; context retrieval uses live search")
+                    self._knn_graph = graph
+        return self._knn_graph or None
+
+    @property
+    def seed_sampler(self):
+        """Cluster-stratified sampler of seed questions from the dataset, built on first use."""
+        if self._seed_sampler is None:
+            with self._lock:
+                if self._seed_sampler is None:
+                    dataset = self.dataset
+                    self._seed_sampler = SeedSampler(dataset["Cluster"].to_numpy(), dataset["Question Text"].fillna(""))
+                    logging.info(f"🎯 Seed sampler ready ({len(self._seed_sampler.cluster_ids)} clusters)")
+        return self._seed_sampler
+
+    @property
+    def generated(self):
+        """Durable store of generated-question vectors and metadata, recovered on first use."""
+        if self._generated is None:
+            with self._lock:
+                if self._generated is None:
+                    self._generated = GeneratedQuestionStore(self.index.d)
+        return self._generated
+
+    def add_generated(self, vectors, mcqs, source="generated"):
+        self.generated.add(vectors, mcqs, source)
+
+    def search_all(self, query_vectors, k=5):
+        """
+        Search the seed and generated indexes together and return the k most similar (S, I) per
+        query, where S is cosine similarity (highest first) whatever metric an index was built with.
+        """
+        query_vectors = unit_rows(query_vectors)
+        D, I = self.index.search(query_vectors, k)
+        S = cosine_scores(self.index, D)
+
+        generated_total = self.generated.ntotal
+        if not generated_total:
+            return S, I
+
+        gS, gI = self.generated.search(query_vectors, min(k, generated_total))
+        S = np.concatenate([S, gS], axis=1)
+        I = np.concatenate([I, gI], axis=1)
+        order = np.argsort(-S, axis=1, kind="stable")[:, :k]
+        return np.take_along_axis(S, order, axis=1), np.take_along_axis(I, order, axis=1)
+
+    def question_row(self, question_id):
+        """
+        Seed dataset row or generated-question metadata for an id from search_all, in the seed
+        dataset's column layout. None for ids that are unknown here.
+        """
+        question_id = int(question_id)
+        if is_generated_id(question_id):
+            meta = self.generated.metadata(question_id)
+            if meta is None:
+                return None
+            return {
+                "Question Text": meta["text"],
+                "Correct Answer": meta.get("correct_answer", ""),
+                "Difficulty Level": meta.get("difficulty") or "",
+                "Cluster": f"generated:{question_id}",  # Not clustered; each counts as its own cluster
+                "Source": meta.get("source", "generated"),
+            }
+        if 0 <= question_id < len(self.dataset):
+            return self.dataset.iloc[question_id].to_dict()
+        return None
+
+    @property
+    def unit_df(self):
+        if self._unit_df is None:
+            with self._lock:
+                if self._unit_df is None:
+                    self._unit_df = pd.read_csv(UNIT_DATASET_PATH).fillna("")
+        return self._unit_df
+
+    @property
+    def unit_embeddings(self):
+        """Memory-mapped embeddings of unit_df["Question Text"], built on first use if missing."""
+        if self._unit_embeddings is None:
+            with self._lock:
+                if self._unit_embeddings is None:
+                    if not os.path.exists(UNIT_EMBEDDINGS_PATH):
+                        logging.info("🧠 Encoding unit-wise questions (first run only)...")
+                        vectors = embedding_model.encode(
+                            self.unit_df["Question Text"].tolist(), batch_size=64
+                        ).astype(np.float32)
+                        np.save(UNIT_EMBEDDINGS_PATH, vectors)
+                    self._unit_embeddings = np.load(UNIT_EMBEDDINGS_PATH, mmap_mode="r")
+        return self._unit_embeddings
+
+
+_corpus_store = None
+_corpus_store_lock = threading.Lock()
+
+
+def get_corpus_store():
+    """Return the process-wide CorpusStore, creating it on first call."""
+    global _corpus_store
+    if _corpus_store is None:
+        with _corpus_store_lock:
+            if _corpus_store is None:
+                _corpus_store = CorpusStore()
+    return _corpus_store
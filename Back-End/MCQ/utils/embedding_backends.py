@@ -0,0 +1,205 @@
+# utils/embedding_backends.py
+
+import logging
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+# "torch": sentence-transformers on PyTorch; "onnx": the same model through ONNX Runtime;
+# "onnx_int8": ONNX Runtime with dynamically quantized int8 weights (smaller, faster on CPU)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "model/onnx")
+# ONNX Runtime intra-op threads; kept low so encoding does not take cores from llama.cpp
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "2"))
+
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx_int8")
+
+# all-MiniLM-L6-v2's max_seq_length in sentence-transformers; longer inputs are truncated
+MAX_SEQ_LENGTH = 256
+
+# The seed corpus and its torch embeddings, written row for row by dataset/generate_embeddings.py
+PARITY_DATASET_PATH = "dataset/merged_mcq_dataset.csv"
+PARITY_EMBEDDINGS_PATH = "dataset/question_embeddings.npy"
+
+_export_lock = threading.Lock()
+
+
+def _model_file(filename, directory):
+    """A file of the published model, downloaded into directory unless it is already there."""
+    path = os.path.join(directory, filename)
+    if os.path.exists(path):
+        return path
+    from huggingface_hub import hf_hub_download
+
+    return hf_hub_download(EMBEDDING_MODEL_NAME, filename, local_dir=directory)
+
+
+def onnx_model_files(quantized=False, directory=ONNX_MODEL_DIR):
+    """
+    (model path, tokenizer path) for the ONNX backend. The fp32 graph and tokenizer published
+    with the model are downloaded once (or can be copied into directory for offline hosts);
+    the int8 graph is quantized from the fp32 one locally.
+    """
+    with _export_lock:
+        model_path = _model_file("onnx/model.onnx", directory)
+        tokenizer_path = _model_file("tokenizer.json", directory)
+        if not quantized:
+            return model_path, tokenizer_path
+
+        int8_path = os.path.join(directory, "onnx", "model_int8.onnx")
+        if not os.path.exists(int8_path):
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            logging.info(f"🧮 Quantizing {model_path} to int8 (first run only)...")
+            tmp_path = f"{int8_path}.{os.getpid()}.tmp"
+            quantize_dynamic(model_path, tmp_path, weight_type=QuantType.QInt8)
+            os.replace(tmp_path, int8_path)
+        return int8_path, tokenizer_path
+
+
+class OnnxSentenceEncoder:
+    """
+    all-MiniLM-L6-v2 on ONNX Runtime with the sentence-transformers pipeline around it:
+    WordPiece tokenization truncated to MAX_SEQ_LENGTH, mean pooling over the attention mask
+    and L2 normalization. encode() takes the SentenceTransformer.encode arguments the app uses
+    and returns float32 numpy rows, so it can stand in for the torch model everywhere.
+    """
+
+    def __init__(self, session, tokenizer):
+        self.session = session
+        self.tokenizer = tokenizer
+        self._input_names = {node.name for node in session.get_inputs()}
+        outputs = [node.name for node in session.get_outputs()]
+        self._output_name = "last_hidden_state" if "last_hidden_state" in outputs else outputs[0]
+
+    @classmethod
+    def load(cls, model_path, tokenizer_path, threads=EMBEDDING_THREADS, max_seq_length=MAX_SEQ_LENGTH):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+
+        tokenizer = Tokenizer.from_file(tokenizer_path)
+        tokenizer.enable_truncation(max_seq_length)
+        tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+        return cls(session, tokenizer)
+
+    def get_sentence_embedding_dimension(self):
+        return self.session.get_outputs()[0].shape[-1]
+
+    def _encode_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feed = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": mask,
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        feed = {name: value for name, value in feed.items() if name in self._input_names}
+        tokens = self.session.run([self._output_name], feed)[0]
+
+        # Mean over real tokens only, as the model's sentence-transformers Pooling module does
+        weights = mask[:, :, None].astype(np.float32)
+        return (tokens * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+
+    def encode(self, sentences, batch_size=32, convert_to_tensor=False, **kwargs):
+        """
+        Unit-length float32 embeddings, shape (n, d), or (d,) for a single string. Other
+        SentenceTransformer.encode options (normalize_embeddings, show_progress_bar, ...)
+        are accepted and ignored: this model's output is always normalized.
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.empty((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+
+        # Longest first, so every batch pads to a similar length
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        vectors = None
+        for start in range(0, len(texts), batch_size):
+            rows = order[start:start + batch_size]
+            pooled = self._encode_batch([texts[i] for i in rows])
+            if vectors is None:
+                vectors = np.empty((len(texts), pooled.shape[1]), dtype=np.float32)
+            vectors[rows] = pooled
+
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+        if convert_to_tensor:
+            import torch
+
+            vectors = torch.from_numpy(vectors)
+        return vectors[0] if single else vectors
+
+
+def load_embedding_backend(backend=EMBEDDING_BACKEND, threads=EMBEDDING_THREADS):
+    """The local embedding model for the given backend; threads only applies to ONNX Runtime."""
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+
+        return SentenceTransformer("all-MiniLM-L6-v2")
+
+    if backend in ("onnx", "onnx_int8"):
+        model_path, tokenizer_path = onnx_model_files(quantized=backend == "onnx_int8")
+        logging.info(f"🧠 Embedding model on ONNX Runtime: {model_path} ({threads} threads)")
+        return OnnxSentenceEncoder.load(model_path, tokenizer_path, threads=threads)
+
+    raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend} (expected one of {EMBEDDING_BACKENDS})")
+
+
+# ---------- parity with the torch embeddings ----------
+
+def load_parity_corpus(dataset_path=PARITY_DATASET_PATH, embeddings_path=PARITY_EMBEDDINGS_PATH):
+    """
+    The seed-corpus texts exactly as dataset/generate_embeddings.py combined them, and the
+    torch embeddings it stored for them in the same row order.
+    """
+    dataset = pd.read_csv(dataset_path, encoding="latin1").fillna("")
+    texts = (
+        dataset["Question Text"] + " " +
+        dataset["Option 1"] + " " +
+        dataset["Option 2"] + " " +
+        dataset["Option 3"] + " " +
+        dataset["Option 4"] + " " +
+        dataset["Option 5"] + " " +
+        "Correct Answer: " + dataset["Correct Answer"]
+    ).tolist()
+    return texts, np.load(embeddings_path).astype(np.float32)
+
+
+def embedding_parity(reference, candidate, thresholds=(0.65, 0.85)):
+    """
+    How closely candidate embeddings reproduce reference ones (same texts, same row order):
+    row-wise cosine agreement, how often each row's nearest other row is the same, and, per
+    duplicate threshold, how often the "has a duplicate in the corpus" decision is the same
+    and how many pairs cross the threshold in one model but not the other.
+    """
+    reference = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    candidate = candidate / np.linalg.norm(candidate, axis=1, keepdims=True)
+    cosine = (reference * candidate).sum(axis=1)
+
+    reference_sim = reference @ reference.T
+    candidate_sim = candidate @ candidate.T
+    np.fill_diagonal(reference_sim, -1.0)
+    np.fill_diagonal(candidate_sim, -1.0)
+
+    report = {
+        "mean_cosine": round(float(cosine.mean()), 6),
+        "min_cosine": round(float(cosine.min()), 6),
+        "nearest_neighbour_agreement": round(float(np.mean(
+            reference_sim.argmax(axis=1) == candidate_sim.argmax(axis=1)
+        )), 4),
+    }
+    upper = np.triu_indices(len(reference), k=1)
+    for threshold in thresholds:
+        report[f"duplicate_agreement@{threshold}"] = round(float(np.mean(
+            (reference_sim.max(axis=1) >= threshold) == (candidate_sim.max(axis=1) >= threshold)
+        )), 4)
+        report[f"flipped_pairs@{threshold}"] = int(np.sum(
+            (reference_sim[upper] >= threshold) != (candidate_sim[upper] >= threshold)
+        ))
+    return report
@@ -0,0 +1,157 @@
+# utils/embedding_batcher.py
+
+import os
+import threading
+import time
+from collections import deque
+from utils.llm_scheduler import _Timings
+
+# A forward pass starts once this many texts are waiting, or once the oldest waiting call is
+# EMBEDDING_MAX_WAIT_MS old. 0 ms never delays a call: only the calls that queued up while
+# the previous forward pass ran are batched together.
+EMBEDDING_MAX_BATCH = int(os.getenv("EMBEDDING_MAX_BATCH", "64"))
+EMBEDDING_MAX_WAIT_MS = float(os.getenv("EMBEDDING_MAX_WAIT_MS", "5"))
+
+# Upper bounds of the batch-size histogram buckets (texts per forward pass)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class _Request:
+    def __init__(self, texts, kwargs):
+        self.texts = texts
+        self.kwargs = kwargs
+        self.options = tuple(sorted(kwargs.items()))
+        self.enqueued_at = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatchingEncoder:
+    """
+    Wraps the embedding model so that encode() calls arriving concurrently from the
+    threadpool share one forward pass. Callers block until a worker thread has run the
+    batch and then get back only their own rows.
+
+    Calls are served in arrival order. The worker takes the oldest waiting call, waits up
+    to max_wait_ms for more to arrive unless max_batch_size texts are already waiting, and
+    then merges every waiting call with the same encode options up to max_batch_size texts.
+    A call larger than max_batch_size still runs, as a batch of its own. Other attributes
+    pass through to the model.
+    """
+
+    def __init__(self, model, max_batch_size=EMBEDDING_MAX_BATCH, max_wait_ms=EMBEDDING_MAX_WAIT_MS):
+        self._model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._cond = threading.Condition()
+        self._pending = deque()
+        self._pending_texts = 0
+        self._worker = None
+
+        self._batch_sizes = {bound: 0 for bound in BATCH_SIZE_BUCKETS}
+        self._stats = {"requests": 0, "texts": 0, "batches": 0, "forward_seconds": 0.0}
+        self._queue_wait = _Timings()
+        self._forward_time = _Timings()
+
+    def encode(self, texts, **kwargs):
+        if isinstance(texts, str) or threading.current_thread() is self._worker:
+            return self._model.encode(texts, **kwargs)
+
+        request = _Request(list(texts), kwargs)
+        with self._cond:
+            self._pending.append(request)
+            self._pending_texts += len(request.texts)
+            self._ensure_worker()
+            self._cond.notify_all()
+
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+            self._worker.start()
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+
+            deadline = self._pending[0].enqueued_at + self.max_wait
+            while self._pending_texts < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            head = self._pending.popleft()
+            batch, size = [head], len(head.texts)
+            for request in list(self._pending):
+                if size + len(request.texts) > self.max_batch_size:
+                    break
+                if request.options == head.options:
+                    self._pending.remove(request)
+                    batch.append(request)
+                    size += len(request.texts)
+            self._pending_texts -= size
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            texts = [text for request in batch for text in request.texts]
+
+            started = time.perf_counter()
+            try:
+                vectors = self._model.encode(texts, **batch[0].kwargs) if texts else []
+            except BaseException as e:
+                for request in batch:
+                    request.error = e
+            else:
+                offset = 0
+                for request in batch:
+                    request.result = vectors[offset:offset + len(request.texts)]
+                    offset += len(request.texts)
+            finally:
+                seconds = time.perf_counter() - started
+                self._record(batch, len(texts), started, seconds)
+                for request in batch:
+                    request.done.set()
+
+    def _record(self, batch, size, started, seconds):
+        with self._cond:
+            self._stats["requests"] += len(batch)
+            self._stats["texts"] += size
+            self._stats["batches"] += 1
+            self._stats["forward_seconds"] += seconds
+            bound = next((b for b in BATCH_SIZE_BUCKETS if size <= b), BATCH_SIZE_BUCKETS[-1])
+            self._batch_sizes[bound] += 1
+            for request in batch:
+                self._queue_wait.add(started - request.enqueued_at)
+            self._forward_time.add(seconds)
+
+    def metrics(self):
+        with self._cond:
+            stats = dict(self._stats)
+            seconds = stats["forward_seconds"]
+            return {
+                **stats,
+                "forward_seconds": round(seconds, 3),
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+                "pending_texts": self._pending_texts,
+                "mean_batch_size": round(stats["texts"] / stats["batches"], 2) if stats["batches"] else 0.0,
+                "texts_per_forward_second": round(stats["texts"] / seconds, 1) if seconds else 0.0,
+                # Last bucket also counts calls larger than its bound
+                "batch_size_histogram": {f"<={bound}": count for bound, count in self._batch_sizes.items()},
+                "queue_wait": self._queue_wait.summary(),
+                "forward_time": self._forward_time.summary(),
+            }
+
+    def __getattr__(self, item):
+        if item.startswith("_"):
+            raise AttributeError(item)
+        return getattr(self._model, item)
@@ -0,0 +1,222 @@
+# utils/embedding_cache.py
+
+import contextlib
+import fcntl
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+from utils.model_loader import embedding_model
+
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "20000"))
+# Optional on-disk float16 tier for generated questions, e.g. "model/embedding_cache" (git-ignored)
+EMBEDDING_DISK_CACHE_PATH = os.getenv("EMBEDDING_DISK_CACHE_PATH")
+
+
+def text_key(text):
+    """Cache key for a text. all-MiniLM-L6-v2 lowercases its input, so case and spacing are ignored."""
+    normalized = " ".join(str(text).lower().split())
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class DiskEmbeddingTier:
+    """
+    Append-only float16 embedding store shared by every worker process: <path>.f16 holds the
+    vectors row by row and <path>.keys a "dim=<n>" header followed by one text key per line,
+    so the n-th key names row n.
+
+    Appends hold an exclusive lock on <path>.lock. Under it the writer first reads keys other
+    processes appended, trims vector bytes no key refers to (a writer that crashed midway),
+    and only then appends, so rows always follow the keys file. Vectors are written before
+    their keys; a lookup that misses re-reads keys appended since the last read. Vectors are
+    read through a read-only memmap that is reopened when rows have been appended since it
+    was mapped.
+    """
+
+    def __init__(self, path):
+        self.dim = None
+        self._vectors_path = f"{path}.f16"
+        self._keys_path = f"{path}.keys"
+        self._lock_path = f"{path}.lock"
+        self._lock = threading.Lock()
+        self._rows = {}
+        self._count = 0  # keys read so far, i.e. rows known to hold a vector
+        self._keys_offset = 0  # bytes of the keys file read so far
+        self._map = None
+
+        os.makedirs(os.path.dirname(self._vectors_path) or ".", exist_ok=True)
+        self._read_new_keys()
+        if self._count:
+            logging.info(f"💾 Embedding disk cache: {self._count} vectors in {self._vectors_path}")
+
+    def __len__(self):
+        return len(self._rows)
+
+    @contextlib.contextmanager
+    def _file_lock(self):
+        with open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_new_keys(self):
+        """Pick up complete key lines appended (by any process) since the last read."""
+        try:
+            if os.path.getsize(self._keys_path) <= self._keys_offset:
+                return
+        except OSError:
+            return
+        with open(self._keys_path, "rb") as f:
+            f.seek(self._keys_offset)
+            data = f.read()
+        complete = data[: data.rfind(b"\n") + 1]  # a line still being written is read next time
+        self._keys_offset += len(complete)
+
+        for line in complete.decode("utf-8").splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            if self.dim is None:
+                self.dim = int(line.split("=", 1)[1])
+                continue
+            self._rows.setdefault(line, self._count)
+            self._count += 1
+
+    def get(self, key):
+        with self._lock:
+            row = self._rows.get(key)
+            if row is None:
+                self._read_new_keys()
+                row = self._rows.get(key)
+                if row is None:
+                    return None
+            if self._map is None or row >= self._map.shape[0]:
+                self._map = np.memmap(self._vectors_path, dtype=np.float16, mode="r", shape=(self._count, self.dim))
+            return np.asarray(self._map[row], dtype=np.float32)
+
+    def put_many(self, keys, vectors):
+        if not len(keys):
+            return
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock, self._file_lock():
+            self._read_new_keys()
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                with open(self._keys_path, "w") as f:
+                    f.write(f"dim={self.dim}\n")
+                self._keys_offset = os.path.getsize(self._keys_path)
+
+            new = {}
+            for key, vector in zip(keys, vectors):
+                if key not in self._rows:
+                    new.setdefault(key, vector)
+            if not new:
+                return
+            with open(self._vectors_path, "ab") as f:
+                f.truncate(self._count * self.dim * 2)
+                f.write(np.asarray(list(new.values()), dtype=np.float16).tobytes())
+            with open(self._keys_path, "a") as f:
+                f.write("".join(f"{key}\n" for key in new))
+            self._read_new_keys()
+
+
+class EmbeddingCache:
+    """
+    Bounded LRU of sentence embeddings keyed by text_key(), in front of the embedding model.
+
+    encode() returns float32 vectors in input order and sends only the texts it has not seen
+    to the model, in one batch. With persist=True (generated questions) the vectors are also
+    written to the optional disk tier, so they survive restarts.
+    """
+
+    def __init__(self, model=embedding_model, max_entries=EMBEDDING_CACHE_SIZE, disk_path=EMBEDDING_DISK_CACHE_PATH):
+        self._model = model
+        self._max_entries = max_entries
+        self._disk_path = disk_path
+        self._disk = None
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._max_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _disk_tier(self):
+        """Open the disk tier on first use, so importing this module does no file I/O."""
+        if self._disk is None and self._disk_path:
+            with self._lock:
+                if self._disk is None:
+                    self._disk = DiskEmbeddingTier(self._disk_path)
+        return self._disk
+
+    def encode(self, texts, persist=False, **kwargs):
+        texts = list(texts)
+        keys = [text_key(text) for text in texts]
+        found = {}
+
+        with self._lock:
+            for key in keys:
+                if key in self._memory and key not in found:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+                    self._stats["hits"] += 1
+
+        disk = self._disk_tier()
+        if disk is not None and len(found) < len(keys):
+            for key in keys:
+                if key not in found:
+                    vector = disk.get(key)
+                    if vector is not None:
+                        found[key] = vector
+                        with self._lock:
+                            self._stats["disk_hits"] += 1
+                            self._remember(key, vector)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+
+        if missing:
+            vectors = np.asarray(self._model.encode(list(missing.values()), **kwargs), dtype=np.float32)
+            with self._lock:
+                for key, vector in zip(missing, vectors):
+                    vector.setflags(write=False)
+                    found[key] = vector
+                    self._remember(key, vector)
+                    self._stats["misses"] += 1
+
+        if persist and disk is not None:
+            # Also covers texts first embedded without persist (e.g. by a similarity check)
+            disk.put_many(list(found), list(found.values()))
+
+        if not keys:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.stack([found[key] for key in keys])
+
+    def encode_one(self, text, persist=False):
+        return self.encode([text], persist=persist)[0]
+
+    def metrics(self):
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["disk_hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "entries": len(self._memory),
+                "max_entries": self._max_entries,
+                "hit_ratio": (
+                    round((self._stats["hits"] + self._stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+                ),
+                "disk_entries": len(self._disk) if self._disk is not None else 0,
+            }
+
+
+embedding_cache = EmbeddingCache()
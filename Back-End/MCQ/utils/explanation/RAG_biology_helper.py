@@ -4,6 +4,7 @@ import os
 import pandas as pd
 import torch
 import faiss
+from utils.embedding_cache import embedding_cache
 from utils.model_loader import embedding_model
 
 DATASET_PATH = "dataset/explanation/syllubus_dataset.csv"
@@ -50,8 +51,8 @@ class RAGBiology:
         if not query.strip():
             return []
 
-        query_emb = self.model.encode([query], convert_to_tensor=True, normalize_embeddings=True)
-        query_np = query_emb.cpu().numpy().astype("float32")
+        # all-MiniLM-L6-v2 already returns unit-length vectors, so cached ones work with the IP index
+        query_np = embedding_cache.encode([query])
         D, I = self.index.search(query_np, top_k)
 
         all_texts = self.df.iloc[I[0]]["Text Content"].tolist()
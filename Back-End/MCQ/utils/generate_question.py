@@ -1,37 +1,111 @@
 import requests
 import logging
-import faiss
-import numpy as np
-import pandas as pd
 import time
 import os
 from dotenv import load_dotenv
-from utils.text_extraction import extract_mcqs
+from utils.text_extraction import extract_mcqs, IncrementalMCQParser
 from utils.quiz_generation_methods import (
     assign_difficulty_parameter,
     assign_discrimination_parameter,
     retrieve_context_questions,
-    is_similar_to_same_quiz_questions,
-    is_similar_to_past_quiz_questions,
-    is_duplicate_faiss,
-    clean_correct_answer,
 )
 from routes.response_routes import estimate_student_ability
-from utils.model_loader import embedding_model, llm
-from sklearn.metrics.pairwise import cosine_similarity
-from utils.verification import verify_mcq_with_llm
+from utils.embedding_cache import embedding_cache
+from utils.model_loader import llm
+from utils.model_profiles import LLM_CONTEXT_TOKENS
+from utils.corpus_store import get_corpus_store
+from utils.llm_scheduler import LLMQueueFullError
+from utils.mcq_grammar import get_mcq_grammar, parse_grammar_mcqs
+from utils.mcq_prompts import build_mcq_prompt, format_context_questions
+from utils.generation_metrics import generation_stats
+from utils.mcq_filters import CandidateFilter
 from utils.answer_verifier import generate_mcq_with_gemini
 
 load_dotenv()
 
-# Load FAISS index and dataset
-index = faiss.read_index("dataset/question_embeddings.index")
-embeddings_matrix = np.load("dataset/question_embeddings.npy")
-dataset = pd.read_csv("dataset/question_dataset_with_clusters.csv")
-
-
-def build_llama2_chat_prompt(instruction: str) -> str:
-    return f"<s>[INST] {instruction.strip()} [/INST]"
+# "freetext": regex parsing of the raw output (default); "grammar" (opt-in): constrain decoding with a
+# GBNF grammar so every output parses. Compare both via accepted MCQs per decode second on /metrics
+MCQ_GENERATION_MODE = os.getenv("MCQ_GENERATION_MODE", "freetext").lower()
+# Free-text mode streams tokens through the parser and stops decoding once enough MCQs are complete;
+# "off" keeps decoding to max_tokens (still streamed, so the wasted tokens can be measured)
+MCQ_STREAM_EARLY_STOP = os.getenv("MCQ_STREAM_EARLY_STOP", "on").lower() != "off"
+
+
+def stream_freetext_mcqs(prompt, remaining, kwargs):
+    """
+    Decode with stream=True, feeding each chunk to the incremental parser.
+    Returns (raw_output, extracted_mcqs, decoded_tokens, wasted_tokens, stopped_early).
+    """
+    parser = IncrementalMCQParser()
+    pieces = []
+    decoded_tokens = 0
+    tokens_at_last_mcq = 0
+    stopped_early = False
+
+    stream = llm(prompt, stream=True, **kwargs)
+    try:
+        for chunk in stream:
+            choices = chunk.get("choices") or []
+            if not choices:
+                continue
+            text = choices[0].get("text", "")
+            decoded_tokens += 1  # llama.cpp streams one chunk per sampled token
+            pieces.append(text)
+
+            complete_before = parser.complete_count()
+            parser.feed(text)
+            if parser.complete_count() > complete_before:
+                tokens_at_last_mcq = decoded_tokens
+                if MCQ_STREAM_EARLY_STOP and parser.complete_count() >= remaining:
+                    stopped_early = True
+                    break
+    finally:
+        stream.close()
+
+    wasted_tokens = decoded_tokens - tokens_at_last_mcq
+    return "".join(pieces), parser.close(), decoded_tokens, wasted_tokens, stopped_early
+
+
+def decode_mcqs(prompt, remaining, max_tokens):
+    """
+    Run one LLM decode in the configured generation mode and parse the MCQs out of it.
+    Returns (mode, decode_seconds, raw_output, extracted_mcqs); raw_output is None if the model returned nothing.
+    """
+    grammar = get_mcq_grammar(remaining) if MCQ_GENERATION_MODE == "grammar" else None
+    mode = "grammar" if grammar is not None else "freetext"
+
+    kwargs = {"max_tokens": max_tokens, "temperature": 0.8, "top_p": 0.95}
+    if grammar is not None:
+        kwargs["grammar"] = grammar
+
+    started = time.perf_counter()
+    if grammar is None:
+        raw_output, extracted_mcqs, decoded, wasted, stopped_early = stream_freetext_mcqs(
+            prompt, remaining, kwargs
+        )
+        decode_seconds = time.perf_counter() - started
+        generation_stats.record_tokens(mode, decoded, wasted, stopped_early)
+
+        if not decoded:
+            logging.error("⚠ Model stream returned no tokens.")
+            generation_stats.record(mode, decode_seconds, extracted=0)
+            return mode, decode_seconds, None, []
+        return mode, decode_seconds, raw_output, extracted_mcqs
+
+    output = llm(prompt, **kwargs)
+    decode_seconds = time.perf_counter() - started
+
+    if "choices" not in output or not output["choices"]:
+        logging.error("⚠ Model output missing 'choices'. Full output: %s", output)
+        generation_stats.record(mode, decode_seconds, extracted=0)
+        return mode, decode_seconds, None, []
+
+    raw_output = output["choices"][0]["text"]
+    extracted_mcqs = parse_grammar_mcqs(raw_output)
+    # The grammar ends right after the last requested question, so only unparseable output is wasted
+    decoded = output.get("usage", {}).get("completion_tokens", 0)
+    generation_stats.record_tokens(mode, decoded, 0 if extracted_mcqs else decoded)
+    return mode, decode_seconds, raw_output, extracted_mcqs
 
 
 mcq_cache = {}
@@ -40,73 +114,47 @@ mcq_cache = {}
 # Method to generate MCQs with unique context
 def generate_mcq(difficulty, user_id, max_retries=3, existing_questions=None):
     """Generates up to 3 unique MCQs in one API call and returns a list of valid MCQs."""
+    return list(iter_generate_mcq(difficulty, user_id, max_retries, existing_questions))
+
+
+def iter_generate_mcq(difficulty, user_id, max_retries=3, existing_questions=None, assign_irt=True):
+    """
+    Same as generate_mcq, but yields each MCQ as soon as it has passed every check.
+    existing_questions is the quiz's QuizSimilarityContext (a set of question texts also works).
+    With assign_irt=False the b/a parameters are left for the caller (user_id is then not a real user).
+    """
     retries = 0
-    batch_generated_questions = set()
     valid_mcqs = []
     logging.info(f"Attempting to generate MCQs for difficulty: {difficulty}")
 
-    if existing_questions is None:
-        existing_questions = set()
+    candidates = CandidateFilter(existing_questions)
+
+    corpus = get_corpus_store()
+    dataset = corpus.dataset
 
     while retries < max_retries and len(valid_mcqs) < 3:
         try:
             #  Check if dataset is empty before sampling
             if dataset.empty:
                 logging.error("ERROR: Dataset is empty. Cannot generate MCQ.")
-                return []
-
-            sampled_question = dataset.groupby("Cluster").sample(1)
-
-            if sampled_question.empty:
-                logging.error("ERROR: No questions available in dataset. Retrying...")
-                retries += 1
-                continue
+                return
 
-            random_question = sampled_question.iloc[0]["Question Text"]
-            context_questions = retrieve_context_questions(random_question, top_k=3)
+            seed_row = corpus.seed_sampler.sample_row(user_id)
+            random_question = corpus.seed_sampler.questions[seed_row]
+            context_questions = retrieve_context_questions(random_question, top_k=3, seed_row=seed_row)
 
             # Construct context-based prompt
-            context_list = [
-                f"- {row['Question Text']} (Correct Answer: {row['Correct Answer']})"
-                for _, row in context_questions.iterrows()
-            ] if not context_questions.empty else []
+            context_list = format_context_questions(context_questions)
 
             remaining = 3 - len(valid_mcqs)
 
-            instruction = f"""
-            Generate {remaining} **{difficulty}** level multiple-choice biology question{'s' if remaining > 1 else ''}.
-
-            Each question must follow this format:
-
-            Question 1: <Insert your question>
-            A) <Option A>
-            B) <Option B>
-            C) <Option C>
-            D) <Option D>
-            E) <Option E>
-            Correct Answer: <A/B/C/D/E>
-
-            Do not include explanations, numbering, answer keys, or extra text.
-            """
-
-            #  Add context if available
-            if context_list:
-                context_block = "\n".join(context_list)
-                prompt = f"""
-                Generate a {difficulty}** level MCQ that is **different** from these:
-
-                {context_block}
-
-                **Follow This Format exactly:**
-                {instruction.strip()}
-                """
-            prompt = build_llama2_chat_prompt(instruction)
+            prompt = build_mcq_prompt(remaining, difficulty, context_list)
 
             #  Send API request (Improved Error Handling)
             try:
                 # Calculate prompt token length
                 prompt_tokens = len(llm.tokenize(prompt.encode("utf-8")))
-                max_total_tokens = 2048
+                max_total_tokens = LLM_CONTEXT_TOKENS
                 adjusted_max_tokens = min(
                     768, max_total_tokens - prompt_tokens - 10
                 )  # Ensure room to generate
@@ -116,17 +164,13 @@ def generate_mcq(difficulty, user_id, max_retries=3, existing_questions=None):
                     retries += 1
                     continue
 
-                output = llm(
-                    prompt, max_tokens=adjusted_max_tokens, temperature=0.8, top_p=0.95
+                mode, decode_seconds, raw_output, extracted_mcqs = decode_mcqs(
+                    prompt, remaining, adjusted_max_tokens
                 )
-                if "choices" not in output or not output["choices"]:
-                    logging.error(
-                        "⚠ Model output missing 'choices'. Full output: %s", output
-                    )
+                if raw_output is None:
                     retries += 1
                     continue
 
-                raw_output = output["choices"][0]["text"]
                 logging.warning(f"⚠ RAW LOCAL MODEL RESPONSE: {raw_output}")
 
             except (requests.exceptions.RequestException, ValueError) as e:
@@ -135,231 +179,123 @@ def generate_mcq(difficulty, user_id, max_retries=3, existing_questions=None):
                 time.sleep(1)
                 continue
 
-            extracted_mcqs = extract_mcqs(prompt, raw_output)
-
             if not extracted_mcqs:
+                generation_stats.record(mode, decode_seconds, extracted=0)
                 retries += 1
                 logging.warning("⚠ No valid MCQs extracted. Retrying...")
                 continue
 
-            for question_data in extracted_mcqs:
-                question_text = question_data.get("question", "").strip()
-                # Duplicate checks
-                if (
-                    not question_text
-                    or is_duplicate_faiss(question_text, index, 0.85)
-                    or is_similar_to_same_quiz_questions(
-                        question_text, batch_generated_questions, threshold=0.85
-                    )
-                    or question_text in batch_generated_questions
-                    or question_text in existing_questions
-                ):
-                    continue
+            accepted_before = len(valid_mcqs)
 
-                options = question_data.get("options", {})
-                correct_letters = clean_correct_answer(
-                    question_data.get("correct_answer", "")
-                )
-                question_data["correct_answer"] = ", ".join(
-                    correct_letters
-                )  # For consistent formatting
-
-                # Validation checks
-                if any(
-                    [
-                        "error" in question_data,
-                        "Question" in question_text,
-                        "<Insert your question>" in question_text,
-                        "Generate a" in question_text,
-                        len(options) != 5,
-                        any(not opt.strip() for opt in options.values()),
-                        len(set(options.values())) < 5,
-                        not correct_letters,
-                        any(letter not in options for letter in correct_letters),
-                    ]
-                ):
-                    continue
+            for question_data in candidates.accept_batch(extracted_mcqs):
+                question_text = question_data["question"]
 
                 #  Add difficulty level
                 question_data["difficulty"] = difficulty
 
                 #  Assign difficulty parameters
-                question_data["b"] = assign_difficulty_parameter(user_id, difficulty)
-                question_data["a"] = assign_discrimination_parameter()
+                if assign_irt:
+                    question_data["b"] = assign_difficulty_parameter(user_id, difficulty)
+                    question_data["a"] = assign_discrimination_parameter()
                 question_data["c"] = 0.2
 
-                claimed_answer = correct_letters[0] if correct_letters else None
-
-                # Perform answer verification
-                is_correct, verified, claimed = verify_mcq_with_llm(
-                    question_data["question"], options, claimed_answer
-                )
-
-                question_data["claimed_answer"] = (
-                    claimed  # Store original generated answer
-                )
-
-                if is_correct is False and verified in options:
-                    question_data["correct_answer"] = verified
-                    question_data["verified_answer"] = verified
-                    question_data["is_verified"] = True
-                elif is_correct is True:
-                    question_data["correct_answer"] = claimed
-                    question_data["verified_answer"] = claimed
-                    question_data["is_verified"] = True
-                else:
-                    question_data["verified_answer"] = None
-                    question_data["correct_answer"] = claimed
-                    question_data["is_verified"] = False
-
                 #  Store in FAISS
-                new_vector = embedding_model.encode([question_text]).astype(np.float32)
-                index.add(new_vector)
+                new_vector = embedding_cache.encode([question_text], persist=True)
+                corpus.add_generated(new_vector, [question_data])
 
-                batch_generated_questions.add(question_text)
+                candidates.add(question_text, new_vector[0])
                 valid_mcqs.append(question_data)
+                yield question_data
 
                 if len(valid_mcqs) >= 3:
                     break
 
+            generation_stats.record(
+                mode, decode_seconds, len(extracted_mcqs), len(valid_mcqs) - accepted_before
+            )
+
             if len(valid_mcqs) < 3:
                 retries += 1
                 logging.warning(
                     f"⚠ Still need {3 - len(valid_mcqs)} MCQs. Retrying... ({retries}/{max_retries})"
                 )
 
+        except LLMQueueFullError:
+            raise
         except Exception as e:
             logging.error(f"⚠ Unexpected Error: {e}")
             retries += 1
 
-    return valid_mcqs
-
 
 def generate_mcq_based_on_performance(
     user_id, difficulty, max_retries=5, existing_questions=None, past_embeddings=None
 ):
     """Generate up to 3 MCQs based on user's performance, minimizing retries by accepting partial results."""
+    return list(
+        iter_generate_mcq_based_on_performance(
+            user_id, difficulty, max_retries, existing_questions, past_embeddings
+        )
+    )
+
+
+def iter_generate_mcq_based_on_performance(
+    user_id, difficulty, max_retries=5, existing_questions=None, past_embeddings=None
+):
+    """Same as generate_mcq_based_on_performance, but yields each MCQ as soon as it is accepted."""
     retries = 0
-    batch_generated_questions = set()
     valid_mcqs = []
-    existing_questions = existing_questions or set()
+    candidates = CandidateFilter(
+        existing_questions, user_id=user_id, past_embeddings=past_embeddings, check_past_quizzes=True
+    )
 
     theta = estimate_student_ability(user_id) or 0.0
     used_prompt = None  # to reuse in fallback
 
+    corpus = get_corpus_store()
+    dataset = corpus.dataset
+
     while retries < max_retries and len(valid_mcqs) < 3:
         try:
             logging.info(f"🔁 Retry {retries + 1}/{max_retries} — Generating {difficulty}-level MCQ for user {user_id} (Theta: {theta})")
 
             if dataset.empty:
                 logging.error("Dataset is empty. Cannot generate MCQs.")
-                return valid_mcqs
+                return
 
-            sampled_question = dataset.groupby("Cluster").sample(1)
+            seed_row = corpus.seed_sampler.sample_row(user_id)
+            random_question = corpus.seed_sampler.questions[seed_row]
+            context_questions = retrieve_context_questions(random_question, top_k=3, seed_row=seed_row)
 
-            if sampled_question.empty:
-                logging.error("ERROR: No questions available in dataset. Retrying...")
-                retries += 1
-                continue
-
-            random_question = sampled_question.iloc[0]["Question Text"]
-            context_questions = retrieve_context_questions(random_question, top_k=3)
-
-            context_list = [
-                f"- {row['Question Text']} (Correct Answer: {row['Correct Answer']})"
-                for _, row in context_questions.iterrows()
-            ] if not context_questions.empty else []
+            context_list = format_context_questions(context_questions)
 
             remaining = 3 - len(valid_mcqs)
-            instruction = f"""
-            Generate {remaining} **{difficulty}** level multiple-choice biology question{'s' if remaining > 1 else ''}.
-            
-            **User's Estimated Ability Level (IRT Theta):** {theta}
-            
-            Each question must follow this format:
-
-            Question 1: <Insert your question>
-            A) <Option A>
-            B) <Option B>
-            C) <Option C>
-            D) <Option D>
-            E) <Option E>
-            Correct Answer: <A/B/C/D/E>
-
-            Do not include explanations, numbering, answer keys, or extra text.
-            """
-
-            if context_list:
-                context_block = "\n".join(context_list)
-                instruction = f"""
-                Generate a **{difficulty}** level MCQ that is **different** from these:
-
-                {context_block}
-
-                **Follow This Format exactly:**
-                {instruction.strip()}
-                """
-
-            prompt = build_llama2_chat_prompt(instruction)
+            prompt = build_mcq_prompt(remaining, difficulty, context_list, theta=theta)
             used_prompt = prompt  
 
             prompt_tokens = len(llm.tokenize(prompt.encode("utf-8")))
-            adjusted_max_tokens = min(768, 2048 - prompt_tokens - 10)
+            adjusted_max_tokens = min(768, LLM_CONTEXT_TOKENS - prompt_tokens - 10)
             if adjusted_max_tokens <= 0:
                 retries += 1
                 continue
 
-            output = llm(prompt, max_tokens=adjusted_max_tokens, temperature=0.8, top_p=0.95)
-            if "choices" not in output or not output["choices"]:
+            mode, decode_seconds, raw_output, extracted_mcqs = decode_mcqs(
+                prompt, remaining, adjusted_max_tokens
+            )
+            if raw_output is None:
                 retries += 1
                 continue
 
-            raw_output = output["choices"][0]["text"]
             logging.info(f"⚠ RAW LOCAL MODEL RESPONSE: {raw_output}")
 
-            extracted_mcqs = extract_mcqs(prompt, raw_output)
-
             if not extracted_mcqs:
+                generation_stats.record(mode, decode_seconds, extracted=0)
                 retries += 1
                 logging.warning("⚠ No valid MCQs extracted. Retrying...")
                 continue
 
             added = 0
-            for mcq in extracted_mcqs:
-                question = mcq.get("question", "").strip()
-                options = mcq.get("options", {})
-                correct_letters = clean_correct_answer(mcq.get("correct_answer", ""))
-                claimed_answer = correct_letters[0] if correct_letters else None
-                mcq["correct_answer"] = ", ".join(correct_letters)
-
-                is_correct, verified, claimed = verify_mcq_with_llm(
-                    question, options, claimed_answer
-                )
-                mcq["claimed_answer"] = claimed
-                mcq["correct_answer"] = verified if not is_correct and verified in options else claimed
-                mcq["verified_answer"] = verified if is_correct else None
-                mcq["is_verified"] = is_correct is not None
-
-                if any([
-                    is_similar_to_past_quiz_questions(question, user_id, threshold=0.65),
-                    not question,
-                    len(options) != 5,
-                    any(not v.strip() for v in options.values()),
-                    len(set(options.values())) < 5,
-                    not correct_letters,
-                    any(c not in options for c in correct_letters),
-                    is_duplicate_faiss(question, index, 0.85),
-                    is_similar_to_same_quiz_questions(question, batch_generated_questions, 0.85),
-                    question in batch_generated_questions,
-                    question in existing_questions,
-                ]):
-                    continue
-
-                if past_embeddings is not None:
-                    new_vec = embedding_model.encode([question]).astype(np.float32)
-                    if max(cosine_similarity(new_vec, past_embeddings)[0]) >= 0.65:
-                        continue
-
+            for mcq in candidates.accept_batch(extracted_mcqs):
+                question = mcq["question"]
                 mcq.update({
                     "difficulty": difficulty,
                     "b": assign_difficulty_parameter(user_id, difficulty),
@@ -367,18 +303,23 @@ def generate_mcq_based_on_performance(
                     "c": 0.2,
                 })
 
-                new_vector = embedding_model.encode([question]).astype(np.float32)
-                index.add(new_vector)
+                new_vector = embedding_cache.encode([question], persist=True)
+                corpus.add_generated(new_vector, [mcq])
                 valid_mcqs.append(mcq)
-                batch_generated_questions.add(question)
+                candidates.add(question, new_vector[0])
                 added += 1
+                yield mcq
 
                 if len(valid_mcqs) >= 3:
                     break
 
+            generation_stats.record(mode, decode_seconds, len(extracted_mcqs), added)
+
             if added == 0:
                 retries += 1
 
+        except LLMQueueFullError:
+            raise
         except Exception as e:
             logging.error(f"⚠ Error during MCQ generation: {e}")
             retries += 1
@@ -392,9 +333,9 @@ def generate_mcq_based_on_performance(
                 if len(valid_mcqs) >= 3:
                     break
                 valid_mcqs.append(mcq)
+                yield mcq
         except Exception as e:
             logging.error(f"❌ Gemini fallback failed: {e}")
 
     logging.info(f"✅ Generated {len(valid_mcqs)} valid MCQs in {retries} retries for difficulty: {difficulty}")
-    return valid_mcqs[:3]
 
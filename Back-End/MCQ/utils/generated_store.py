@@ -0,0 +1,218 @@
+# utils/generated_store.py
+
+import base64
+import json
+import logging
+import os
+import pickle
+import threading
+import faiss
+import numpy as np
+from utils.embedding_cache import text_key
+from utils.vector_index import GENERATED_INDEX_KIND, build_cosine_index, unit_rows
+
+GENERATED_STORE_DIR = os.getenv("GENERATED_STORE_DIR", "model/generated_questions")
+# Write a snapshot once this many additions have been applied since the last one
+GENERATED_SNAPSHOT_EVERY = int(os.getenv("GENERATED_SNAPSHOT_EVERY", "50"))
+
+# Generated ids sit above every seed row id and are derived from the question text,
+# so all workers assign the same id to the same question
+GENERATED_ID_BASE = 1 << 62
+
+
+def generated_id(text):
+    return GENERATED_ID_BASE + int(text_key(text)[:15], 16)
+
+
+def is_generated_id(question_id):
+    return question_id >= GENERATED_ID_BASE
+
+
+class GeneratedQuestionStore:
+    """
+    Durable FAISS IndexIDMap2 of unit-length generated-question vectors (inner product, so
+    search scores are cosine similarities) plus an id -> metadata table (text, difficulty,
+    source, correct answer). kind selects an exact "flat" or approximate "hnsw" index.
+
+    Every addition is appended as one JSON line to additions.log and applied by replaying
+    the log, so the workers sharing the directory converge on the same index: each one
+    tails the log before searching. Every GENERATED_SNAPSHOT_EVERY additions the index,
+    metadata and covered log offset are pickled to snapshot.pkl via an atomic rename.
+    Startup loads the snapshot and replays only the log written after it.
+    """
+
+    def __init__(self, dim, directory=GENERATED_STORE_DIR, snapshot_every=GENERATED_SNAPSHOT_EVERY,
+                 kind=GENERATED_INDEX_KIND):
+        self.dim = dim
+        self.kind = kind
+        self.snapshot_every = snapshot_every
+        self._log_path = os.path.join(directory, "additions.log")
+        self._snapshot_path = os.path.join(directory, "snapshot.pkl")
+        self._lock = threading.RLock()
+        self._index = self._new_index()
+        self._metadata = {}
+        self._log_offset = 0
+        self._since_snapshot = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._recover()
+
+    def _new_index(self):
+        return faiss.IndexIDMap2(build_cosine_index(self.dim, self.kind))
+
+    # ---------- recovery and log replay ----------
+
+    def _recover(self):
+        if os.path.exists(self._snapshot_path):
+            try:
+                with open(self._snapshot_path, "rb") as f:
+                    snapshot = pickle.load(f)
+                if (snapshot["dim"], snapshot.get("kind")) == (self.dim, self.kind):
+                    self._index = faiss.deserialize_index(snapshot["index"])
+                    self._metadata = snapshot["metadata"]
+                    self._log_offset = snapshot["log_offset"]
+                else:
+                    # The log holds every addition, so a different index layout is rebuilt from it
+                    logging.warning(
+                        f"⚠ Generated-question snapshot is {snapshot.get('kind')}/{snapshot['dim']}d, "
+                        f"expected {self.kind}/{self.dim}d. Rebuilding from the log."
+                    )
+            except Exception as e:
+                logging.error(f"⚠ Could not load generated-question snapshot ({e}). Rebuilding from the log.")
+                self._index = self._new_index()
+                self._metadata = {}
+                self._log_offset = 0
+
+        replayed = self._replay()
+        logging.info(f"📚 Generated-question store: {len(self._metadata)} questions ({replayed} replayed from the log)")
+        if replayed >= self.snapshot_every:
+            self.snapshot()
+
+    def _replay(self):
+        """Apply every complete log line written since the last one this process has seen."""
+        with self._lock:
+            if not os.path.exists(self._log_path):
+                return 0
+            with open(self._log_path, "rb") as f:
+                f.seek(self._log_offset)
+                data = f.read()
+
+            # A line without its newline is still being written (or was torn by a crash); leave it for later
+            end = data.rfind(b"\n") + 1
+            self._log_offset += end
+
+            records = []
+            for line in data[:end].splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logging.warning("⚠ Skipping a corrupt generated-question log line")
+            return self._apply(records)
+
+    def _apply(self, records):
+        new = [r for r in records if r["id"] not in self._metadata]
+        if not new:
+            return 0
+        vectors = np.stack([np.frombuffer(base64.b64decode(r["vector"]), dtype=np.float32) for r in new])
+        ids = np.array([r["id"] for r in new], dtype=np.int64)
+        self._index.add_with_ids(vectors, ids)
+        for record in new:
+            self._metadata[record["id"]] = record["meta"]
+        self._since_snapshot += len(new)
+        return len(new)
+
+    def refresh(self):
+        """Pick up additions other workers appended since the last call (one stat when there are none)."""
+        try:
+            grown = os.path.getsize(self._log_path) > self._log_offset
+        except OSError:
+            return
+        if grown:
+            self._replay()
+
+    # ---------- writes ----------
+
+    def add(self, vectors, mcqs, source="generated"):
+        """Record accepted MCQs with their embeddings; questions already in the store are skipped."""
+        vectors = unit_rows(np.reshape(vectors, (-1, self.dim)))
+        records = []
+        for vector, mcq in zip(vectors, mcqs):
+            question = mcq.get("question", "")
+            correct = (mcq.get("correct_answer") or "").split(", ")[0]
+            records.append({
+                "id": generated_id(question),
+                "meta": {
+                    "text": question,
+                    "difficulty": mcq.get("difficulty"),
+                    "source": source,
+                    "correct_answer": mcq.get("options", {}).get(correct, correct),
+                },
+                "vector": base64.b64encode(vector.tobytes()).decode("ascii"),
+            })
+
+        with self._lock:
+            records = [r for r in records if r["id"] not in self._metadata]
+            if not records:
+                return
+            try:
+                with open(self._log_path, "ab") as f:
+                    f.write(b"".join(json.dumps(r).encode("utf-8") + b"\n" for r in records))
+                    f.flush()
+                    os.fsync(f.fileno())
+                # Replaying applies our records together with any other worker's, in log order
+                self._replay()
+            except OSError as e:
+                logging.error(f"⚠ Could not append to the generated-question log ({e}). Keeping the vectors in memory only.")
+                self._apply(records)
+            due = self._since_snapshot >= self.snapshot_every
+
+        if due:
+            self.snapshot()
+
+    def snapshot(self):
+        """Atomically replace snapshot.pkl with the current index, metadata and log offset."""
+        with self._lock:
+            payload = {
+                "dim": self.dim,
+                "kind": self.kind,
+                "index": faiss.serialize_index(self._index),
+                "metadata": dict(self._metadata),
+                "log_offset": self._log_offset,
+            }
+            self._since_snapshot = 0
+
+        tmp_path = f"{self._snapshot_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self._snapshot_path)
+            logging.info(f"💾 Generated-question snapshot written ({len(payload['metadata'])} questions)")
+        except OSError as e:
+            logging.error(f"⚠ Could not write generated-question snapshot: {e}")
+
+    # ---------- reads ----------
+
+    @property
+    def ntotal(self):
+        return self._index.ntotal
+
+    def search(self, query_vectors, k):
+        """(S, I) of the k most similar generated questions: cosine scores and generated ids (-1 when fewer exist)."""
+        self.refresh()
+        with self._lock:
+            return self._index.search(unit_rows(query_vectors), k)
+
+    def metadata(self, question_id):
+        return self._metadata.get(int(question_id))
+
+    def vectors(self, question_ids):
+        """Stored unit-length vectors of generated questions, one row per id."""
+        with self._lock:
+            return np.stack([self._index.reconstruct(int(i)) for i in question_ids])
+
+    def __len__(self):
+        return len(self._metadata)
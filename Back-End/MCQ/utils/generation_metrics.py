@@ -0,0 +1,63 @@
+# utils/generation_metrics.py
+
+import threading
+
+
+class GenerationStats:
+    """Per generation mode counters, used to compare grammar-constrained and free-text decoding."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._modes = {}
+
+    def _mode(self, mode):
+        return self._modes.setdefault(mode, {
+            "decodes": 0,
+            "empty_decodes": 0,
+            "decode_seconds": 0.0,
+            "extracted_mcqs": 0,
+            "accepted_mcqs": 0,
+            "decoded_tokens": 0,
+            "wasted_tokens": 0,
+            "early_stops": 0,
+        })
+
+    def record(self, mode, decode_seconds, extracted, accepted=0):
+        with self._lock:
+            stats = self._mode(mode)
+            stats["decodes"] += 1
+            stats["empty_decodes"] += int(extracted == 0)
+            stats["decode_seconds"] += decode_seconds
+            stats["extracted_mcqs"] += extracted
+            stats["accepted_mcqs"] += accepted
+
+    def record_tokens(self, mode, decoded, wasted, stopped_early=False):
+        """wasted: tokens decoded after the last complete MCQ had already been parsed."""
+        with self._lock:
+            stats = self._mode(mode)
+            stats["decoded_tokens"] += decoded
+            stats["wasted_tokens"] += wasted
+            stats["early_stops"] += int(stopped_early)
+
+    def snapshot(self):
+        with self._lock:
+            result = {}
+            for mode, stats in self._modes.items():
+                seconds = stats["decode_seconds"]
+                result[mode] = {
+                    **stats,
+                    "decode_seconds": round(seconds, 3),
+                    "parse_failure_rate": (
+                        round(stats["empty_decodes"] / stats["decodes"], 4) if stats["decodes"] else 0.0
+                    ),
+                    "wasted_token_ratio": (
+                        round(stats["wasted_tokens"] / stats["decoded_tokens"], 4) if stats["decoded_tokens"] else 0.0
+                    ),
+                    "accepted_mcqs_per_decode_second": (
+                        round(stats["accepted_mcqs"] / seconds, 4) if seconds else 0.0
+                    ),
+                }
+            return result
+
+
+generation_stats = GenerationStats()
@@ -0,0 +1,133 @@
+# utils/inference_client.py
+
+import logging
+import os
+import threading
+from multiprocessing.connection import Client
+
+INFERENCE_SERVER_SOCKET = os.getenv("INFERENCE_SERVER_SOCKET")
+# Shared secret for the connection handshake. Messages are pickles, so there is deliberately no default
+INFERENCE_SERVER_AUTHKEY = os.getenv("INFERENCE_SERVER_AUTHKEY")
+
+
+def inference_authkey():
+    """INFERENCE_SERVER_AUTHKEY as bytes; raises if it is not set."""
+    if not INFERENCE_SERVER_AUTHKEY:
+        raise RuntimeError(
+            "INFERENCE_SERVER_AUTHKEY is not set. Give the inference server and the API workers the same "
+            "random secret, e.g. INFERENCE_SERVER_AUTHKEY=$(python -c 'import secrets; print(secrets.token_hex(32))')"
+        )
+    return INFERENCE_SERVER_AUTHKEY.encode()
+
+
+class RemoteModel:
+    """
+    Drop-in stand-in for a model owned by the inference server (utils/inference_server.py).
+
+    Calls keep the local signatures: llm(prompt, ...), llm.tokenize(...), embedding_model.encode(...).
+    Each thread gets its own connection because a Connection object is not thread-safe.
+    """
+
+    def __init__(self, target, address=None, authkey=None):
+        self._target = target
+        self._address = address or INFERENCE_SERVER_SOCKET
+        self._authkey = authkey or inference_authkey()
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = Client(self._address, family="AF_UNIX", authkey=self._authkey)
+            self._local.conn = conn
+        return conn
+
+    def _reset_connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            try:
+                conn.close()
+            except OSError:
+                pass
+        self._local.conn = None
+
+    def _send(self, message):
+        try:
+            conn = self._connection()
+            conn.send(message)
+        except (OSError, EOFError):
+            # The server may have restarted since this thread last used it; reconnect once
+            logging.warning(f"⚠ Lost connection to inference server. Reconnecting ({self._target})...")
+            self._reset_connection()
+            conn = self._connection()
+            conn.send(message)
+        return conn
+
+    def _receive(self, conn):
+        try:
+            status, payload = conn.recv()
+        except (OSError, EOFError) as e:
+            self._reset_connection()
+            raise RuntimeError(f"Inference server connection closed: {e}")
+        if status == "error":
+            raise RuntimeError(f"Inference server error: {payload}")
+        return status, payload
+
+    @staticmethod
+    def _portable_kwargs(kwargs):
+        # LlamaGrammar wraps native memory; send its GBNF source and let the server rebuild it
+        grammar = kwargs.get("grammar")
+        if grammar is not None and not isinstance(grammar, str):
+            kwargs = dict(kwargs, grammar=grammar.gbnf_source)
+        return kwargs
+
+    def _request(self, method, args, kwargs):
+        kwargs = self._portable_kwargs(kwargs)
+        conn = self._send(("call", self._target, method, args, kwargs))
+        _, payload = self._receive(conn)
+        return payload
+
+    def _stream(self, method, args, kwargs):
+        kwargs = self._portable_kwargs(kwargs)
+        conn = self._send(("call", self._target, method, args, kwargs))
+        finished = False
+        try:
+            while True:
+                try:
+                    status, payload = self._receive(conn)
+                except RuntimeError:
+                    # An error frame ends the stream on the server (and a lost connection was
+                    # already reset), so there is nothing left to cancel or drain
+                    finished = True
+                    raise
+                if status == "end":
+                    finished = True
+                    return
+                yield payload
+        finally:
+            if not finished:
+                # Caller stopped early: tell the server to stop decoding, then drain to the end frame
+                try:
+                    conn.send(("cancel",))
+                    while conn.recv()[0] not in ("end", "error"):
+                        pass
+                except (OSError, EOFError):
+                    self._reset_connection()
+
+    def ping(self):
+        return self._request("ping", (), {})
+
+    def __call__(self, *args, **kwargs):
+        if kwargs.get("stream"):
+            return self._stream("__call__", args, kwargs)
+        return self._request("__call__", args, kwargs)
+
+    def __getattr__(self, item):
+        if item.startswith("_"):
+            raise AttributeError(item)
+
+        def remote_method(*args, **kwargs):
+            if kwargs.get("stream"):
+                return self._stream(item, args, kwargs)
+            return self._request(item, args, kwargs)
+
+        return remote_method
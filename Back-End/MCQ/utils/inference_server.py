@@ -0,0 +1,152 @@
+# utils/inference_server.py
+#
+# Single process that owns the embedding model and the llama.cpp model and serves every API worker
+# over a Unix socket. Start it before uvicorn and point the workers at it:
+#
+#   export INFERENCE_SERVER_AUTHKEY=$(python -c 'import secrets; print(secrets.token_hex(32))')
+#   python -m utils.inference_server
+#   INFERENCE_SERVER_SOCKET=/tmp/mcq-inference/inference.sock uvicorn main:app --workers 4
+#
+# The socket is only accessible to the user running the server (0600, in a 0700 directory).
+
+import logging
+import os
+import threading
+from multiprocessing.connection import Listener
+from utils.embedding_batcher import MicroBatchingEncoder
+from utils.inference_client import inference_authkey
+from utils.mcq_grammar import grammar_from_source
+from utils.model_loader import (
+    LazyModel,
+    _load_local_embedding_model,
+    _load_local_llm,
+    _warmup_embedding_model,
+    _warmup_llm,
+)
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+DEFAULT_SOCKET_PATH = "/tmp/mcq-inference/inference.sock"
+
+models = {
+    "embedding_model": LazyModel("embedding_model", _load_local_embedding_model, _warmup_embedding_model),
+    "llm": LazyModel("llm", _load_local_llm, _warmup_llm),
+}
+
+# Methods a client may call on each model; anything else (private names, save_state, reset, ...) is refused
+ALLOWED_METHODS = {
+    "embedding_model": {"encode", "ping"},
+    "llm": {"__call__", "tokenize", "create_completion", "ping"},
+}
+
+# llama.cpp contexts are not safe for concurrent use, so every model call is serialized per model
+model_locks = {name: threading.Lock() for name in models}
+
+# Embedding calls from all API workers share forward passes; the batcher runs them one batch at a time
+embedding_batcher = MicroBatchingEncoder(models["embedding_model"])
+
+
+def _call_model(target, method, args, kwargs):
+    model = models[target].load()
+    if isinstance(kwargs.get("grammar"), str):
+        kwargs = dict(kwargs, grammar=grammar_from_source(kwargs["grammar"]))
+    if method == "ping":
+        return "pong"
+    if method == "__call__":
+        return model(*args, **kwargs)
+    return getattr(model, method)(*args, **kwargs)
+
+
+def _stream_to_client(conn, target, method, args, kwargs):
+    """Send chunks as they are decoded; stop early if the client sends a cancel frame."""
+    with model_locks[target]:
+        stream = _call_model(target, method, args, kwargs)
+        try:
+            for chunk in stream:
+                if conn.poll() and conn.recv()[0] == "cancel":
+                    break
+                conn.send(("chunk", chunk))
+        finally:
+            close = getattr(stream, "close", None)
+            if close:
+                close()
+    conn.send(("end", None))
+
+
+def handle_connection(conn):
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                break
+
+            if message[0] != "call":
+                # A stray cancel after a stream already ended
+                continue
+
+            _, target, method, args, kwargs = message
+            try:
+                if target not in models:
+                    raise ValueError(f"Unknown model '{target}'")
+                if method not in ALLOWED_METHODS.get(target, ()):
+                    raise PermissionError(f"Method '{method}' is not allowed on '{target}'")
+                if kwargs.get("stream"):
+                    _stream_to_client(conn, target, method, args, kwargs)
+                elif (target, method) == ("embedding_model", "encode"):
+                    conn.send(("ok", embedding_batcher.encode(*args, **kwargs)))
+                else:
+                    with model_locks[target]:
+                        result = _call_model(target, method, args, kwargs)
+                    conn.send(("ok", result))
+            except Exception as e:
+                logging.error(f"⚠ Inference call {target}.{method} failed: {e}")
+                conn.send(("error", str(e)))
+    finally:
+        conn.close()
+
+
+def open_listener(socket_path):
+    """Listen on socket_path, reachable only by this user: 0600 socket in an owner-only directory."""
+    authkey = inference_authkey()  # refuse to start without a secret
+    socket_dir = os.path.dirname(os.path.abspath(socket_path))
+    if not os.path.isdir(socket_dir):
+        os.makedirs(socket_dir, mode=0o700)
+    elif socket_path == DEFAULT_SOCKET_PATH:
+        os.chmod(socket_dir, 0o700)
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+
+    # Bind with a restrictive umask so the socket is never reachable by other users, even briefly
+    previous_umask = os.umask(0o177)
+    try:
+        listener = Listener(socket_path, family="AF_UNIX", authkey=authkey)
+    finally:
+        os.umask(previous_umask)
+    os.chmod(socket_path, 0o600)
+    return listener
+
+
+def serve(socket_path=None):
+    socket_path = socket_path or os.getenv("INFERENCE_SERVER_SOCKET", DEFAULT_SOCKET_PATH)
+    inference_authkey()  # fail before loading the models
+
+    for model in models.values():
+        model.load()
+
+    listener = open_listener(socket_path)
+    logging.info(f"🚀 Inference server listening on {socket_path}")
+    try:
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:
+                logging.warning(f"⚠ Rejected inference client: {e}")
+                continue
+            threading.Thread(target=handle_connection, args=(conn,), daemon=True).start()
+    finally:
+        listener.close()
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,166 @@
+# utils/knn_graph.py
+#
+# Offline k-nearest-neighbour graph over the seed corpus embeddings. Build or refresh it after
+# the corpus changes (only new or changed rows and the rows that pointed at them are redone):
+#
+#   python -m utils.knn_graph
+
+import hashlib
+import logging
+import os
+import faiss
+import numpy as np
+from utils.vector_index import unit_rows
+
+KNN_GRAPH_PATH = os.getenv("KNN_GRAPH_PATH", "dataset/question_knn_graph.npz")
+# Neighbours stored per question; context retrieval uses top_k * CONTEXT_CANDIDATE_FACTOR of them
+KNN_GRAPH_K = int(os.getenv("KNN_GRAPH_K", "32"))
+
+
+def row_fingerprints(embeddings):
+    """One uint64 per row, derived from the row's bytes, to tell which rows changed."""
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    return np.array(
+        [int.from_bytes(hashlib.blake2b(row.tobytes(), digest_size=8).digest(), "little") for row in embeddings],
+        dtype=np.uint64,
+    )
+
+
+def _top_k(vectors, candidates, candidate_ids, k):
+    """(S, I) of the k + 1 nearest candidates (exact inner product), I mapped to candidate_ids."""
+    index = faiss.IndexFlatIP(candidates.shape[1])
+    index.add(candidates)
+    S, I = index.search(vectors, min(k + 1, len(candidates)))
+    I = np.where(I >= 0, candidate_ids[np.maximum(I, 0)], -1)
+    return S, I
+
+
+def _pair_scores(vectors, rows, neighbour_ids, chunk=256):
+    """Exact float32 similarity of each row to each of its neighbour ids (missing ids: -inf)."""
+    scores = np.full(neighbour_ids.shape, -np.inf, dtype=np.float32)
+    for start in range(0, len(rows), chunk):
+        ids = neighbour_ids[start:start + chunk]
+        pairs = np.einsum("nd,nkd->nk", vectors[rows[start:start + chunk]], vectors[np.maximum(ids, 0)])
+        scores[start:start + chunk] = np.where(ids >= 0, pairs, -np.inf)
+    return scores
+
+
+class KNNGraph:
+    """
+    Each seed question's k most similar other seed questions, most similar first: ids as an
+    int32 (n, k) array and cosine similarities as float16. Row i is dataset row i, so a
+    lookup is one array index. fingerprints records the embedding each row was built from.
+    """
+
+    def __init__(self, ids, similarities, fingerprints):
+        self.ids = ids
+        self.similarities = similarities
+        self.fingerprints = fingerprints
+
+    @property
+    def k(self):
+        return self.ids.shape[1]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def neighbours(self, row, count=None):
+        """(ids, similarities) of up to count neighbours of a dataset row."""
+        count = count or self.k
+        ids = self.ids[row, :count]
+        valid = ids >= 0
+        return ids[valid], self.similarities[row, :count][valid].astype(np.float32)
+
+    def matches(self, embeddings):
+        """True if the graph was built from exactly these embeddings."""
+        return len(self) == len(embeddings) and np.array_equal(self.fingerprints, row_fingerprints(embeddings))
+
+    @classmethod
+    def load(cls, path=KNN_GRAPH_PATH):
+        with np.load(path) as data:
+            return cls(data["ids"], data["similarities"], data["fingerprints"])
+
+    def save(self, path=KNN_GRAPH_PATH):
+        """Write atomically, so a concurrent reader sees the old graph or the new one."""
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, ids=self.ids, similarities=self.similarities, fingerprints=self.fingerprints)
+        os.replace(tmp_path, path)
+
+
+def build_knn_graph(embeddings, k=KNN_GRAPH_K, previous=None):
+    """
+    Exact k-NN graph of the embeddings (cosine). With the previous graph, only rows whose
+    embedding is new or changed are searched in full. A row that is unchanged merges its old
+    neighbours with the changed rows, unless one of its old neighbours changed or is gone,
+    in which case it is searched in full as well.
+    """
+    vectors = unit_rows(embeddings)
+    count = len(vectors)
+    k = min(k, max(count - 1, 1))
+    fingerprints = row_fingerprints(embeddings)
+    all_ids = np.arange(count, dtype=np.int64)
+
+    ids = np.full((count, k), -1, dtype=np.int32)
+    similarities = np.zeros((count, k), dtype=np.float16)
+
+    if previous is not None and previous.k == k:
+        known = min(len(previous), count)
+        unchanged = np.zeros(count, dtype=bool)
+        unchanged[:known] = previous.fingerprints[:known] == fingerprints[:known]
+    else:
+        unchanged = np.zeros(count, dtype=bool)
+
+    dirty = all_ids[~unchanged]
+    # Old neighbour lists that mention a changed or removed row are no longer trustworthy
+    if unchanged.any():
+        old_ids = previous.ids[all_ids[unchanged]]
+        stale = ((old_ids >= count) | np.isin(old_ids, dirty)).any(axis=1)
+        refresh = all_ids[unchanged][stale]
+        merge = all_ids[unchanged][~stale]
+    else:
+        refresh = merge = np.empty(0, dtype=np.int64)
+
+    full = np.concatenate([dirty, refresh])
+    if len(full):
+        S, I = _top_k(vectors[full], vectors, all_ids, k)
+        for row, scores, neighbours in zip(full, S, I):
+            keep = neighbours != row
+            ids[row] = neighbours[keep][:k]
+            similarities[row] = scores[keep][:k]
+
+    if len(merge):
+        ids[merge] = previous.ids[merge]
+        similarities[merge] = previous.similarities[merge]
+        if len(dirty):
+            # Neighbours among the changed rows, merged into each old list (k + k candidates)
+            S, I = _top_k(vectors[merge], vectors[dirty], dirty, k)
+            # Old scores are recomputed in float32 so near-ties order as in a full search
+            merged_ids = np.concatenate([ids[merge], I[:, :k].astype(np.int32)], axis=1)
+            merged_sims = np.concatenate([_pair_scores(vectors, merge, ids[merge]), S[:, :k]], axis=1)
+            merged_sims[merged_ids < 0] = -np.inf
+            order = np.argsort(-merged_sims, axis=1, kind="stable")[:, :k]
+            ids[merge] = np.take_along_axis(merged_ids, order, axis=1)
+            similarities[merge] = np.take_along_axis(merged_sims, order, axis=1)
+
+    logging.info(
+        f"🕸 k-NN graph: {count} questions, k={k}, {len(full)} searched in full, {len(merge)} merged"
+    )
+    return KNNGraph(ids, similarities, fingerprints)
+
+
+def refresh_knn_graph(embeddings, path=KNN_GRAPH_PATH, k=KNN_GRAPH_K):
+    """Bring the stored graph up to date with the embeddings, rebuilding only what changed."""
+    previous = KNNGraph.load(path) if os.path.exists(path) else None
+    if previous is not None and previous.k == min(k, max(len(embeddings) - 1, 1)) and previous.matches(embeddings):
+        logging.info("🕸 k-NN graph is up to date")
+        return previous
+    graph = build_knn_graph(embeddings, k, previous)
+    graph.save(path)
+    return graph
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    from utils.corpus_store import QUESTION_EMBEDDINGS_PATH
+
+    refresh_knn_graph(np.load(QUESTION_EMBEDDINGS_PATH))
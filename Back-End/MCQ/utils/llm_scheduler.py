@@ -0,0 +1,243 @@
+# utils/llm_scheduler.py
+
+import contextlib
+import contextvars
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+
+LLM_QUEUE_MAX_DEPTH = int(os.getenv("LLM_QUEUE_MAX_DEPTH", "16"))
+
+# Short interactive calls (explanations) are always served before long quiz-generation batches;
+# background work such as MCQ pool refills only runs when neither has anything waiting
+INTERACTIVE = "interactive"
+BATCH = "batch"
+IDLE = "idle"
+PRIORITIES = (INTERACTIVE, BATCH, IDLE)
+
+_job_context = contextvars.ContextVar("llm_job_context", default=("anonymous", BATCH))
+
+
+class LLMQueueFullError(Exception):
+    """Raised when the LLM queue is full. Routes translate it into HTTP 429."""
+
+
+@contextlib.contextmanager
+def llm_job(user_id, priority=BATCH):
+    """Attribute every LLM call made inside the block to user_id, in the given priority lane."""
+    token = _job_context.set((str(user_id), priority))
+    try:
+        yield
+    finally:
+        _job_context.reset(token)
+
+
+class _Job:
+    def __init__(self, fn, user_id, priority):
+        self.fn = fn
+        self.user_id = user_id
+        self.priority = priority
+        self.enqueued_at = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _Timings:
+    """Rolling window of durations with summary statistics."""
+
+    def __init__(self, window=500):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def summary(self):
+        recent = sorted(self.samples)
+        return {
+            "count": self.count,
+            "mean_seconds": round(self.total / self.count, 4) if self.count else 0.0,
+            "p95_seconds": round(recent[int(0.95 * (len(recent) - 1))], 4) if recent else 0.0,
+            "max_seconds": round(recent[-1], 4) if recent else 0.0,
+        }
+
+
+class LLMScheduler:
+    """
+    Runs every LLM call on one worker thread.
+
+    Pending jobs are kept per priority lane and per user. The worker always drains the
+    interactive lane first, then batch, then idle, and round-robins between users inside a lane, so one user's
+    long quiz cannot starve another's. When max_depth jobs are already waiting, new
+    submissions are rejected with LLMQueueFullError.
+    """
+
+    def __init__(self, max_depth=LLM_QUEUE_MAX_DEPTH):
+        self.max_depth = max_depth
+        self._cond = threading.Condition()
+        self._lanes = {priority: OrderedDict() for priority in PRIORITIES}
+        self._depth = 0
+        self._busy = False
+        self._worker = None
+        self._rejected = 0
+        self._queue_wait = {priority: _Timings() for priority in PRIORITIES}
+        self._decode_time = {priority: _Timings() for priority in PRIORITIES}
+
+    def submit(self, fn, user_id="anonymous", priority=BATCH):
+        """Queue fn and block until the worker has run it; returns its result or re-raises its error."""
+        if threading.current_thread() is self._worker:
+            # Nested call from inside a running job: it already owns the model
+            return fn()
+
+        job = self._enqueue(fn, user_id, priority)
+        job.done.wait()
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def stream(self, open_stream, user_id="anonymous", priority=BATCH):
+        """
+        Run a streaming call (stream=True) as one job and yield its chunks as they are decoded.
+        The worker stays on this job until the stream ends; closing the generator early
+        cancels decoding at the next chunk and frees the worker.
+        """
+        if threading.current_thread() is self._worker:
+            yield from open_stream()
+            return
+
+        chunks = queue.Queue()
+        cancelled = threading.Event()
+        end = object()
+
+        def run():
+            iterator = None
+            try:
+                # Opening the stream can fail too (e.g. the model did not load); end is queued either way
+                iterator = open_stream()
+                for chunk in iterator:
+                    if cancelled.is_set():
+                        break
+                    chunks.put(chunk)
+            finally:
+                close = getattr(iterator, "close", None)
+                if close is not None:
+                    close()
+                chunks.put(end)
+
+        job = self._enqueue(run, user_id, priority)
+        try:
+            while True:
+                chunk = chunks.get()
+                if chunk is end:
+                    break
+                yield chunk
+        finally:
+            cancelled.set()
+            job.done.wait()
+        if job.error is not None:
+            raise job.error
+
+    def _enqueue(self, fn, user_id, priority):
+        job = _Job(fn, user_id, priority if priority in self._lanes else BATCH)
+        with self._cond:
+            if self._depth >= self.max_depth:
+                self._rejected += 1
+                raise LLMQueueFullError(
+                    f"LLM queue is full ({self._depth} pending jobs). Please retry shortly."
+                )
+            self._lanes[job.priority].setdefault(job.user_id, deque()).append(job)
+            self._depth += 1
+            self._ensure_worker()
+            self._cond.notify()
+        return job
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name="llm-scheduler", daemon=True)
+            self._worker.start()
+
+    def _next_job(self):
+        for priority in PRIORITIES:
+            lane = self._lanes[priority]
+            if lane:
+                user_id, jobs = lane.popitem(last=False)
+                job = jobs.popleft()
+                if jobs:
+                    # Move the user to the back of the lane (round-robin)
+                    lane[user_id] = jobs
+                return job
+        return None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._depth == 0:
+                    self._cond.wait()
+                job = self._next_job()
+                self._depth -= 1
+                self._busy = True
+
+            started = time.perf_counter()
+            self._queue_wait[job.priority].add(started - job.enqueued_at)
+            try:
+                job.result = job.fn()
+            except BaseException as e:
+                job.error = e
+            finally:
+                self._decode_time[job.priority].add(time.perf_counter() - started)
+                with self._cond:
+                    self._busy = False
+                job.done.set()
+
+    def is_idle(self):
+        with self._cond:
+            return self._depth == 0 and not self._busy
+
+    def metrics(self):
+        with self._cond:
+            pending = {
+                priority: sum(len(jobs) for jobs in lane.values())
+                for priority, lane in self._lanes.items()
+            }
+            waiting_users = {priority: len(lane) for priority, lane in self._lanes.items()}
+            busy = self._busy
+        return {
+            "max_depth": self.max_depth,
+            "pending": pending,
+            "waiting_users": waiting_users,
+            "busy": busy,
+            "rejected": self._rejected,
+            "queue_wait": {p: t.summary() for p, t in self._queue_wait.items()},
+            "decode_time": {p: t.summary() for p, t in self._decode_time.items()},
+        }
+
+
+class ScheduledLLM:
+    """
+    Wraps the llm so that every completion call goes through the scheduler; other attributes pass through.
+    Streaming calls (stream=True) return a generator that holds the worker until it is exhausted or closed.
+    """
+
+    def __init__(self, model, scheduler):
+        self._model = model
+        self._scheduler = scheduler
+
+    def __call__(self, *args, **kwargs):
+        user_id, priority = _job_context.get()
+        if kwargs.get("stream"):
+            return self._scheduler.stream(lambda: self._model(*args, **kwargs), user_id, priority)
+        return self._scheduler.submit(lambda: self._model(*args, **kwargs), user_id, priority)
+
+    def __getattr__(self, item):
+        if item.startswith("_"):
+            raise AttributeError(item)
+        return getattr(self._model, item)
+
+
+llm_scheduler = LLMScheduler()
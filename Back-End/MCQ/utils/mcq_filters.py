@@ -0,0 +1,242 @@
+# utils/mcq_filters.py
+
+import logging
+import threading
+import time
+import numpy as np
+from utils.embedding_cache import embedding_cache
+from utils.quiz_generation_methods import clean_correct_answer, faiss_max_similarity
+from utils.quiz_similarity import QuizSimilarityContext, normalize_question
+from utils.seen_questions import load_seen_questions
+from utils.vector_index import unit_rows
+from utils.verification_service import verify_mcq
+
+# Cheapest first: a candidate only pays for the embedding model, FAISS and finally the
+# Gemini round trip if every cheaper check before it has passed
+STAGES = (
+    "structural",
+    "exact_duplicate",
+    "in_quiz_similarity",
+    "faiss_similarity",
+    "past_quiz_similarity",
+    "verification",
+)
+
+# Text the model copies from the prompt template instead of writing a question
+PLACEHOLDER_MARKERS = ("Question", "<Insert your question>", "Generate a")
+
+
+def is_malformed(mcq):
+    """
+    Structural check: normalizes the candidate in place (stripped question, "A, C" style
+    correct_answer) and returns True if it is not a complete five-option MCQ.
+    """
+    question = mcq.get("question", "").strip()
+    mcq["question"] = question
+    options = mcq.get("options", {})
+    correct_letters = clean_correct_answer(mcq.get("correct_answer") or "")
+    mcq["correct_answer"] = ", ".join(correct_letters)  # For consistent formatting
+
+    return any([
+        not question,
+        "error" in mcq,
+        any(marker in question for marker in PLACEHOLDER_MARKERS),
+        len(options) != 5,
+        any(not opt.strip() for opt in options.values()),
+        len(set(options.values())) < 5,
+        not correct_letters,
+        any(letter not in options for letter in correct_letters),
+    ])
+
+
+class FilterStats:
+    """Per-stage counters and timings, shared by every generation call."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {stage: {"checked": 0, "rejected": 0, "seconds": 0.0} for stage in STAGES}
+
+    def record(self, stage, seconds, rejected):
+        with self._lock:
+            stats = self._stages[stage]
+            stats["checked"] += 1
+            stats["rejected"] += int(rejected)
+            stats["seconds"] += seconds
+
+    def record_batch(self, stage, seconds, rejected):
+        """One stage run over several candidates: rejected holds one flag per candidate."""
+        with self._lock:
+            stats = self._stages[stage]
+            stats["checked"] += len(rejected)
+            stats["rejected"] += sum(rejected)
+            stats["seconds"] += seconds
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                stage: {
+                    "checked": s["checked"],
+                    "rejected": s["rejected"],
+                    "rejection_rate": round(s["rejected"] / s["checked"], 4) if s["checked"] else 0.0,
+                    "total_seconds": round(s["seconds"], 3),
+                    "mean_ms": round(1000 * s["seconds"] / s["checked"], 3) if s["checked"] else 0.0,
+                }
+                for stage, s in self._stages.items()
+            }
+
+
+filter_stats = FilterStats()
+
+
+class CandidateFilter:
+    """
+    Ordered validation of the MCQs extracted from one generation call.
+
+    accept_batch() runs the stages in STAGES order over all candidates of one LLM output
+    at once: each stage only sees the candidates that passed the ones before it. The
+    survivors of the cheap checks are embedded in one encode call, searched in FAISS with
+    one multi-row query and compared with the quiz and past-quiz matrices with one matrix
+    product each. Candidates from the same output are also compared with each other, and
+    the earliest one wins. Verification then runs per survivor as the caller consumes the
+    generator, so a caller that stops early skips the remaining Gemini calls.
+
+    Candidates are normalized in place by the structural stage and, once every check has
+    passed, get the verification fields. add() records an accepted question so later
+    candidates from the same generation call are compared against it.
+
+    existing_questions is the quiz being built, normally a QuizSimilarityContext shared with
+    the caller (a plain set of texts is wrapped). The filter never adds to it; questions it
+    accepts go into its own batch context until the caller adds them to the quiz.
+
+    The past-quiz stage only runs when past quiz questions are given (past_embeddings, unit-length
+    rows) or user_id is set with check_past_quizzes=True; then the stored embeddings of the user's
+    last quiz are loaded once per CandidateFilter, not once per candidate.
+    """
+
+    def __init__(self, existing_questions=None, user_id=None, past_embeddings=None,
+                 check_past_quizzes=False, past_threshold=0.65, stats=filter_stats):
+        if not isinstance(existing_questions, QuizSimilarityContext):
+            existing_questions = QuizSimilarityContext(existing_questions or ())
+        self.quiz_context = existing_questions
+        self.batch_context = QuizSimilarityContext()
+        self.user_id = user_id
+        self.check_past_quizzes = check_past_quizzes or past_embeddings is not None
+        self.past_threshold = past_threshold
+        self._past_embeddings = past_embeddings
+        self._past_loaded = past_embeddings is not None
+        self.stats = stats
+        self._stages = [
+            ("structural", self._structural),
+            ("exact_duplicate", self._exact_duplicate),
+            ("in_quiz_similarity", self._in_quiz_similarity),
+            ("faiss_similarity", self._faiss_similarity),
+            ("past_quiz_similarity", self._past_quiz_similarity),
+        ]
+
+    def accept(self, mcq):
+        """Run every stage on a single candidate; True if it was accepted."""
+        return any(True for _ in self.accept_batch([mcq]))
+
+    def accept_batch(self, mcqs):
+        """Yield the accepted candidates of one LLM output, in their original order."""
+        alive = list(mcqs)
+        vectors = {}  # id(mcq) -> unit-length embedding, filled by the first similarity stage
+
+        for stage, check in self._stages:
+            if not alive:
+                return
+            started = time.perf_counter()
+            rejected = check(alive, vectors)
+            self.stats.record_batch(stage, time.perf_counter() - started, rejected)
+            alive = [mcq for mcq, reject in zip(alive, rejected) if not reject]
+
+        for mcq in alive:
+            started = time.perf_counter()
+            self._verify(mcq)
+            self.stats.record("verification", time.perf_counter() - started, False)
+            yield mcq
+
+    def add(self, question, vector=None):
+        self.batch_context.add(question, vector)
+
+    # ---------- stages (each returns one reject flag per candidate) ----------
+
+    def _structural(self, mcqs, vectors):
+        return [is_malformed(mcq) for mcq in mcqs]
+
+    def _exact_duplicate(self, mcqs, vectors):
+        rejected = []
+        kept = set()
+        for mcq in mcqs:
+            key = normalize_question(mcq["question"])
+            duplicate = key in kept or any(context.has_text(key) for context in (self.quiz_context, self.batch_context))
+            kept.add(key)
+            rejected.append(duplicate)
+        return rejected
+
+    def _in_quiz_similarity(self, mcqs, vectors, threshold=0.85):
+        matrix = unit_rows(embedding_cache.encode([mcq["question"] for mcq in mcqs]))
+        vectors.update((id(mcq), row) for mcq, row in zip(mcqs, matrix))
+
+        similarity = np.maximum(
+            self.quiz_context.max_similarities(matrix), self.batch_context.max_similarities(matrix)
+        )
+        # Against earlier candidates of the same output that are still in the running
+        pairwise = matrix @ matrix.T
+        rejected = []
+        for j, mcq in enumerate(mcqs):
+            kept = [i for i in range(j) if not rejected[i]]
+            if kept:
+                similarity[j] = max(similarity[j], pairwise[j, kept].max())
+            rejected.append(bool(similarity[j] >= threshold))
+            if rejected[-1]:
+                logging.warning(f"⚠ Similarity {similarity[j]} exceeds threshold {threshold}. Skipping question: {mcq['question']}")
+        return rejected
+
+    def _faiss_similarity(self, mcqs, vectors, threshold=0.85):
+        similarity = faiss_max_similarity(np.stack([vectors[id(mcq)] for mcq in mcqs]))
+        for mcq, score in zip(mcqs, similarity):
+            if score >= threshold:
+                logging.warning(f"⚠ FAISS detected duplicate! Max cosine similarity: {score:.4f}, Threshold: {threshold:.4f}. Skipping question: {mcq['question']}")
+        return [bool(score >= threshold) for score in similarity]
+
+    def _past_quiz_similarity(self, mcqs, vectors):
+        if not self.check_past_quizzes:
+            return [False] * len(mcqs)
+
+        if not self._past_loaded:
+            self._past_embeddings = load_seen_questions(self.user_id, limit=1).vectors if self.user_id else None
+            self._past_loaded = True
+
+        if self._past_embeddings is None or not len(self._past_embeddings):
+            return [False] * len(mcqs)
+
+        similarity = (self._past_embeddings @ np.stack([vectors[id(mcq)] for mcq in mcqs]).T).max(axis=0)
+        rejected = []
+        for mcq, max_sim in zip(mcqs, similarity):
+            rejected.append(bool(max_sim >= self.past_threshold))
+            if rejected[-1]:
+                logging.warning(f"🚫 Too Similar to Past Quiz Questions: {mcq['question']} (Max Cosine Sim: {max_sim})")
+        return rejected
+
+    def _verify(self, mcq):
+        """Last stage, never rejects: records the verifier's answer and corrects the key when it disagrees."""
+        options = mcq["options"]
+        claimed_answer = mcq["correct_answer"].split(", ")[0]
+
+        is_correct, verified, claimed = verify_mcq(mcq["question"], options, claimed_answer)
+        mcq["claimed_answer"] = claimed  # Store original generated answer
+
+        if is_correct is False and verified in options:
+            mcq["correct_answer"] = verified
+            mcq["verified_answer"] = verified
+            mcq["is_verified"] = True
+        elif is_correct is True:
+            mcq["correct_answer"] = claimed
+            mcq["verified_answer"] = claimed
+            mcq["is_verified"] = True
+        else:
+            mcq["verified_answer"] = None
+            mcq["correct_answer"] = claimed
+            mcq["is_verified"] = False
+        return False
@@ -0,0 +1,78 @@
+# utils/mcq_grammar.py
+
+import logging
+import re
+import threading
+
+OPTION_LETTERS = ["A", "B", "C", "D", "E"]
+
+_grammar_cache = {}
+_grammar_lock = threading.Lock()
+
+
+def build_mcq_grammar(count):
+    """
+    GBNF grammar that only admits `count` MCQs in the exact layout:
+
+        Question 1: <text>
+        A) <text>
+        ...
+        E) <text>
+        Correct Answer: <A-E>
+    """
+    questions = " ".join(f"q{i}" for i in range(1, count + 1))
+    rules = [f"root ::= {questions}"]
+    for i in range(1, count + 1):
+        rules.append(
+            f'q{i} ::= "Question {i}: " line '
+            + " ".join(f'"{letter}) " line' for letter in OPTION_LETTERS)
+            + ' "Correct Answer: " [A-E] "\\n"'
+        )
+    rules.append('line ::= [^\\n]+ "\\n"')
+    return "\n".join(rules)
+
+
+def grammar_from_source(source):
+    """Compile (and cache) a LlamaGrammar. Returns None when llama.cpp rejects or cannot load it."""
+    with _grammar_lock:
+        if source in _grammar_cache:
+            return _grammar_cache[source]
+
+    try:
+        from llama_cpp import LlamaGrammar
+
+        grammar = LlamaGrammar.from_string(source, verbose=False)
+        # Kept so the grammar can be re-created on the other side of the inference server
+        grammar.gbnf_source = source
+    except Exception as e:
+        logging.error(f"⚠ Could not compile MCQ grammar, falling back to free-text mode: {e}")
+        grammar = None
+
+    with _grammar_lock:
+        _grammar_cache[source] = grammar
+    return grammar
+
+
+def get_mcq_grammar(count):
+    return grammar_from_source(build_mcq_grammar(count))
+
+
+def parse_grammar_mcqs(raw_output):
+    """Split grammar-constrained output into MCQ dicts. Only complete questions are returned."""
+    mcqs = []
+    blocks = re.split(r"^Question \d+: ", raw_output.strip(), flags=re.MULTILINE)
+    for block in blocks:
+        lines = block.split("\n")
+        if len(lines) < 7 or not lines[6].startswith("Correct Answer: "):
+            continue
+
+        question = lines[0].strip()
+        options = {
+            letter: line[3:].strip()
+            for letter, line in zip(OPTION_LETTERS, lines[1:6])
+            if line.startswith(f"{letter}) ")
+        }
+        correct_answer = lines[6][len("Correct Answer: "):].strip()
+        if question and len(options) == 5 and correct_answer in options:
+            mcqs.append({"question": question, "options": options, "correct_answer": correct_answer})
+    return mcqs
@@ -0,0 +1,182 @@
+# utils/mcq_pool.py
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+import numpy as np
+from utils.generate_question import iter_generate_mcq
+from utils.llm_scheduler import llm_scheduler, llm_job, IDLE, LLMQueueFullError
+from utils.embedding_cache import embedding_cache
+from utils.model_loader import get_model_status
+from utils.quiz_generation_methods import assign_difficulty_parameter, assign_discrimination_parameter
+
+MCQ_POOL_ENABLED = os.getenv("MCQ_POOL_ENABLED", "on").lower() != "off"
+MCQ_POOL_DEPTH = int(os.getenv("MCQ_POOL_DEPTH", "9"))
+MCQ_POOL_IDLE_POLL_SECONDS = float(os.getenv("MCQ_POOL_IDLE_POLL_SECONDS", "2"))
+
+POOL_LEVELS = ("easy", "medium", "hard")
+# LLM calls made while refilling are attributed to this pseudo-user in the scheduler
+POOL_USER = "mcq-pool"
+
+
+class MCQPool:
+    """
+    Buffer of generated, deduplicated and verified MCQs per difficulty level.
+
+    A daemon thread tops up the most depleted level whenever the LLM scheduler is idle; its
+    calls go through the idle lane so they never delay a user's request by more than the
+    decode already in progress. Pooled MCQs were generated for no particular user, so their
+    IRT b/a parameters are assigned when they are drawn, relative to the drawing user's theta.
+    """
+
+    def __init__(self, depth=MCQ_POOL_DEPTH, levels=POOL_LEVELS):
+        self.depth = depth
+        self._levels = {level: deque() for level in levels}
+        self._lock = threading.Lock()
+        self._thread = None
+
+        self._requested = 0
+        self._hits = 0
+        self._served = 0
+        self._refill_rounds = 0
+        self._refilled = 0
+        self._refill_seconds = 0.0
+
+    # ---------- drawing ----------
+
+    def draw(self, difficulty, user_id, exclude=(), past_embeddings=None, similarity_threshold=0.65,
+             quiz_context=None, quiz_threshold=0.85):
+        """
+        Yield pooled MCQs for user_id one at a time, removing each from the pool only when it is
+        taken. MCQs whose text is in `exclude` (seen questions), that are too close to
+        `past_embeddings`, or that are in or too close to quiz_context (the quiz's
+        QuizSimilarityContext, checked as it grows) stay in the pool for other users.
+        """
+        entries = self._levels.get(difficulty)
+        if entries is None:
+            return
+
+        with self._lock:
+            self._requested += 1
+        served = 0
+
+        while True:
+            with self._lock:
+                entry = self._take(
+                    entries, exclude, past_embeddings, similarity_threshold, quiz_context, quiz_threshold
+                )
+                if entry is None:
+                    return
+                if not served:
+                    self._hits += 1
+                self._served += 1
+            served += 1
+
+            mcq = dict(entry["mcq"])
+            mcq["b"] = assign_difficulty_parameter(user_id, difficulty)
+            mcq["a"] = assign_discrimination_parameter()
+            yield mcq
+
+    @staticmethod
+    def _take(entries, exclude, past_embeddings, similarity_threshold, quiz_context=None, quiz_threshold=0.85):
+        for i, entry in enumerate(entries):
+            question = entry["mcq"]["question"]
+            if question in exclude:
+                continue
+            if quiz_context is not None and (
+                question in quiz_context or quiz_context.max_similarity(entry["vector"]) >= quiz_threshold
+            ):
+                continue
+            if past_embeddings is not None and len(past_embeddings):
+                similarity = past_embeddings @ entry["vector"] / (
+                    np.linalg.norm(past_embeddings, axis=1) * np.linalg.norm(entry["vector"]) + 1e-12
+                )
+                if similarity.max() >= similarity_threshold:
+                    continue
+            del entries[i]
+            return entry
+        return None
+
+    # ---------- refilling ----------
+
+    def _most_depleted(self):
+        with self._lock:
+            level, entries = min(self._levels.items(), key=lambda item: len(item[1]))
+            return level if len(entries) < self.depth else None
+
+    def refill(self, difficulty):
+        """Run one generation round for a level and add every accepted MCQ to the pool."""
+        with self._lock:
+            pooled_questions = {
+                entry["mcq"]["question"] for entries in self._levels.values() for entry in entries
+            }
+
+        started = time.perf_counter()
+        added = 0
+        with llm_job(POOL_USER, IDLE):
+            # POOL_USER is not a real user, so IRT parameters are assigned in draw() instead
+            for mcq in iter_generate_mcq(
+                difficulty, POOL_USER, max_retries=1, existing_questions=pooled_questions, assign_irt=False
+            ):
+                vector = embedding_cache.encode_one(mcq["question"], persist=True)
+                with self._lock:
+                    self._levels[difficulty].append({"mcq": mcq, "vector": vector})
+                added += 1
+
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._refill_rounds += 1
+            self._refilled += added
+            self._refill_seconds += elapsed
+        logging.info(f"🧺 MCQ pool: +{added} {difficulty} questions in {elapsed:.1f}s")
+        return added
+
+    def _refill_forever(self):
+        while True:
+            level = self._most_depleted()
+            if level is None or not llm_scheduler.is_idle() or not get_model_status()["ready"]:
+                time.sleep(MCQ_POOL_IDLE_POLL_SECONDS)
+                continue
+            try:
+                self.refill(level)
+            except LLMQueueFullError:
+                time.sleep(MCQ_POOL_IDLE_POLL_SECONDS)
+            except Exception as e:
+                logging.error(f" MCQ pool refill failed: {e}")
+                time.sleep(MCQ_POOL_IDLE_POLL_SECONDS)
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._refill_forever, name="mcq-pool", daemon=True)
+        self._thread.start()
+
+    # ---------- metrics ----------
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "enabled": MCQ_POOL_ENABLED,
+                "target_depth": self.depth,
+                "depth": {level: len(entries) for level, entries in self._levels.items()},
+                "draws": self._requested,
+                "hits": self._hits,
+                "hit_rate": round(self._hits / self._requested, 4) if self._requested else 0.0,
+                "served_mcqs": self._served,
+                "refill_rounds": self._refill_rounds,
+                "refilled_mcqs": self._refilled,
+                "refill_mcqs_per_second": (
+                    round(self._refilled / self._refill_seconds, 4) if self._refill_seconds else 0.0
+                ),
+            }
+
+
+mcq_pool = MCQPool()
+
+
+def start_mcq_pool():
+    if MCQ_POOL_ENABLED:
+        mcq_pool.start()
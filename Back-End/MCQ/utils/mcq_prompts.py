@@ -0,0 +1,56 @@
+# utils/mcq_prompts.py
+
+# Fixed part of every MCQ generation prompt. It always comes first and never changes between calls,
+# so llama.cpp can reuse its evaluated KV state (see utils/prompt_cache.py) and only evaluate the
+# per-call suffix (difficulty, ability level, context questions).
+MCQ_INSTRUCTION_PREFIX = """You write multiple-choice biology questions for A/L students.
+
+Each question must follow this format exactly:
+
+Question 1: <Insert your question>
+A) <Option A>
+B) <Option B>
+C) <Option C>
+D) <Option D>
+E) <Option E>
+Correct Answer: <A/B/C/D/E>
+
+Do not include explanations, numbering, answer keys, or extra text."""
+
+
+def build_llama2_chat_prompt(instruction: str) -> str:
+    return f"<s>[INST] {instruction.strip()} [/INST]"
+
+
+def mcq_prompt_prefix() -> str:
+    """The exact leading text shared by every prompt from build_mcq_prompt()."""
+    return f"<s>[INST] {MCQ_INSTRUCTION_PREFIX}"
+
+
+def format_context_questions(context_questions):
+    """Context rows from retrieve_context_questions, as prompt bullet lines."""
+    if context_questions.empty:
+        return []
+    return [
+        f"- {row['Question Text']} (Correct Answer: {row['Correct Answer']})"
+        for _, row in context_questions.iterrows()
+    ]
+
+
+def build_mcq_prompt(remaining, difficulty, context_list=None, theta=None):
+    """Stable instruction prefix first, then the parts that vary per call."""
+    lines = [MCQ_INSTRUCTION_PREFIX, ""]
+
+    if context_list:
+        lines.append("The new questions must be **different** from these:")
+        lines.extend(context_list)
+        lines.append("")
+
+    if theta is not None:
+        lines.append(f"**User's Estimated Ability Level (IRT Theta):** {theta}")
+
+    lines.append(
+        f"Generate {remaining} **{difficulty}** level multiple-choice biology "
+        f"question{'s' if remaining > 1 else ''}."
+    )
+    return build_llama2_chat_prompt("\n".join(lines))
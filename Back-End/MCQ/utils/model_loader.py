@@ -1,11 +1,180 @@
-from sentence_transformers import SentenceTransformer
-from llama_cpp import Llama
+import logging
+import threading
+import time
+from utils.embedding_backends import load_embedding_backend
+from utils.embedding_batcher import MicroBatchingEncoder
+from utils.inference_client import INFERENCE_SERVER_SOCKET, RemoteModel
+from utils.llm_scheduler import ScheduledLLM, llm_scheduler
+from utils.mcq_prompts import mcq_prompt_prefix
+from utils.model_profiles import get_model_profile
+from utils.prompt_cache import LLM_PREFIX_CACHE, PrefixCachedLlama
+from utils.speculative import LLM_SPECULATIVE, build_draft_model
 
-embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
 
-llm = Llama(
-    model_path="model/llama2-q8_0.gguf",
-    n_ctx=2048,
-    n_threads=4,
-    verbose=False
-)
+class LazyModel:
+    """
+    Proxy that builds the wrapped model on first use and forwards calls and attribute access to it.
+
+    Loading can be started early in a background thread with start_background_load(); callers that
+    arrive before it finishes simply block until the model is ready.
+    """
+
+    def __init__(self, name, loader, warmup=None):
+        self._name = name
+        self._loader = loader
+        self._warmup = warmup
+        self._model = None
+        self._lock = threading.Lock()
+        self.state = "pending"
+        self.error = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+
+    def load(self):
+        """Return the underlying model, loading (and warming it up) if necessary."""
+        if self._model is not None:
+            return self._model
+
+        with self._lock:
+            if self._model is not None:
+                return self._model
+
+            self.state = "loading"
+            self.error = None
+            try:
+                started = time.perf_counter()
+                model = self._loader()
+                self.load_seconds = round(time.perf_counter() - started, 3)
+
+                if self._warmup is not None:
+                    self.state = "warming_up"
+                    started = time.perf_counter()
+                    self._warmup(model)
+                    self.warmup_seconds = round(time.perf_counter() - started, 3)
+            except Exception as e:
+                self.state = "failed"
+                self.error = str(e)
+                logging.error(f"❌ Failed to load {self._name}: {e}")
+                raise
+
+            self._model = model
+            self.state = "ready"
+            logging.info(
+                f"✅ {self._name} ready (load {self.load_seconds}s, warmup {self.warmup_seconds or 0}s)"
+            )
+            return model
+
+    def start_background_load(self):
+        """Start loading in a daemon thread. Errors are recorded in the status, not raised."""
+        if self.state != "pending":
+            return
+
+        def _load_quietly():
+            try:
+                self.load()
+            except Exception:
+                pass
+
+        threading.Thread(target=_load_quietly, name=f"{self._name}-loader", daemon=True).start()
+
+    @property
+    def is_ready(self):
+        return self._model is not None
+
+    def status(self):
+        return {
+            "state": self.state,
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "error": self.error,
+        }
+
+    def __getattr__(self, item):
+        if item.startswith("_"):
+            raise AttributeError(item)
+        return getattr(self.load(), item)
+
+    def __call__(self, *args, **kwargs):
+        return self.load()(*args, **kwargs)
+
+
+def _load_local_embedding_model():
+    # EMBEDDING_BACKEND picks PyTorch or ONNX Runtime (fp32 or int8); see utils/embedding_backends.py
+    return load_embedding_backend()
+
+
+def _warmup_embedding_model(model):
+    model.encode(["Warm-up sentence about cell biology."])
+
+
+def create_local_llm(profile=None, speculative=LLM_SPECULATIVE, prefix_cache=LLM_PREFIX_CACHE):
+    """
+    Build the llama.cpp model from a model profile (see utils/model_profiles.py);
+    benchmarks call this directly to compare profiles and decoding modes.
+    """
+    from llama_cpp import Llama
+
+    profile = profile or get_model_profile()
+    logging.info(f"🦙 Loading {profile['model_path']} ({profile['n_threads']} threads, n_ctx {profile['n_ctx']})")
+    model = Llama(
+        **profile,
+        draft_model=build_draft_model(speculative, n_ctx=profile["n_ctx"], n_threads=profile["n_threads"]),
+        verbose=False
+    )
+    if prefix_cache:
+        model = PrefixCachedLlama(model, [mcq_prompt_prefix()])
+    return model
+
+
+def _load_local_llm():
+    return create_local_llm()
+
+
+def _warmup_llm(model):
+    # Starts with the MCQ instruction prefix so the context is left primed for the first quiz
+    model(f"{mcq_prompt_prefix()}\nSay OK. [/INST]", max_tokens=1)
+
+
+def _load_remote(target):
+    """Connect to the shared inference server instead of loading a private copy of the model."""
+    model = RemoteModel(target)
+    model.ping()
+    return model
+
+
+def _load_embedding_model():
+    if INFERENCE_SERVER_SOCKET:
+        return _load_remote("embedding_model")
+    return _load_local_embedding_model()
+
+
+def _load_llm():
+    if INFERENCE_SERVER_SOCKET:
+        return _load_remote("llm")
+    return _load_local_llm()
+
+
+_embedding_model = LazyModel("embedding_model", _load_embedding_model, _warmup_embedding_model)
+_llm_model = LazyModel("llm", _load_llm, _warmup_llm)
+
+# Concurrent encode calls from the threadpool are merged into one forward pass
+embedding_model = MicroBatchingEncoder(_embedding_model)
+
+# llama.cpp is not safe for concurrent use: all completions are serialized through the scheduler
+llm = ScheduledLLM(_llm_model, llm_scheduler)
+
+MODELS = {"embedding_model": _embedding_model, "llm": _llm_model}
+
+
+def start_background_loading():
+    """Kick off loading of every model without blocking process start-up."""
+    for model in MODELS.values():
+        model.start_background_load()
+
+
+def get_model_status():
+    components = {name: model.status() for name, model in MODELS.items()}
+    return {
+        "ready": all(model.is_ready for model in MODELS.values()),
+        "components": components,
+    }
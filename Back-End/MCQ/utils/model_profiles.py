@@ -0,0 +1,57 @@
+# utils/model_profiles.py
+
+import os
+
+# llama.cpp settings per GGUF build. LLM_PROFILE picks one; the LLM_* variables below override
+# single fields, so a benchmark (or a deployment) can try another thread count without a new profile.
+MODEL_PROFILES = {
+    "q8_0": {
+        "model_path": "model/llama2-q8_0.gguf",
+        "n_ctx": 2048,
+        "n_threads": 4,
+        "n_threads_batch": 4,
+        "n_batch": 512,
+        "use_mmap": True,
+        "use_mlock": False,
+    },
+    "q4_k_m": {
+        "model_path": "model/llama2-q4_K_M.gguf",
+        "n_ctx": 2048,
+        "n_threads": 4,
+        "n_threads_batch": 4,
+        "n_batch": 512,
+        "use_mmap": True,
+        "use_mlock": False,
+    },
+}
+
+LLM_PROFILE = os.getenv("LLM_PROFILE", "q8_0")
+
+_ENV_OVERRIDES = {
+    "model_path": ("LLM_MODEL_PATH", str),
+    "n_ctx": ("LLM_N_CTX", int),
+    "n_threads": ("LLM_N_THREADS", int),
+    "n_threads_batch": ("LLM_N_THREADS_BATCH", int),
+    "n_batch": ("LLM_N_BATCH", int),
+    "use_mmap": ("LLM_USE_MMAP", lambda v: v.lower() not in ("0", "false", "off")),
+    "use_mlock": ("LLM_USE_MLOCK", lambda v: v.lower() not in ("0", "false", "off")),
+}
+
+
+def get_model_profile(name=None, overrides=None):
+    """Llama() keyword arguments for a profile, with LLM_* environment overrides applied, then `overrides`."""
+    name = name or LLM_PROFILE
+    if name not in MODEL_PROFILES:
+        raise ValueError(f"Unknown LLM_PROFILE '{name}' (expected one of {sorted(MODEL_PROFILES)})")
+
+    profile = dict(MODEL_PROFILES[name])
+    for field, (variable, parse) in _ENV_OVERRIDES.items():
+        value = os.getenv(variable)
+        if value:
+            profile[field] = parse(value)
+    profile.update(overrides or {})
+    return profile
+
+
+# Context size the generators budget max_tokens against
+LLM_CONTEXT_TOKENS = get_model_profile()["n_ctx"]
@@ -0,0 +1,100 @@
+# utils/prompt_cache.py
+
+import hashlib
+import logging
+import os
+import pickle
+import numpy as np
+
+LLM_PREFIX_CACHE = os.getenv("LLM_PREFIX_CACHE", "on").lower() != "off"
+LLM_PREFIX_CACHE_DIR = os.getenv("LLM_PREFIX_CACHE_DIR", "model/prompt_cache")
+
+
+def _model_file_signature(model_path):
+    """Size and mtime of the model file, so replacing the GGUF at the same path invalidates saved states."""
+    try:
+        stat = os.stat(model_path)
+    except OSError:
+        return "missing"
+    return f"{stat.st_size}|{stat.st_mtime_ns}"
+
+
+def _common_prefix_length(a, b):
+    n = min(len(a), len(b))
+    if n == 0:
+        return 0
+    mismatch = np.flatnonzero(np.asarray(a[:n]) != np.asarray(b[:n]))
+    return int(mismatch[0]) if mismatch.size else n
+
+
+class PrefixCachedLlama:
+    """
+    Wraps a llama_cpp.Llama so that prompts starting with a known prefix never re-evaluate it.
+
+    The KV state after evaluating each prefix is captured once with save_state() and pickled to
+    LLM_PREFIX_CACHE_DIR, so a restart loads it instead of paying the prompt evaluation again.
+    Before a completion, if the context no longer holds the prefix (e.g. an explanation prompt
+    ran in between), the saved state is restored with load_state() and llama.cpp only evaluates
+    the remaining suffix tokens.
+    """
+
+    def __init__(self, model, prefixes, cache_dir=LLM_PREFIX_CACHE_DIR):
+        self._model = model
+        self._cache_dir = cache_dir
+        self._entries = []
+        self.restores = 0
+        for prefix in prefixes:
+            try:
+                self._entries.append(self._load_or_build(prefix))
+            except Exception as e:
+                logging.warning(f"⚠ Could not prepare prompt prefix cache: {e}")
+
+    def _state_path(self, prefix):
+        model_path = self._model.model_path
+        key = hashlib.sha256(
+            f"{model_path}|{_model_file_signature(model_path)}|{self._model.n_ctx()}|{prefix}".encode("utf-8")
+        ).hexdigest()[:24]
+        return os.path.join(self._cache_dir, f"prefix_{key}.state")
+
+    def _load_or_build(self, prefix):
+        tokens = self._model.tokenize(prefix.encode("utf-8"))
+        path = self._state_path(prefix)
+
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                state = pickle.load(f)
+            logging.info(f"💾 Loaded cached prompt prefix state ({len(tokens)} tokens) from {path}")
+        else:
+            self._model.reset()
+            self._model.eval(tokens)
+            state = self._model.save_state()
+
+            os.makedirs(self._cache_dir, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump(state, f)
+            os.replace(tmp_path, path)
+            logging.info(f"💾 Evaluated and saved prompt prefix state ({len(tokens)} tokens) to {path}")
+
+        return prefix, tokens, state
+
+    def _restore_prefix(self, prompt):
+        for prefix, tokens, state in self._entries:
+            if not prompt.startswith(prefix):
+                continue
+            current = self._model.input_ids[: self._model.n_tokens]
+            # The last prefix token may merge with the suffix when the full prompt is tokenized
+            if _common_prefix_length(current, tokens) < len(tokens) - 1:
+                self._model.load_state(state)
+                self.restores += 1
+            return
+
+    def __call__(self, prompt, *args, **kwargs):
+        if isinstance(prompt, str):
+            self._restore_prefix(prompt)
+        return self._model(prompt, *args, **kwargs)
+
+    def __getattr__(self, item):
+        if item.startswith("_"):
+            raise AttributeError(item)
+        return getattr(self._model, item)
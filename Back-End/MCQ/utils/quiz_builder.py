@@ -0,0 +1,222 @@
+# utils/quiz_builder.py
+
+import json
+import logging
+import queue
+import time
+import uuid
+from threading import Thread, Event
+from database.database import quizzes_collection
+from utils.answer_verifier import verify_quiz_answers_async
+from utils.generate_question import iter_generate_mcq, iter_generate_mcq_based_on_performance
+from utils.llm_scheduler import llm_job, BATCH, LLMQueueFullError
+from utils.mcq_pool import mcq_pool, MCQ_POOL_ENABLED
+from utils.quiz_generation_methods import fetch_questions_from_db
+from utils.quiz_similarity import QuizSimilarityContext
+from utils.seen_questions import load_seen_questions, store_quiz_embeddings
+
+# Define difficulty levels
+DIFFICULTY_DISTRIBUTION = {"easy": 8, "medium": 6, "hard": 6}
+
+# Pooled MCQs are skipped if they appeared in any of the user's last few quizzes
+POOL_SEEN_QUIZZES = 5
+
+
+def format_mcq(mcq, difficulty):
+    """Shape a generated MCQ the way quizzes store and return it."""
+    formatted = {
+        "question_text": mcq.get("question", ""),
+        "option1": mcq.get("options", {}).get("A", "N/A"),
+        "option2": mcq.get("options", {}).get("B", "N/A"),
+        "option3": mcq.get("options", {}).get("C", "N/A"),
+        "option4": mcq.get("options", {}).get("D", "N/A"),
+        "option5": mcq.get("options", {}).get("E", "N/A"),
+        "correct_answer": mcq.get("correct_answer", "N/A"),
+        "difficulty": difficulty
+    }
+    #  Keep the generation-time verification so it is not repeated after the quiz is saved
+    if mcq.get("is_verified"):
+        formatted.update({
+            "claimed_answer": mcq.get("claimed_answer"),
+            "verified_answer": mcq.get("verified_answer"),
+            "is_verified": True,
+        })
+    return formatted
+
+
+def iter_quiz_mcqs(difficulty_distribution, generate_batch, quiz_context):
+    """
+    Fill every difficulty quota, yielding each formatted MCQ as soon as the generator accepts it.
+    generate_batch(difficulty) returns an iterator of raw MCQs (one LLM round of up to 3 questions).
+    Accepted questions are added to quiz_context, the QuizSimilarityContext shared with the generators.
+    """
+    for difficulty, count in difficulty_distribution.items():
+        generated = 0
+        failed_attempts = 0
+
+        while generated < count and failed_attempts < 5:
+            received = 0
+            for mcq in generate_batch(difficulty):
+                received += 1
+                q_text = mcq.get("question", "")
+                if not q_text or q_text in quiz_context:
+                    continue
+
+                quiz_context.add(q_text)
+                generated += 1  #  Increase count only if a valid MCQ is added
+                yield format_mcq(mcq, difficulty)
+
+                if generated >= count:
+                    break
+
+            if not received:
+                failed_attempts += 1
+                logging.warning(f"⚠ No MCQs received. Retrying... ({failed_attempts}/5)")
+
+        #  Log how many MCQs were generated per difficulty
+        logging.info(f" Successfully generated {generated}/{count} {difficulty}-level MCQs.")
+
+
+def pool_first(user_id, quiz_context, generate_live, seen_questions=None, past_embeddings=None):
+    """
+    Wrap a generate_batch function so each batch is drawn from the pre-generated MCQ pool,
+    falling back to live generation only when the pool has nothing suitable for this user.
+    seen_questions is the request's SeenQuestions; it is loaded here if not given.
+    """
+    if not MCQ_POOL_ENABLED:
+        return generate_live
+
+    if seen_questions is None:
+        seen_questions = load_seen_questions(user_id, limit=POOL_SEEN_QUIZZES)
+    excluded = set(seen_questions.recent(POOL_SEEN_QUIZZES).questions)
+
+    def generate_batch(difficulty):
+        received = False
+        for mcq in mcq_pool.draw(
+            difficulty, user_id, exclude=excluded, past_embeddings=past_embeddings, quiz_context=quiz_context
+        ):
+            received = True
+            yield mcq
+        if not received:
+            yield from generate_live(difficulty)
+
+    return generate_batch
+
+
+def iter_standard_quiz(user_id, quiz_context=None, difficulty_distribution=None):
+    quiz_context = quiz_context if quiz_context is not None else QuizSimilarityContext()
+    return iter_quiz_mcqs(
+        difficulty_distribution or DIFFICULTY_DISTRIBUTION,
+        pool_first(
+            user_id,
+            quiz_context,
+            lambda difficulty: iter_generate_mcq(difficulty, user_id, existing_questions=quiz_context),
+        ),
+        quiz_context,
+    )
+
+
+def iter_adaptive_quiz(user_id, difficulty_distribution, question_count, seen_questions=None, quiz_context=None):
+    """
+    Adaptive quiz MCQs; tops up from previously stored questions if generation falls short.
+    seen_questions (SeenQuestions) is loaded once per request; new questions must not be
+    too similar to the user's last quiz.
+    """
+    quiz_context = quiz_context if quiz_context is not None else QuizSimilarityContext()
+    if seen_questions is None:
+        seen_questions = load_seen_questions(user_id, limit=POOL_SEEN_QUIZZES)
+    past_embeddings = seen_questions.recent(1).vectors
+    produced = len(quiz_context)
+
+    for mcq in iter_quiz_mcqs(
+        difficulty_distribution,
+        pool_first(
+            user_id,
+            quiz_context,
+            lambda difficulty: iter_generate_mcq_based_on_performance(
+                user_id, difficulty, existing_questions=quiz_context, past_embeddings=past_embeddings
+            ),
+            seen_questions=seen_questions,
+            past_embeddings=past_embeddings,
+        ),
+        quiz_context,
+    ):
+        produced += 1
+        yield mcq
+
+    if produced < question_count:
+        remaining_needed = question_count - produced
+        logging.warning(f"⚠ Not enough questions generated. Fetching {remaining_needed} from DB.")
+        for mcq in fetch_questions_from_db(remaining_needed):
+            yield mcq
+
+
+def save_quiz(user_id, difficulty_distribution, mcqs, quiz_id=None):
+    """
+    Store the quiz and start background answer verification. Returns the quiz id.
+    Saving again with the same quiz_id (a resumed job) keeps the quiz already stored.
+    """
+    quiz_id = quiz_id or str(uuid.uuid4())  # Unique quiz session ID
+    quiz_data = {
+        "quiz_id": quiz_id,
+        "user_id": user_id,
+        "difficulty_distribution": difficulty_distribution,
+        "questions": mcqs,
+        "created_at": time.time(),
+    }
+    stored = quizzes_collection.update_one({"quiz_id": quiz_id}, {"$setOnInsert": quiz_data}, upsert=True)
+    if stored.upserted_id is None:
+        # Embeddings are upserted and verification skips verified questions, so both can run again
+        logging.warning(f"⚠ Quiz {quiz_id} was already saved; keeping the stored copy.")
+    try:
+        store_quiz_embeddings(quiz_id, user_id, [q.get("question_text") for q in mcqs], quiz_data["created_at"])
+    except Exception as e:
+        # load_seen_questions embeds and backfills quizzes that have no stored vectors
+        logging.error(f"⚠ Could not store embeddings for quiz {quiz_id}: {e}")
+    Thread(target=verify_quiz_answers_async, args=(quiz_id,)).start()
+    return quiz_id
+
+
+def stream_quiz_ndjson(user_id, difficulty_distribution, build_mcqs):
+    """
+    NDJSON frames for a streaming quiz endpoint: one {"type": "mcq"} frame per accepted question,
+    then {"type": "done", "quiz_id": ...} once the quiz is saved (or {"type": "error"}).
+
+    Generation runs in its own thread so LLM calls keep one llm_job context no matter which
+    threadpool thread pulls the next frame. If the client disconnects, generation stops and
+    the partial quiz is discarded.
+    """
+    frames = queue.Queue()
+    cancelled = Event()
+
+    def produce():
+        mcqs = []
+        try:
+            with llm_job(user_id, BATCH):
+                for mcq in build_mcqs():
+                    if cancelled.is_set():
+                        logging.info(f"🛑 Client left; stopping streamed quiz for user {user_id}.")
+                        return
+                    mcqs.append(mcq)
+                    frames.put({"type": "mcq", "index": len(mcqs) - 1, "mcq": mcq})
+
+            quiz_id = save_quiz(user_id, difficulty_distribution, mcqs)
+            frames.put({"type": "done", "quiz_id": quiz_id, "total_questions": len(mcqs)})
+        except LLMQueueFullError as e:
+            frames.put({"type": "error", "status_code": 429, "detail": str(e)})
+        except Exception as e:
+            logging.error(f" Error while streaming quiz: {e}")
+            frames.put({"type": "error", "status_code": 500, "detail": "An error occurred while generating the quiz."})
+        finally:
+            frames.put(None)
+
+    Thread(target=produce, daemon=True).start()
+
+    try:
+        while True:
+            frame = frames.get()
+            if frame is None:
+                break
+            yield json.dumps(frame, default=str) + "\n"
+    finally:
+        cancelled.set()
@@ -1,14 +1,16 @@
 import random
 from routes.response_routes import estimate_student_ability
 import logging
-import faiss
 import numpy as np
 import pandas as pd
 import re
 from bson import ObjectId
 from database.database import quizzes_collection
-from utils.model_loader import embedding_model
-from sklearn.metrics.pairwise import cosine_similarity
+from utils.embedding_cache import embedding_cache
+from utils.quiz_similarity import QuizSimilarityContext
+from utils.seen_questions import load_seen_questions
+from utils.corpus_store import get_corpus_store
+from utils.context_retriever import get_context_retriever
 
 # Track seen questions to avoid duplicates
 seen_questions = set()
@@ -16,54 +18,37 @@ seen_questions = set()
 # Logging configuration
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-# Load FAISS index and dataset
-index = faiss.read_index("dataset/question_embeddings.index")
-embeddings_matrix = np.load("dataset/question_embeddings.npy")
-dataset = pd.read_csv("dataset/question_dataset_with_clusters.csv")
-
 # Method to retrieve diverse context questions to generate new questions
-def retrieve_context_questions(query_text, top_k=3):
-    """Retrieve diverse MCQs from different clusters and difficulty levels for better generation context."""
-    query_vector = embedding_model.encode([query_text]).astype(np.float32)
-
-    if index.ntotal == 0:
+def retrieve_context_questions(query_text, top_k=3, seed_row=None):
+    """
+    Retrieve top_k relevant MCQs spread over clusters and difficulty levels (MMR) as generation context.
+    When query_text is seed dataset row seed_row and the k-NN graph is current, its precomputed
+    neighbours are used instead of encoding the text and searching FAISS.
+    """
+    corpus = get_corpus_store()
+    if corpus.index.ntotal == 0:
         logging.warning("⚠ FAISS index is empty! No previous questions available.")
         return pd.DataFrame()
 
-    # Retrieve 3x top_k for diversity filtering
-    D, I = index.search(query_vector, k=min(top_k * 3, index.ntotal))
-
-    valid_indices = [i for i in I[0] if 0 <= i < len(dataset)]
-    retrieved_questions = dataset.iloc[valid_indices]
-
-    unique_clusters = set()
-    used_difficulties = set()
-    context_questions = []
-
-    for _, row in retrieved_questions.iterrows():
-        cluster = row["Cluster"]
-        difficulty = row.get("Difficulty Level", "").lower()
-
-        if cluster not in unique_clusters and difficulty not in used_difficulties:
-            context_questions.append(row)
-            unique_clusters.add(cluster)
-            used_difficulties.add(difficulty)
-
-        if len(context_questions) >= top_k:
-            break
+    retriever = get_context_retriever()
+    graph = corpus.knn_graph if seed_row is not None else None
+    if graph is not None:
+        context = retriever.retrieve_for_row(seed_row, graph, top_k)
+    else:
+        context = retriever.retrieve(embedding_cache.encode([query_text]), top_k)
+    context_questions = pd.DataFrame(context)
 
-    if not context_questions:
+    if context_questions.empty:
         logging.warning("⚠ No diverse context questions found.")
 
     else:
         logging.info("🧠 Context Questions Selected:")
-        for row in context_questions:
-            logging.info(
-                f" - Cluster: {row['Cluster']}, Difficulty: {row.get('Difficulty Level', 'N/A')}, "
-                f"Q: {row['Question Text'][:60]}..."
-            )
+        for cluster, difficulty, question in zip(
+            context_questions["Cluster"], context_questions["Difficulty Level"], context_questions["Question Text"]
+        ):
+            logging.info(f" - Cluster: {cluster}, Difficulty: {difficulty or 'N/A'}, Q: {question[:60]}...")
 
-    return pd.DataFrame(context_questions)
+    return context_questions
 
 
 # Method to assign difficulty parameter based on student ability
@@ -86,60 +71,14 @@ def assign_discrimination_parameter():
 
 def is_similar_to_same_quiz_questions(new_question, existing_questions, threshold=0.85):
     """Check if the new question is too similar to previously generated questions."""
-    
-    if not existing_questions:
-        return False  # No previous questions to compare with
-    
-    # Encode the new question
-    new_vector = embedding_model.encode([new_question]).astype(np.float32)
-
-    # Encode existing questions
-    existing_vectors = embedding_model.encode(list(existing_questions)).astype(np.float32)
-
-    # Compute cosine similarity
-    similarity_scores = cosine_similarity(new_vector, existing_vectors)[0]
-
-    # Get the max similarity score
-    max_similarity = max(similarity_scores) if similarity_scores.size else 0
-
-    # If the similarity score is too high, reject the question
-    if max_similarity >= threshold:
-        logging.warning(f"⚠ Similarity {max_similarity} exceeds threshold {threshold}. Skipping question: {new_question}")
-        return True  
-
-    return False  # Safe to use
+    if not isinstance(existing_questions, QuizSimilarityContext):
+        existing_questions = QuizSimilarityContext(existing_questions)
+    return existing_questions.is_similar(new_question, threshold)
 
 def is_similar_to_past_quiz_questions(new_question, user_id, threshold=0.65):
     """Check if the generated question is similar to any question from past quizzes of the same user."""
-    
-    seen_questions = get_seen_questions(user_id)
-    
-    if not seen_questions:
-        return False  #  If no past questions exist, return False (not similar)
-
-    # Generate embeddings for the new question
-    new_vector = embedding_model.encode([new_question]).astype(np.float32).reshape(1, -1)
-
-    # Generate embeddings for past questions (only if questions exist)
-    past_vectors = embedding_model.encode(seen_questions).astype(np.float32) if seen_questions else np.array([])
-    
-    # Handle case where there are no past vectors
-    if past_vectors.shape[0] == 0:
-        return False  
-
-    # Ensure past vectors are correctly shaped (2D array)
-    past_vectors = past_vectors.reshape(len(past_vectors), -1)
-    
-    # Compute cosine similarity with all past questions
-    similarity_scores = cosine_similarity(new_vector, past_vectors)[0]
-
-    # Check if similarity exceeds threshold
-    max_sim = max(similarity_scores) if len(similarity_scores) > 0 else 0
-    if max_sim >= threshold:
-        logging.warning(f"🚫 Too Similar to Past Quiz Questions: {new_question} (Max Cosine Sim: {max_sim})")
-        return True  
-
-    return False
+    # Stored embeddings of the last quiz; nothing is re-encoded except the new question
+    return load_seen_questions(user_id, limit=1).is_similar(new_question, threshold)
 
 # Method to get IRT-based difficulty distribution for a user
 def get_irt_based_difficulty_distribution(user_id, total_questions):
@@ -269,17 +208,23 @@ def fetch_questions_from_db(count=1):
         logging.error(f" Error fetching backup MCQs from DB: {e}")
         return []
     
-def is_duplicate_faiss(new_question, index, threshold=0.85):
-    """Check if a newly generated question is too similar to stored FAISS index questions."""
+def faiss_max_similarity(vectors):
+    """Highest cosine similarity of each row of vectors to the seed corpus and generated questions, in one search."""
+    S, I = get_corpus_store().search_all(vectors, k=1)
+    return np.where(I[:, 0] >= 0, S[:, 0], -1.0)
+
+
+def is_duplicate_faiss(new_question, threshold=0.85):
+    """Check if a newly generated question is too similar to the seed corpus or previously generated questions."""
 
     # Encode the new question into a vector
-    new_vector = embedding_model.encode([new_question]).astype(np.float32)
+    new_vector = embedding_cache.encode([new_question])
 
-    # Search for the most similar questions in FAISS
-    D, I = index.search(new_vector, k=5)  # Retrieve top 5 similar questions
+    # Search the seed and generated indexes for the most similar question (cosine similarity)
+    S = faiss_max_similarity(new_vector)
 
-    if len(D[0]) > 0 and min(D[0]) <= (1 - threshold):  # Convert FAISS L2 distance to similarity
-        logging.warning(f"⚠ FAISS detected duplicate! Min distance: {min(D[0]):.4f}, Threshold: {1 - threshold:.4f}. Skipping question: {new_question}")
+    if S[0] >= threshold:
+        logging.warning(f"⚠ FAISS detected duplicate! Max cosine similarity: {S[0]:.4f}, Threshold: {threshold:.4f}. Skipping question: {new_question}")
         return True  
 
     return False  # No duplicate detected
@@ -0,0 +1,270 @@
+# utils/quiz_jobs.py
+
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pymongo import ReturnDocument
+from database.database import quiz_jobs
+from utils.llm_scheduler import llm_job, BATCH, LLMQueueFullError
+from utils.quiz_builder import (
+    DIFFICULTY_DISTRIBUTION,
+    iter_adaptive_quiz,
+    iter_standard_quiz,
+    save_quiz,
+)
+from utils.quiz_similarity import QuizSimilarityContext
+from utils.seen_questions import load_seen_questions
+
+QUIZ_JOB_WORKERS = int(os.getenv("QUIZ_JOB_WORKERS", "2"))
+# A job whose worker has not reported progress for this long is considered orphaned and resumed
+QUIZ_JOB_LEASE_SECONDS = int(os.getenv("QUIZ_JOB_LEASE_SECONDS", "600"))
+QUIZ_JOB_SWEEP_SECONDS = int(os.getenv("QUIZ_JOB_SWEEP_SECONDS", "60"))
+# When the LLM queue is full, a job goes back to "queued" and is picked up again after this delay
+QUIZ_JOB_RETRY_SECONDS = 30
+
+QUEUED, RUNNING, COMPLETED, FAILED = "queued", "running", "completed", "failed"
+
+WORKER_HOST = socket.gethostname()
+WORKER_ID = f"{WORKER_HOST}:{os.getpid()}"
+
+_executor = ThreadPoolExecutor(max_workers=QUIZ_JOB_WORKERS, thread_name_prefix="quiz-job")
+# Jobs handed to this process's executor and not finished yet, so sweeps do not submit them twice
+_submitted = set()
+_submitted_lock = threading.Lock()
+_sweeper_started = False
+_sweeper_lock = threading.Lock()
+
+
+def _submit(job_id):
+    """Hand a job to the executor unless this process already has it queued or running."""
+    with _submitted_lock:
+        if job_id in _submitted:
+            return False
+        _submitted.add(job_id)
+    _executor.submit(_run_submitted, job_id)
+    return True
+
+
+def _run_submitted(job_id):
+    try:
+        run_job(job_id)
+    finally:
+        with _submitted_lock:
+            _submitted.discard(job_id)
+
+
+def create_job(user_id, kind, difficulty_distribution, question_count):
+    """Persist a new quiz job and hand it to the worker pool. Returns the job id."""
+    now = time.time()
+    job_id = str(uuid.uuid4())
+    quiz_jobs.insert_one({
+        "job_id": job_id,
+        "user_id": user_id,
+        "kind": kind,
+        "status": QUEUED,
+        "difficulty_distribution": difficulty_distribution,
+        "question_count": question_count,
+        "progress": {
+            difficulty: {"generated": 0, "requested": count}
+            for difficulty, count in difficulty_distribution.items()
+        },
+        "mcqs": [],
+        "quiz_id": None,
+        "error": None,
+        "worker": None,
+        "lease_until": 0,
+        "created_at": now,
+        "updated_at": now,
+    })
+    logging.info(f"📥 Queued {kind} quiz job {job_id} for user {user_id}")
+    _submit(job_id)
+    return job_id
+
+
+def create_standard_job(user_id):
+    return create_job(user_id, "standard", DIFFICULTY_DISTRIBUTION, sum(DIFFICULTY_DISTRIBUTION.values()))
+
+
+def create_adaptive_job(user_id, difficulty_distribution, question_count):
+    return create_job(user_id, "adaptive", difficulty_distribution, question_count)
+
+
+def get_job(job_id):
+    return quiz_jobs.find_one({"job_id": job_id}, {"_id": 0, "worker": 0, "lease_until": 0})
+
+
+def _claim_job(job_id):
+    """Atomically take ownership of a queued or orphaned job so only one worker runs it."""
+    now = time.time()
+    return quiz_jobs.find_one_and_update(
+        {
+            "job_id": job_id,
+            "$or": [
+                {"status": QUEUED, "lease_until": {"$lte": now}},
+                {"status": RUNNING, "lease_until": {"$lte": now}},
+            ],
+        },
+        {"$set": {
+            "status": RUNNING,
+            "worker": WORKER_ID,
+            "lease_until": now + QUIZ_JOB_LEASE_SECONDS,
+            "updated_at": now,
+        }},
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def _remaining_distribution(job):
+    return {
+        difficulty: max(0, counts["requested"] - counts["generated"])
+        for difficulty, counts in job["progress"].items()
+    }
+
+
+def _job_mcqs(job, quiz_context):
+    """Generation iterator for whatever the job still needs, skipping already-accepted questions."""
+    remaining = _remaining_distribution(job)
+    user_id = job["user_id"]
+
+    if job["kind"] == "adaptive":
+        return iter_adaptive_quiz(
+            user_id,
+            remaining,
+            job["question_count"],
+            load_seen_questions(user_id),
+            quiz_context,
+        )
+
+    return iter_standard_quiz(user_id, quiz_context, remaining)
+
+
+def _record_mcq(job_id, mcq):
+    now = time.time()
+    quiz_jobs.update_one(
+        {"job_id": job_id, "worker": WORKER_ID},
+        {
+            "$push": {"mcqs": mcq},
+            "$inc": {f"progress.{mcq.get('difficulty', 'unknown')}.generated": 1},
+            "$set": {"updated_at": now, "lease_until": now + QUIZ_JOB_LEASE_SECONDS},
+        },
+    )
+
+
+def run_job(job_id):
+    """Run (or resume) one job; accepted MCQs are persisted as they arrive."""
+    job = _claim_job(job_id)
+    if not job:
+        return
+
+    user_id = job["user_id"]
+    mcqs = list(job["mcqs"])
+    if mcqs:
+        logging.info(f"🔁 Resuming quiz job {job_id} with {len(mcqs)} questions already accepted")
+
+    try:
+        quiz_context = QuizSimilarityContext(mcq["question_text"] for mcq in mcqs)
+        with llm_job(user_id, BATCH):
+            for mcq in _job_mcqs(job, quiz_context):
+                mcqs.append(mcq)
+                _record_mcq(job_id, mcq)
+
+        quiz_id = save_quiz(user_id, job["difficulty_distribution"], mcqs, quiz_id=job_id)
+        quiz_jobs.update_one(
+            {"job_id": job_id},
+            {"$set": {"status": COMPLETED, "quiz_id": quiz_id, "updated_at": time.time()}},
+        )
+        logging.info(f" Quiz job {job_id} completed with {len(mcqs)} questions")
+
+    except LLMQueueFullError:
+        logging.warning(f"⚠ LLM queue full; quiz job {job_id} will be retried")
+        quiz_jobs.update_one(
+            {"job_id": job_id},
+            {"$set": {
+                "status": QUEUED,
+                "worker": None,
+                "lease_until": time.time() + QUIZ_JOB_RETRY_SECONDS,
+                "updated_at": time.time(),
+            }},
+        )
+
+    except Exception as e:
+        logging.error(f" Quiz job {job_id} failed: {e}")
+        quiz_jobs.update_one(
+            {"job_id": job_id},
+            {"$set": {"status": FAILED, "error": str(e), "updated_at": time.time()}},
+        )
+
+
+def resume_pending_jobs():
+    """Submit every queued job and every running job whose worker stopped renewing its lease."""
+    now = time.time()
+    pending = quiz_jobs.find(
+        {"status": {"$in": [QUEUED, RUNNING]}, "lease_until": {"$lte": now}},
+        {"job_id": 1},
+    )
+    count = 0
+    for job in pending:
+        count += _submit(job["job_id"])
+    if count:
+        logging.info(f"🔁 Resubmitted {count} pending quiz jobs")
+    return count
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def reclaim_own_jobs():
+    """
+    Release running jobs left behind by an earlier process on this host, so they resume now
+    instead of after their lease expires. A job counts as left behind when its worker's pid
+    is gone or is this process's own pid (a restart that reused it).
+    """
+    count = 0
+    for job in quiz_jobs.find({"status": RUNNING}, {"job_id": 1, "worker": 1}):
+        host, _, pid = (job.get("worker") or "").rpartition(":")
+        if host != WORKER_HOST or not pid.isdigit():
+            continue
+        if int(pid) != os.getpid() and _process_alive(int(pid)):
+            continue
+        released = quiz_jobs.update_one(
+            {"job_id": job["job_id"], "status": RUNNING, "worker": job["worker"]},
+            {"$set": {"lease_until": 0, "updated_at": time.time()}},
+        )
+        count += released.modified_count
+    if count:
+        logging.info(f"🔁 Reclaimed {count} quiz jobs from a previous run on this host")
+    return count
+
+
+def _sweep_forever():
+    while True:
+        try:
+            resume_pending_jobs()
+        except Exception as e:
+            logging.error(f" Quiz job sweep failed: {e}")
+        time.sleep(QUIZ_JOB_SWEEP_SECONDS)
+
+
+def start_job_workers():
+    """Resume unfinished jobs now and keep picking up orphaned ones in the background."""
+    global _sweeper_started
+    with _sweeper_lock:
+        if _sweeper_started:
+            return
+        _sweeper_started = True
+    try:
+        reclaim_own_jobs()
+    except Exception as e:
+        logging.error(f" Could not reclaim quiz jobs: {e}")
+    threading.Thread(target=_sweep_forever, name="quiz-job-sweeper", daemon=True).start()
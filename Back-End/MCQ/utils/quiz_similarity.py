@@ -0,0 +1,101 @@
+# utils/quiz_similarity.py
+
+import logging
+import numpy as np
+from utils.embedding_cache import embedding_cache
+from utils.vector_index import unit_rows
+
+
+def normalize_question(text):
+    return " ".join(text.lower().split())
+
+
+class QuizSimilarityContext:
+    """
+    The questions accepted into one quiz so far, replacing the plain set of question texts.
+
+    Each question is embedded once, when it is added, into a growing matrix of unit-length
+    rows, so checking a candidate against the whole quiz is one matrix-vector product rather
+    than re-encoding every accepted question. `in`, len() and iteration work on the texts
+    like the old set did.
+    """
+
+    def __init__(self, questions=()):
+        self.questions = set()
+        self._normalized = set()
+        self._matrix = None
+        self._size = 0
+        self.update(questions)
+
+    def __contains__(self, question):
+        return question in self.questions
+
+    def __len__(self):
+        return len(self.questions)
+
+    def __iter__(self):
+        return iter(self.questions)
+
+    @property
+    def vectors(self):
+        if self._matrix is None:
+            return np.empty((0, 0), dtype=np.float32)
+        return self._matrix[:self._size]
+
+    def _append(self, rows):
+        if self._matrix is None:
+            self._matrix = np.empty((max(32, len(rows)), rows.shape[1]), dtype=np.float32)
+        elif self._size + len(rows) > len(self._matrix):
+            grown = np.empty((max(2 * len(self._matrix), self._size + len(rows)), self._matrix.shape[1]), dtype=np.float32)
+            grown[:self._size] = self._matrix[:self._size]
+            self._matrix = grown
+        self._matrix[self._size:self._size + len(rows)] = rows
+        self._size += len(rows)
+
+    def update(self, questions):
+        """Add several questions, encoding the new ones in one batch."""
+        new = []
+        for question in questions:
+            if question and question not in self.questions and question not in new:
+                new.append(question)
+        if new:
+            self._append(unit_rows(embedding_cache.encode(new)))
+            self.questions.update(new)
+            self._normalized.update(normalize_question(q) for q in new)
+
+    def add(self, question, vector=None):
+        """Add an accepted question; pass its embedding if the caller already has it."""
+        if not question or question in self.questions:
+            return
+        if vector is None:
+            vector = embedding_cache.encode_one(question)
+        self._append(unit_rows(vector))
+        self.questions.add(question)
+        self._normalized.add(normalize_question(question))
+
+    def has_text(self, question):
+        """Exact duplicate check, ignoring case and whitespace."""
+        return normalize_question(question) in self._normalized
+
+    def max_similarity(self, vector):
+        """Highest cosine similarity between vector and any accepted question (0.0 if empty)."""
+        return float(self.max_similarities(vector)[0])
+
+    def max_similarities(self, vectors):
+        """Highest cosine similarity of each unit-length row of vectors to the quiz, in one matrix product."""
+        vectors = np.array(vectors, dtype=np.float32, ndmin=2)
+        if not self._size:
+            return np.zeros(len(vectors), dtype=np.float32)
+        return (self.vectors @ unit_rows(vectors).T).max(axis=0)
+
+    def is_similar(self, question, threshold=0.85, vector=None):
+        """True if the question is too close to one already in the quiz."""
+        if not self._size:
+            return False
+        if vector is None:
+            vector = embedding_cache.encode_one(question)
+        max_similarity = self.max_similarity(vector)
+        if max_similarity >= threshold:
+            logging.warning(f"⚠ Similarity {max_similarity} exceeds threshold {threshold}. Skipping question: {question}")
+            return True
+        return False
@@ -0,0 +1,91 @@
+# utils/seed_sampler.py
+
+import os
+import sys
+import threading
+from collections import OrderedDict, deque
+import numpy as np
+
+# Seeds a user drew most recently (roughly the last five quizzes) decide which clusters a new
+# rotation visits first: the least covered ones
+SEED_COVERAGE_WINDOW = int(os.getenv("SEED_COVERAGE_WINDOW", "50"))
+# Users whose rotation is remembered; the least recently active ones are forgotten first
+SEED_SAMPLER_USERS = int(os.getenv("SEED_SAMPLER_USERS", "10000"))
+
+
+class _Rotation:
+    def __init__(self, window):
+        self.pending = deque()  # cluster positions still to visit in this rotation
+        self.recent = deque(maxlen=window)  # cluster positions of the latest seeds
+
+
+class SeedSampler:
+    """
+    Picks the seed question for each generation attempt, spreading a user's seeds evenly
+    over the corpus clusters.
+
+    Built once from the dataset: row ids grouped by cluster in one int32 array, with each
+    cluster's offset and size. Every user walks through a rotation of all clusters; when it
+    runs out, the next rotation visits the clusters the user's recent seeds covered least
+    first, in random order among equals. sample() pops the next cluster and picks a random
+    row inside it, which is constant time (a new rotation costs one sort of the clusters).
+    """
+
+    def __init__(self, clusters, questions, coverage_window=SEED_COVERAGE_WINDOW,
+                 max_users=SEED_SAMPLER_USERS, rng=None):
+        clusters = np.asarray(clusters)
+        order = np.argsort(clusters, kind="stable")
+        self.cluster_ids, self._starts, self._sizes = np.unique(
+            clusters[order], return_index=True, return_counts=True
+        )
+        self._rows = order.astype(np.int32)
+        self.questions = np.array([sys.intern(str(q)) for q in questions], dtype=object)
+
+        self.coverage_window = coverage_window
+        self.max_users = max_users
+        self._rng = rng or np.random.default_rng()
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _rotation(self, user_id):
+        rotation = self._users.get(user_id)
+        if rotation is None:
+            rotation = self._users[user_id] = _Rotation(self.coverage_window)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        self._users.move_to_end(user_id)
+        return rotation
+
+    def _next_cluster(self, rotation):
+        if not rotation.pending:
+            covered = np.bincount(np.array(rotation.recent, dtype=np.int64), minlength=len(self.cluster_ids))
+            tie_break = self._rng.random(len(self.cluster_ids))
+            rotation.pending.extend(np.lexsort((tie_break, covered)).tolist())
+        cluster = rotation.pending.popleft()
+        rotation.recent.append(cluster)
+        return cluster
+
+    def sample_row(self, user_id=None):
+        """Dataset row id of the next seed for user_id, or None when the dataset is empty."""
+        if not len(self._rows):
+            return None
+        with self._lock:
+            cluster = self._next_cluster(self._rotation(user_id))
+            offset = int(self._rng.integers(self._sizes[cluster]))
+        return int(self._rows[self._starts[cluster] + offset])
+
+    def sample(self, user_id=None):
+        """Question text of the next seed for user_id, or None when the dataset is empty."""
+        row = self.sample_row(user_id)
+        return None if row is None else self.questions[row]
+
+    def coverage(self, user_id):
+        """How many of the user's recent seeds came from each cluster id."""
+        with self._lock:
+            rotation = self._users.get(user_id)
+            recent = list(rotation.recent) if rotation else []
+        counts = np.bincount(np.array(recent, dtype=np.int64), minlength=len(self.cluster_ids))
+        return {int(cluster): int(count) for cluster, count in zip(self.cluster_ids, counts)}
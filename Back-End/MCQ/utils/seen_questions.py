@@ -0,0 +1,108 @@
+# utils/seen_questions.py
+
+import logging
+import time
+import numpy as np
+from database.database import quizzes_collection, quiz_embeddings
+from utils.embedding_cache import embedding_cache
+from utils.vector_index import unit_rows
+
+# How many of the user's latest quizzes one generation request loads
+SEEN_QUIZZES = 5
+
+
+def store_quiz_embeddings(quiz_id, user_id, questions, created_at=None):
+    """
+    Embed a saved quiz's questions once and keep them (unit-length, float16) in quiz_embeddings,
+    so later past-quiz checks read them instead of re-encoding. Returns the float32 vectors.
+    """
+    questions = [q for q in questions if q]
+    if not questions:
+        return np.empty((0, 0), dtype=np.float32)
+
+    vectors = unit_rows(embedding_cache.encode(questions))
+    if quiz_id is not None:
+        quiz_embeddings.update_one(
+            {"_id": quiz_id},
+            {"$set": {
+                "user_id": user_id,
+                "questions": questions,
+                "dim": vectors.shape[1],
+                "vectors": vectors.astype(np.float16).tobytes(),
+                "created_at": created_at or time.time(),
+            }},
+            upsert=True,
+        )
+    return vectors
+
+
+def _decode(doc):
+    return np.frombuffer(doc["vectors"], dtype=np.float16).reshape(-1, doc["dim"]).astype(np.float32)
+
+
+class SeenQuestions:
+    """
+    A user's recent quiz questions, newest quiz first, with one matrix of unit-length embeddings.
+    Checking a candidate against all of them is a single matrix-vector product.
+    """
+
+    def __init__(self, quizzes=()):
+        self._quizzes = list(quizzes)  # [(questions, vectors)] per quiz
+        self.questions = [q for questions, _ in self._quizzes for q in questions]
+        vectors = [v for _, v in self._quizzes if len(v)]
+        self.vectors = np.vstack(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.questions)
+
+    def recent(self, quiz_count):
+        """The questions of only the latest quiz_count quizzes."""
+        return SeenQuestions(self._quizzes[:quiz_count])
+
+    def max_similarity(self, vector):
+        if not len(self.vectors):
+            return 0.0
+        return float((self.vectors @ unit_rows(vector)[0]).max())
+
+    def is_similar(self, question, threshold=0.65, vector=None):
+        if not len(self.vectors):
+            return False
+        if vector is None:
+            vector = embedding_cache.encode_one(question)
+        max_sim = self.max_similarity(vector)
+        if max_sim >= threshold:
+            logging.warning(f"🚫 Too Similar to Past Quiz Questions: {question} (Max Cosine Sim: {max_sim})")
+            return True
+        return False
+
+
+def load_seen_questions(user_id, limit=SEEN_QUIZZES):
+    """
+    Load the user's last `limit` quizzes with their stored embeddings: one query for the quizzes
+    and one for their vectors. Quizzes saved before embeddings were stored are embedded once here
+    and backfilled.
+    """
+    quizzes = list(quizzes_collection.find(
+        {"user_id": user_id},
+        {"quiz_id": 1, "questions.question_text": 1, "created_at": 1, "_id": 0}
+    ).sort("created_at", -1).limit(limit))
+    if not quizzes:
+        return SeenQuestions()
+
+    quiz_ids = [quiz.get("quiz_id") for quiz in quizzes if quiz.get("quiz_id")]
+    stored = {doc["_id"]: doc for doc in quiz_embeddings.find({"_id": {"$in": quiz_ids}})}
+
+    per_quiz = []
+    backfilled = 0
+    for quiz in quizzes:
+        questions = [q["question_text"] for q in quiz.get("questions", []) if q.get("question_text")]
+        doc = stored.get(quiz.get("quiz_id"))
+        if doc and doc.get("questions") == questions:
+            vectors = _decode(doc)
+        else:
+            vectors = store_quiz_embeddings(quiz.get("quiz_id"), user_id, questions, quiz.get("created_at"))
+            backfilled += 1
+        per_quiz.append((questions, vectors))
+
+    logging.info(f"🔍 Loaded {len(quizzes)} recent quizzes for user {user_id} ({backfilled} embedded now)")
+    return SeenQuestions(per_quiz)
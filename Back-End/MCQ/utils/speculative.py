@@ -0,0 +1,72 @@
+# utils/speculative.py
+
+import logging
+import os
+import numpy as np
+from utils.prompt_cache import _common_prefix_length
+
+# "off": plain decoding; "prompt_lookup": draft tokens copied from n-grams already in the context
+# (the option skeleton, "Correct Answer:", terms from the context questions); "draft": a small
+# local GGUF model that shares the main model's vocabulary proposes the tokens
+LLM_SPECULATIVE = os.getenv("LLM_SPECULATIVE", "off").lower()
+LLM_DRAFT_TOKENS = int(os.getenv("LLM_DRAFT_TOKENS", "10"))
+LLM_DRAFT_MAX_NGRAM = int(os.getenv("LLM_DRAFT_MAX_NGRAM", "3"))
+LLM_DRAFT_MODEL_PATH = os.getenv("LLM_DRAFT_MODEL_PATH")
+
+SPECULATIVE_MODES = ("off", "prompt_lookup", "draft")
+
+
+class GGUFDraftModel:
+    """
+    llama_cpp draft model backed by a small Llama: greedily proposes up to num_pred_tokens
+    continuations of the main model's context. Its own KV cache keeps the shared prefix, so
+    each call only evaluates the tokens the main model accepted since the last call.
+    """
+
+    def __init__(self, model, num_pred_tokens=LLM_DRAFT_TOKENS):
+        self.model = model
+        self.num_pred_tokens = num_pred_tokens
+
+    def __call__(self, input_ids, /, **kwargs):
+        draft = self.model
+        ids = input_ids.tolist()
+        if not ids or len(ids) >= draft.n_ctx() - self.num_pred_tokens:
+            return np.array([], dtype=np.intc)
+
+        # Keep at least the last token to evaluate so there are fresh logits to sample from
+        shared = _common_prefix_length(draft.input_ids[: draft.n_tokens], ids[:-1])
+        draft.n_tokens = shared
+        draft.eval(ids[shared:])
+
+        proposed = []
+        eos = draft.token_eos()
+        for _ in range(self.num_pred_tokens):
+            token = draft.sample(top_k=1, temp=0.0)
+            if token == eos:
+                break
+            proposed.append(token)
+            if len(proposed) < self.num_pred_tokens:
+                draft.eval([token])
+        return np.array(proposed, dtype=np.intc)
+
+
+def build_draft_model(mode=LLM_SPECULATIVE, n_ctx=2048, n_threads=None):
+    """The draft_model argument for llama_cpp.Llama in the given mode, or None for plain decoding."""
+    if mode in ("", "off"):
+        return None
+
+    if mode == "prompt_lookup":
+        from llama_cpp.llama_speculative import LlamaPromptLookupDecoding
+
+        return LlamaPromptLookupDecoding(max_ngram_size=LLM_DRAFT_MAX_NGRAM, num_pred_tokens=LLM_DRAFT_TOKENS)
+
+    if mode == "draft":
+        if not LLM_DRAFT_MODEL_PATH:
+            raise ValueError("LLM_SPECULATIVE=draft requires LLM_DRAFT_MODEL_PATH")
+        from llama_cpp import Llama
+
+        draft = Llama(model_path=LLM_DRAFT_MODEL_PATH, n_ctx=n_ctx, n_threads=n_threads, verbose=False)
+        logging.info(f"🧪 Speculative decoding with draft model {LLM_DRAFT_MODEL_PATH}")
+        return GGUFDraftModel(draft)
+
+    raise ValueError(f"Unknown LLM_SPECULATIVE mode: {mode} (expected one of {SPECULATIVE_MODES})")
@@ -1,102 +1,138 @@
 import re
 
-def extract_mcqs(prompt, raw_output):
-    raw_output = raw_output.replace(prompt, "").strip()
-    raw_output = re.sub(r"</?s>|</?INST>|><INST>", "", raw_output, flags=re.IGNORECASE)
-
-    lines = [line.strip() for line in raw_output.split("\n") if line.strip()]
-
-    mcqs = []
-    current_mcq = {"question": None, "options": {}, "correct_answer": None}
-    waiting_for_question = False
-
-    def flush():
-        if (
-            current_mcq["question"]
-            and len(current_mcq["options"]) == 5
-            and current_mcq["correct_answer"] in current_mcq["options"]
-        ):
-            current_mcq["question"] = re.sub(
-                r"^(?:Question\s*)?\d+[\.\:\)]\s*", "", current_mcq["question"]
-            ).strip(" .:")
-            mcqs.append(current_mcq.copy())
-
-    for i, line in enumerate(lines):
+_TAG_PATTERN = re.compile(r"</?s>|</?INST>|><INST>", flags=re.IGNORECASE)
+_QUESTION_PREFIX = r"^(?:Question\s*)?\d+[\.\:\)]\s*"
+
+
+def _new_mcq():
+    return {"question": None, "options": {}, "correct_answer": None}
+
+
+class IncrementalMCQParser:
+    """
+    The extract_mcqs state machine, fed one chunk of model output at a time.
+
+    Text is buffered until a full line is available, so it can consume a stream=True token
+    stream directly. complete_count() tells how many MCQs (question, 5 options and a valid
+    answer) have been parsed so far, which lets the caller stop decoding once it has enough.
+    """
+
+    def __init__(self):
+        self.mcqs = []
+        self._buffer = ""
+        self._lines = []
+        self._current = _new_mcq()
+        self._waiting_for_question = False
+
+    def feed(self, text):
+        self._buffer += text
+        *complete, self._buffer = self._buffer.split("\n")
+        for line in complete:
+            self._process(line)
+
+    def close(self):
+        """Parse whatever is left in the buffer and return every complete MCQ."""
+        if self._buffer:
+            self._process(self._buffer)
+            self._buffer = ""
+        self._flush()
+        self._current = _new_mcq()
+        return self.mcqs
+
+    def _is_complete(self, mcq):
+        return (
+            mcq["question"]
+            and len(mcq["options"]) == 5
+            and mcq["correct_answer"] in mcq["options"]
+        )
+
+    def complete_count(self):
+        return len(self.mcqs) + int(bool(self._is_complete(self._current)))
+
+    def _flush(self):
+        current_mcq = self._current
+        if self._is_complete(current_mcq):
+            current_mcq["question"] = re.sub(_QUESTION_PREFIX, "", current_mcq["question"]).strip(" .:")
+            self.mcqs.append(current_mcq.copy())
+
+    def _start(self, question=None, waiting=False):
+        self._flush()
+        self._current = _new_mcq()
+        self._current["question"] = question
+        if waiting:
+            self._waiting_for_question = True
+
+    def _process(self, raw_line):
+        line = _TAG_PATTERN.sub("", raw_line).strip()
+        if not line:
+            return
+        self._lines.append(line)
+        current_mcq = self._current
+
         # Section headers like "Example:", "Easy 1:", etc.
         if re.match(r"^(Example|Easy|Medium|Hard)?\s*\d*[\:\)]\s*$", line, re.IGNORECASE) or line.lower() in ["example:", "example"]:
-            flush()
-            current_mcq = {"question": None, "options": {}, "correct_answer": None}
-            waiting_for_question = True
-            continue
+            self._start(waiting=True)
+            return
 
         # Lines like "1:" or "Question 1:"
         if re.match(r"^(?:Question\s*)?\d+[\.\:\)]\s*$", line, re.IGNORECASE):
-            flush()
-            current_mcq = {"question": None, "options": {}, "correct_answer": None}
-            waiting_for_question = True
-            continue
+            self._start(waiting=True)
+            return
 
         # Waiting for the question after a header
-        if waiting_for_question:
-            question = re.sub(r"^(?:Question\s*)?\d+[\.\:\)]\s*", "", line).rstrip(" .:")
+        if self._waiting_for_question:
+            question = re.sub(_QUESTION_PREFIX, "", line).rstrip(" .:")
 
             if question:
                 current_mcq["question"] = question
-                waiting_for_question = False
-            continue
+                self._waiting_for_question = False
+            return
 
         # Inline: "Question 1: What is...?"
         q_match = re.match(r"^Question\s*[:\-]?\s*(.+)", line, re.IGNORECASE)
         if not q_match:
             q_match = re.match(r"^(?:Question\s*)?\d+[\.\:\)]\s*(.+)", line, re.IGNORECASE)
         if q_match:
-            flush()
-            question = re.sub(r"^(?:Question\s*)?\d+[\.\:\)]\s*", "", q_match.group(1)).rstrip(" .:")
-            current_mcq = {"question": question, "options": {}, "correct_answer": None}
-            continue
-        
+            question = re.sub(_QUESTION_PREFIX, "", q_match.group(1)).rstrip(" .:")
+            self._start(question=question)
+            return
+
         # New format: "### Question X"
         if re.match(r"^###\s*Question\s*\d+", line, re.IGNORECASE):
-            flush()
-            current_mcq = {"question": None, "options": {}, "correct_answer": None}
-            waiting_for_question = True
-            continue
-        
+            self._start(waiting=True)
+            return
+
         match_easy_intro = re.match(r"^The .* level multiple-choice .* question .* is[:\-]?\s*(.+)?$", line, re.IGNORECASE)
         if match_easy_intro:
-            flush()
-            current_mcq = {"question": None, "options": {}, "correct_answer": None}
             possible_question = match_easy_intro.group(1)
             if possible_question:
-                current_mcq["question"] = possible_question.strip(" .:")
+                self._start(question=possible_question.strip(" .:"))
             else:
-                waiting_for_question = True  # Wait for next line if question is not in same line
-            continue
+                self._start(waiting=True)  # Wait for next line if question is not in same line
+            return
 
         # Bullet-style questions: "- What is...?"
         bullet_q_match = re.match(r"^\-\s*(.+)", line)
         if bullet_q_match and not current_mcq["question"]:
             text = bullet_q_match.group(1).strip(" ?:")
             if not re.match(r"^[A-Ea-e][\)\.\:\-]?\s+", text):
-                flush()
-                question = re.sub(r"^(?:Question\s*)?\d+[\.\:\)]\s*", "", text).strip(" .:")
-                current_mcq = {"question": question, "options": {}, "correct_answer": None}
-                continue
+                question = re.sub(_QUESTION_PREFIX, "", text).strip(" .:")
+                self._start(question=question)
+                return
 
         # Option A–E: "A) text"
         opt_match = re.match(r"^([A-Ea-e])[\)\.\:\-]?\s+(.+)", line)
         if opt_match:
             if not current_mcq["question"]:
                 # Backtrack to find question
-                for j in range(i - 1, -1, -1):
-                    prev = lines[j]
+                for prev in reversed(self._lines[:-1]):
                     if not re.match(r"^[A-Ea-e][\)\.\:\-]?\s+", prev) and not prev.lower().startswith("correct answer"):
-                        question = re.sub(r"^(?:Question\s*)?\d+[\.\:\)]\s*", "", prev).strip(" .:")
+                        question = re.sub(_QUESTION_PREFIX, "", prev).strip(" .:")
                         if question:
                             current_mcq["question"] = question
                         break
             current_mcq["options"][opt_match.group(1).upper()] = opt_match.group(2).strip()
-            continue
+            return
 
         # Numbered options: "(1)", "1.", "1)", etc.
         num_opt_match = re.match(r"^\(?([1-5])\)?[\.\:\-]?\s+(.+)", line)
@@ -105,7 +141,7 @@ def extract_mcqs(prompt, raw_output):
             letter = number_to_letter.get(num_opt_match.group(1))
             if letter:
                 current_mcq["options"][letter] = num_opt_match.group(2).strip()
-            continue
+            return
 
         # Answers: "Correct Answer: C" or "Correct Answer: (3)"
         ans_match = re.match(r"^(?:Correct\s*)?Answer\s*[:\-]?\s*\(?([A-Ea-e1-5])\)?(?:[\)\.\:\-]?\s+.*)?$", line, re.IGNORECASE)
@@ -114,7 +150,11 @@ def extract_mcqs(prompt, raw_output):
             if val in "12345":
                 val = chr(64 + int(val))  # Convert 1–5 to A–E
             current_mcq["correct_answer"] = val
-            continue
+            return
 
-    flush()
-    return mcqs
+
+def extract_mcqs(prompt, raw_output):
+    raw_output = raw_output.replace(prompt, "")
+    parser = IncrementalMCQParser()
+    parser.feed(raw_output)
+    return parser.close()
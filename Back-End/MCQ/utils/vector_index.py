@@ -0,0 +1,46 @@
+# utils/vector_index.py
+
+import os
+import faiss
+import numpy as np
+
+# Index over generated questions: "flat" (exact inner product) or "hnsw" (approximate, for large banks)
+GENERATED_INDEX_KIND = os.getenv("GENERATED_INDEX_KIND", "flat").lower()
+HNSW_M = int(os.getenv("HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "80"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))
+
+INDEX_KINDS = ("flat", "hnsw")
+
+
+def unit_rows(vectors):
+    """float32 copy of vectors (n, d) with every row scaled to unit length."""
+    vectors = np.array(vectors, dtype=np.float32, ndmin=2)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+    return vectors
+
+
+def build_cosine_index(dim, kind=GENERATED_INDEX_KIND):
+    """
+    Empty inner-product index; with unit-length vectors its scores are cosine similarities.
+    "hnsw" trades a little recall for sub-linear search and needs no training, so it can
+    grow one vector at a time like the flat index.
+    """
+    if kind == "flat":
+        return faiss.IndexFlatIP(dim)
+    if kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+        return index
+    raise ValueError(f"Unknown index kind {kind!r}; expected one of {INDEX_KINDS}")
+
+
+def cosine_scores(index, distances):
+    """
+    Convert an index's search output to cosine similarity (higher is closer).
+    Inner-product scores already are; squared L2 between unit vectors is 2 - 2 * cosine.
+    """
+    if index.metric_type == faiss.METRIC_INNER_PRODUCT:
+        return distances
+    return 1.0 - distances / 2.0
@@ -0,0 +1,151 @@
+# utils/verification_service.py
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from database.database import verification_cache
+from utils.verification import verify_mcq_with_llm
+
+OPTION_LETTERS = ("A", "B", "C", "D", "E")
+
+
+def _normalize(text):
+    return " ".join(str(text).lower().split())
+
+
+def mcq_key(question, options):
+    """Stable hash of an MCQ's question text and options, ignoring case and whitespace."""
+    payload = "\n".join(
+        [_normalize(question)] + [f"{letter}) {_normalize(options.get(letter, ''))}" for letter in OPTION_LETTERS]
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def quiz_question_options(question):
+    """Options of a question as stored in a quiz document (option1..option5)."""
+    return {letter: question.get(f"option{i}", "") for i, letter in enumerate(OPTION_LETTERS, start=1)}
+
+
+class VerificationService:
+    """
+    Answer verification that asks Gemini at most once per distinct MCQ.
+
+    The verifier's answer is stored in the verification_cache collection, keyed by mcq_key(),
+    with a small in-process LRU in front of it. Concurrent requests for the same MCQ wait for
+    the one Gemini call in flight. Failed calls are not cached, so they are retried later.
+    """
+
+    def __init__(self, collection=verification_cache, verifier=verify_mcq_with_llm, memory_size=4096):
+        self._collection = collection
+        self._verifier = verifier
+        self._memory = OrderedDict()
+        self._memory_size = memory_size
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._stats = {"hits": 0, "gemini_calls": 0, "failures": 0}
+
+    def _remember(self, key, answer):
+        with self._lock:
+            self._memory[key] = answer
+            self._memory.move_to_end(key)
+            while len(self._memory) > self._memory_size:
+                self._memory.popitem(last=False)
+
+    def _lookup_key(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+        doc = self._collection.find_one({"_id": key}, {"verified_answer": 1})
+        if doc and doc.get("verified_answer"):
+            self._remember(key, doc["verified_answer"])
+            return doc["verified_answer"]
+        return None
+
+    def lookup(self, question, options):
+        """The cached verified answer for this MCQ, or None if it has never been verified."""
+        return self._lookup_key(mcq_key(question, options))
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def verify(self, question, options, claimed_answer):
+        """Same contract as verify_mcq_with_llm: returns (is_correct, verified_answer, claimed_answer)."""
+        key = mcq_key(question, options)
+        verified = self._lookup_key(key)
+
+        if verified is None:
+            key_lock = self._key_lock(key)
+            with key_lock:
+                verified = self._lookup_key(key)
+                if verified is None:
+                    self._count("gemini_calls")
+                    _, verified, _ = self._verifier(question, options, claimed_answer)
+                    if verified in options:
+                        self._store(key, question, verified)
+                    else:
+                        verified = None
+                        self._count("failures")
+                else:
+                    self._count("hits")
+            with self._lock:
+                self._key_locks.pop(key, None)
+        else:
+            self._count("hits")
+
+        if verified is None:
+            return None, None, claimed_answer
+        return verified == claimed_answer, verified, claimed_answer
+
+    def _store(self, key, question, verified):
+        self._remember(key, verified)
+        try:
+            self._collection.update_one(
+                {"_id": key},
+                {"$set": {"verified_answer": verified, "question_text": question, "verified_at": time.time()}},
+                upsert=True,
+            )
+        except Exception as e:
+            logging.error(f"⚠ Could not persist verification result: {e}")
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def metrics(self):
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["gemini_calls"]
+            return {
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+            }
+
+
+verification_service = VerificationService()
+
+
+def verify_mcq(question, options, claimed_answer):
+    """Cached drop-in for verify_mcq_with_llm."""
+    return verification_service.verify(question, options, claimed_answer)
+
+
+def apply_verification(question, claimed_answer, is_correct, verified, options):
+    """
+    Record a verification result on a stored quiz question (option1..option5 layout).
+    Returns the changed fields, or {} when there is no verdict yet (the question stays unverified).
+    """
+    if verified is None or verified not in options:
+        return {}
+
+    changes = {
+        "claimed_answer": claimed_answer,
+        "correct_answer": verified if is_correct is False else claimed_answer,
+        "verified_answer": verified if is_correct is False else claimed_answer,
+        "is_verified": True,
+    }
+    question.update(changes)
+    return changes